@@ -3,28 +3,128 @@ Main Flask application entry point for the Library Management System.
 
 This module provides the application factory pattern for creating Flask app instances.
 Routes are organized in separate blueprint modules in the routes package.
+
+For multi-process serving use the WSGI entry point instead of app.run:
+    gunicorn -c gunicorn.conf.py wsgi:app
 """
 
+from typing import Optional
+import logging
+import os
+import threading
+
 from flask import Flask
-from database import init_database, add_sample_data
+from werkzeug.middleware.proxy_fix import ProxyFix
 from routes import register_blueprints
+from services.rate_limit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+def is_production() -> bool:
+    """True when LIBRARY_ENV is set to 'production'."""
+    return os.environ.get('LIBRARY_ENV', 'development') == 'production'
+
+
+def load_secret_key() -> str:
+    """
+    Session signing key from the SECRET_KEY environment variable.
+    
+    Development falls back to a fixed key. Production without SECRET_KEY
+    gets a random key: sessions then do not survive a restart, and workers
+    only share the key if the app is created before forking (preload_app).
+    """
+    secret_key = os.environ.get('SECRET_KEY')
+    if secret_key:
+        return secret_key
+    if not is_production():
+        return "super secret key"
+    import secrets
+    logger.warning('SECRET_KEY is not set; using a random key for this process')
+    return secrets.token_hex(32)
+
 
+def warm_caches():
+    """Load the in-process catalog snapshot and typeahead index."""
+    from services.catalog_snapshot import catalog_snapshot
+    from services.suggest_index import suggest_index
+    catalog_snapshot.refresh()
+    suggest_index.build()
 
-def create_app():
+
+class StartupTasks:
+    """
+    Database setup and cache warmup for one app, run at most once.
+    
+    Deferred apps run these on their first request; servers that fork can
+    call run() per worker (see gunicorn.conf.py) to warm before serving.
+    """
+    
+    def __init__(self, seed_sample_data: bool):
+        self.seed_sample_data = seed_sample_data
+        self.done = False
+        self._lock = threading.Lock()
+    
+    def run(self):
+        if self.done:
+            return
+        with self._lock:
+            if self.done:
+                return
+            from database import add_sample_data, ensure_database
+            
+            # Create or migrate the schema once; later app creations skip it
+            ensure_database()
+            
+            # Add sample data for testing and demonstration
+            if self.seed_sample_data:
+                add_sample_data()
+            
+            # Build the catalog snapshot and typeahead index before serving requests
+            warm_caches()
+            self.done = True
+
+
+def create_app(seed_sample_data: Optional[bool] = None, defer_startup: bool = True,
+               rate_limiter: Optional[RateLimiter] = None):
     """
     Application factory function to create and configure Flask app.
     
+    Args:
+        seed_sample_data: Add sample books to an empty database. Defaults to
+            True outside production.
+        defer_startup: Run database setup and cache warmup on the first
+            request instead of now, so creating the app touches no database.
+        rate_limiter: Admission control for the app. Defaults to one
+            configured from the environment (see services/rate_limit.py).
+    
     Returns:
         Flask: Configured Flask application instance
     """
     app = Flask(__name__)
-    app.secret_key = "super secret key"
+    app.secret_key = load_secret_key()
+    
+    if seed_sample_data is None:
+        seed_sample_data = not is_production()
+    startup = StartupTasks(seed_sample_data)
+    app.extensions['library_startup'] = startup
+    if defer_startup:
+        app.before_request(startup.run)
+    else:
+        startup.run()
+    
+    # Behind LIBRARY_TRUSTED_PROXIES proxies, take the client address (used
+    # for rate limiting) from X-Forwarded-For instead of the proxy's own
+    trusted_proxies = int(os.environ.get('LIBRARY_TRUSTED_PROXIES', 0))
+    if trusted_proxies:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=trusted_proxies, x_proto=trusted_proxies)
     
-    # Initialize the database
-    init_database()
+    # Shed load and rate-limit borrowing and search before any route runs
+    (rate_limiter or RateLimiter.from_env()).init_app(app)
     
-    # Add sample data for testing and demonstration
-    add_sample_data()
+    # Pick up admin settings (profiling, slow-query threshold) changed in other workers
+    from services.runtime_settings import runtime_settings
+    app.before_request(runtime_settings.poll)
     
     # Register all route blueprints
     register_blueprints(app)
@@ -33,5 +133,5 @@ def create_app():
 
 
 if __name__ == '__main__':
-    app = create_app()
+    app = create_app(seed_sample_data=True, defer_startup=False)
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,70 @@
+"""
+Analytics benchmark: circulation reports from the daily rollup vs. a scan
+
+Seeds a synthetic database, builds the rollup once, then times each report
+against the equivalent ad-hoc aggregate over borrow_records.
+
+Usage:
+    python benchmarks/bench_analytics.py [loans] [repeats]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from benchmarks.synthetic_data import seed
+from models import SECONDS_PER_DAY, epoch_day
+from services import analytics
+
+DAYS = 30
+
+
+def measure(label: str, func, repeats: int) -> None:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    print(f'{label:32s} runs={repeats:>4d}  best={timings[0] * 1000:8.2f} ms  '
+          f'median={timings[len(timings) // 2] * 1000:8.2f} ms')
+
+
+def scan_top_books():
+    first_ts = (epoch_day(analytics.datetime.now()) - DAYS + 1) * SECONDS_PER_DAY
+    conn = database.get_db_connection()
+    conn.execute('''SELECT br.book_id, COUNT(*) AS loans FROM borrow_records br
+                    WHERE br.borrow_ts >= ? GROUP BY br.book_id ORDER BY loans DESC LIMIT 10''',
+                 (first_ts,)).fetchall()
+    conn.close()
+
+
+def scan_overdue_by_author():
+    first_ts = (epoch_day(analytics.datetime.now()) - DAYS + 1) * SECONDS_PER_DAY
+    conn = database.get_db_connection()
+    conn.execute(f'''SELECT b.author, COUNT(*) AS returns,
+                            SUM(br.return_ts / {SECONDS_PER_DAY} > br.due_ts / {SECONDS_PER_DAY}) AS overdue
+                     FROM borrow_records br JOIN books b ON b.id = br.book_id
+                     WHERE br.return_ts >= ? GROUP BY b.author''', (first_ts,)).fetchall()
+    conn.close()
+
+
+if __name__ == '__main__':
+    loans = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    with tempfile.TemporaryDirectory() as tmp:
+        seed(os.path.join(tmp, 'analytics.db'), books=5000, patrons=5000, loans=loans)
+        start = time.perf_counter()
+        analytics.refresh_rollups()
+        print(f'initial rollup of {loans} loans: {(time.perf_counter() - start) * 1000:.1f} ms')
+
+        measure('rollup: most_borrowed_books', lambda: analytics.most_borrowed_books(DAYS), repeats)
+        measure('scan:   most borrowed', scan_top_books, repeats)
+        measure('rollup: overdue_rate_by_author', lambda: analytics.overdue_rate_by_author(DAYS), repeats)
+        measure('scan:   overdue by author', scan_overdue_by_author, repeats)
+        measure('rollup: loans_per_day', lambda: analytics.loans_per_day(DAYS), repeats)
+        measure('rollup: average_loan_duration', lambda: analytics.average_loan_duration(DAYS), repeats)
@@ -0,0 +1,63 @@
+"""
+Memory/time benchmark: per-row dicts vs. Book records
+
+Builds a synthetic in-memory books table and compares the old
+`[dict(row) for row in sqlite3.Row rows]` path with the Book row factory.
+
+Usage:
+    python benchmarks/bench_records.py [rows]
+"""
+
+import os
+import sqlite3
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import BOOK_COLUMNS, Book
+
+
+def build_table(rows: int) -> sqlite3.Connection:
+    conn = sqlite3.connect(':memory:')
+    conn.execute('''
+        CREATE TABLE books (
+            id INTEGER PRIMARY KEY, title TEXT, author TEXT, isbn TEXT,
+            total_copies INTEGER, available_copies INTEGER
+        )
+    ''')
+    conn.executemany(
+        'INSERT INTO books VALUES (?, ?, ?, ?, ?, ?)',
+        ((i, f'Title {i}', f'Author {i % 1000}', f'{9780000000000 + i}', 3, 2) for i in range(1, rows + 1))
+    )
+    return conn
+
+
+def load_dicts(conn):
+    conn.row_factory = sqlite3.Row
+    return [dict(row) for row in conn.execute('SELECT * FROM books ORDER BY title').fetchall()]
+
+
+def load_records(conn):
+    cursor = conn.cursor()
+    cursor.row_factory = Book.row_factory
+    return cursor.execute(f'SELECT {BOOK_COLUMNS} FROM books ORDER BY title').fetchall()
+
+
+def measure(label: str, loader, conn) -> None:
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = loader(conn)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{label:8s} rows={len(rows):>8d}  retained={current / 1024 / 1024:7.2f} MiB  '
+          f'peak={peak / 1024 / 1024:7.2f} MiB  time={elapsed * 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    connection = build_table(count)
+    measure('dict', load_dicts, connection)
+    measure('records', load_records, connection)
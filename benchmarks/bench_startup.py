@@ -0,0 +1,49 @@
+"""
+Startup benchmark: create_app on a fresh vs. an already initialized database
+
+Each run points the app at a scratch database file. The first create_app
+builds the schema; later ones only read PRAGMA user_version, which is the
+cost every preloaded or restarted worker pays.
+
+Usage:
+    python benchmarks/bench_startup.py [repeats]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from app import create_app
+
+
+def measure(label: str, func, repeats: int) -> None:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    print(f'{label:28s} runs={repeats:>4d}  best={timings[0] * 1000:8.2f} ms  '
+          f'median={timings[len(timings) // 2] * 1000:8.2f} ms')
+
+
+if __name__ == '__main__':
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    with tempfile.TemporaryDirectory() as tmp:
+        counter = iter(range(repeats * 2))
+
+        def fresh_app():
+            database.DATABASE = os.path.join(tmp, f'fresh_{next(counter)}.db')
+            create_app(defer_startup=False)
+
+        measure('create_app (new database)', fresh_app, repeats)
+
+        database.DATABASE = os.path.join(tmp, 'warm.db')
+        create_app(defer_startup=False)
+        measure('create_app (initialized)', lambda: create_app(defer_startup=False), repeats)
+        measure('init_database (forced)', database.init_database, repeats)
+        measure('ensure_database (current)', database.ensure_database, repeats)
@@ -0,0 +1,52 @@
+"""
+Catalog page render time with and without cached book rows
+
+Seeds a synthetic database, then times GET /catalog through the Flask test
+client with the fragment cache cleared before every request (every row
+rendered, as before caching) and warm (rows reused).
+
+Usage:
+    python benchmarks/bench_templates.py [books] [runs]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from app import create_app
+from benchmarks.synthetic_data import seed
+from services.fragment_cache import fragment_cache
+from services.rate_limit import RateLimiter
+
+
+def measure(label: str, client, runs: int, before=None) -> None:
+    timings = []
+    for _ in range(runs):
+        if before:
+            before()
+        start = time.perf_counter()
+        response = client.get('/catalog')
+        timings.append(time.perf_counter() - start)
+        assert response.status_code == 200
+    timings.sort()
+    print(f'{label:8s} runs={runs:>4d}  best={timings[0] * 1000:8.1f} ms  '
+          f'median={timings[len(timings) // 2] * 1000:8.1f} ms  page={len(response.data) / 1024:8.0f} KiB')
+
+
+if __name__ == '__main__':
+    books = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, 'bench.db')
+        seed(db_path, books, patrons=1000, loans=books * 2)
+        database.DATABASE = db_path
+        app = create_app(seed_sample_data=False, defer_startup=False, rate_limiter=RateLimiter(store=None))
+        client = app.test_client()
+        client.get('/catalog')
+        measure('cold', client, runs, before=fragment_cache.clear)
+        measure('warm', client, runs)
+        print(fragment_cache.stats())
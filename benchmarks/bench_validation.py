@@ -0,0 +1,90 @@
+"""
+Per-row validation cost at bulk-import scale
+
+Times validate_book_rows against the checks it replaced (field checks,
+then normalize_isbn a second time and the old per-digit checksum) on
+synthetic import rows, a tenth of them invalid, plus the patron ID check.
+
+Usage:
+    python benchmarks/bench_validation.py [rows]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.isbn import isbn13_check_digit, normalize_isbn
+from services.validation import is_valid_patron_id, validate_book_rows
+
+
+def _isbn(n: int) -> str:
+    body = f'978{n:09d}'
+    isbn = body + isbn13_check_digit(body)
+    # Imports often carry hyphenated ISBNs
+    return f'{isbn[:3]}-{isbn[3:12]}-{isbn[12]}' if n % 2 else isbn
+
+
+def build_rows(count: int):
+    rows = []
+    for i in range(count):
+        row = {'title': f'  Title {i} ', 'author': f'Author {i % 1000}',
+               'isbn': _isbn(i), 'total_copies': 1 + i % 5}
+        if i % 10 == 0:
+            row[('title', 'isbn', 'total_copies')[i // 10 % 3]] = ('', '978', 0)[i // 10 % 3]
+        rows.append(row)
+    return rows
+
+
+def _old_check_digit(first12: str) -> str:
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(first12))
+    return str((10 - total % 10) % 10)
+
+
+def old_validate_rows(rows):
+    valid, errors = [], []
+    for index, row in enumerate(rows):
+        title, author, isbn, total_copies = row.get('title'), row.get('author'), row.get('isbn'), row.get('total_copies')
+        if not title or not title.strip() or len(title.strip()) > 200:
+            errors.append(index)
+        elif not author or not author.strip() or len(author.strip()) > 100:
+            errors.append(index)
+        elif normalize_isbn(isbn) is None:
+            errors.append(index)
+        elif not isinstance(total_copies, int) or total_copies <= 0:
+            errors.append(index)
+        else:
+            normalized = normalize_isbn(isbn)
+            if _old_check_digit(normalized[:12]) != normalized[12]:
+                errors.append(index)
+            else:
+                valid.append((index, (title.strip(), author.strip(), normalized, total_copies)))
+    return valid, errors
+
+
+def old_is_valid_patron_id(patron_id) -> bool:
+    return bool(patron_id) and len(patron_id) == 6 and patron_id.isdigit()
+
+
+def measure(label: str, func, items, repeat: int = 5) -> None:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(items)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f'{label:22s} rows={len(items):>8d}  best={best * 1000:8.1f} ms  '
+          f'per row={best / len(items) * 1e9:8.0f} ns')
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rows = build_rows(count)
+    assert len(validate_book_rows(rows)[0]) == len(old_validate_rows(rows)[0])
+    measure('book rows (before)', old_validate_rows, rows)
+    measure('book rows', validate_book_rows, rows)
+
+    patron_ids = [f'{i:06d}' if i % 10 else 'abc123' for i in range(count)]
+    measure('patron IDs (before)', lambda ids: [old_is_valid_patron_id(p) for p in ids], patron_ids)
+    measure('patron IDs', lambda ids: [is_valid_patron_id(p) for p in ids], patron_ids)
@@ -0,0 +1,304 @@
+"""
+Load test: concurrent virtual patrons driving the Flask routes over HTTP
+
+Each virtual user runs on its own thread with a persistent HTTP connection
+and picks scenarios by weight until the duration ends. Without --url the
+app is served in-process by werkzeug's threaded server against a freshly
+seeded synthetic database (see synthetic_data.py). In-process serving
+shares the GIL with the load generator, so point --url at a gunicorn
+deployment for realistic numbers.
+
+Responses with status >= 500 and connection failures count as errors;
+business rejections (e.g. a book with no copies left) are normal outcomes.
+
+Paying fees is a staff operation behind the admin token: against --url,
+set ADMIN_TOKEN (or --admin-token) to the server's token.
+
+Usage:
+    python benchmarks/load_test.py [--users 8] [--duration 15]
+        [--mix browse=3,search=4,borrow=1,return=1,pay=1] [--url http://host:port]
+        [--admin-token TOKEN]
+"""
+
+from typing import Dict, List, Optional
+from urllib.parse import urlencode, urlsplit
+import argparse
+import base64
+import http.client
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_data import patron_ids, seed
+
+DEFAULT_MIX = 'browse=3,search=4,borrow=1,return=1,pay=1'
+SEARCH_TERMS = ('river', 'garden', 'night', 'golden', 'empire', 'hopper', 'knuth', 'silent')
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def flashed_category(set_cookie: Optional[str]) -> Optional[str]:
+    """
+    Category of the first message flashed into a Flask session cookie.
+
+    The form routes redirect whatever the outcome and report it with
+    flash(); the cookie payload is readable without the signing key.
+    """
+    if not set_cookie or 'session=' not in set_cookie:
+        return None
+    value = set_cookie.split('session=', 1)[1].split(';', 1)[0]
+    compressed = value.startswith('.')
+    payload = value.lstrip('.').split('.', 1)[0]
+    try:
+        data = base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4))
+        session = json.loads(zlib.decompress(data) if compressed else data)
+        return session['_flashes'][0][' t'][0]
+    except (ValueError, KeyError, IndexError, TypeError, zlib.error):
+        return None
+
+
+class VirtualUser:
+    """One simulated patron with a keep-alive connection."""
+
+    def __init__(self, host: str, port: int, patron_id: str, book_count: int, rng: random.Random,
+                 admin_token: Optional[str] = None):
+        self.host = host
+        self.port = port
+        self.patron_id = patron_id
+        self.book_count = book_count
+        self.rng = rng
+        self.admin_token = admin_token
+        self.borrowed: List[int] = []
+        self.conn: Optional[http.client.HTTPConnection] = None
+        self.last_set_cookie: Optional[str] = None
+
+    def request(self, method: str, path: str, body: Optional[Dict] = None, as_json: bool = False,
+                headers: Optional[Dict[str, str]] = None) -> int:
+        headers = dict(headers or {})
+        payload = None
+        if body is not None:
+            if as_json:
+                payload = json.dumps(body)
+                headers['Content-Type'] = 'application/json'
+            else:
+                payload = urlencode(body)
+                headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        for attempt in (1, 2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            try:
+                self.conn.request(method, path, body=payload, headers=headers)
+                response = self.conn.getresponse()
+                response.read()
+                self.last_set_cookie = response.getheader('Set-Cookie')
+                if response.getheader('Connection', '').lower() == 'close':
+                    self.conn.close()
+                    self.conn = None
+                return response.status
+            except (http.client.HTTPException, OSError):
+                self.conn.close()
+                self.conn = None
+                # A kept-alive connection closed by the server: retry once on a new one
+                if attempt == 2:
+                    raise
+
+    def browse(self) -> int:
+        return self.request('GET', '/catalog')
+
+    def search(self) -> int:
+        term = self.rng.choice(SEARCH_TERMS)
+        if self.rng.random() < 0.5:
+            return self.request('GET', '/search?' + urlencode({'q': term, 'type': 'title'}))
+        return self.request('GET', '/api/search?' + urlencode({'q': term, 'type': 'author'}))
+
+    def borrow(self) -> int:
+        book_id = self.rng.randint(1, self.book_count)
+        status = self.request('POST', '/borrow', {'patron_id': self.patron_id, 'book_id': book_id})
+        # Only successful borrows can be returned later
+        if status == 302 and flashed_category(self.last_set_cookie) == 'success':
+            self.borrowed.append(book_id)
+        return status
+
+    def return_book(self) -> int:
+        if self.borrowed:
+            book_id = self.borrowed.pop(self.rng.randrange(len(self.borrowed)))
+        else:
+            book_id = self.rng.randint(1, self.book_count)
+        return self.request('POST', '/return', {'patron_id': self.patron_id, 'book_id': book_id})
+
+    def pay(self) -> int:
+        amount = round(self.rng.uniform(0.5, 5.0), 2)
+        headers = {'X-Admin-Token': self.admin_token} if self.admin_token else None
+        return self.request('POST', '/api/pay_fees', {'patron_id': self.patron_id, 'amount': amount},
+                            as_json=True, headers=headers)
+
+
+SCENARIOS = {
+    'browse': VirtualUser.browse,
+    'search': VirtualUser.search,
+    'borrow': VirtualUser.borrow,
+    'return': VirtualUser.return_book,
+    'pay': VirtualUser.pay,
+}
+
+
+def parse_mix(mix: str) -> Dict[str, int]:
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in SCENARIOS:
+            raise ValueError(f'Unknown scenario {name!r}; choose from {", ".join(SCENARIOS)}')
+        weights[name.strip()] = int(weight or 1)
+    return weights
+
+
+def run(host: str, port: int, users: int, duration: float, weights: Dict[str, int],
+        patrons: List[str], book_count: int, admin_token: Optional[str] = None) -> Dict:
+    """Drive the server and return per-scenario latencies and error counts."""
+    names = list(weights)
+    weight_list = [weights[name] for name in names]
+    results = {name: {'latencies': [], 'errors': 0, 'statuses': {}} for name in names}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(index: int) -> None:
+        rng = random.Random(index)
+        user = VirtualUser(host, port, patrons[index % len(patrons)], book_count, rng, admin_token)
+        local = {name: ([], 0, {}) for name in names}
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights=weight_list)[0]
+            start = time.perf_counter()
+            try:
+                status = SCENARIOS[name](user)
+            except (http.client.HTTPException, OSError):
+                status = None
+            elapsed = time.perf_counter() - start
+            latencies, errors, statuses = local[name]
+            latencies.append(elapsed)
+            statuses[status] = statuses.get(status, 0) + 1
+            if status is None or status >= 500:
+                local[name] = (latencies, errors + 1, statuses)
+        with lock:
+            for name, (latencies, errors, statuses) in local.items():
+                results[name]['latencies'].extend(latencies)
+                results[name]['errors'] += errors
+                for status, count in statuses.items():
+                    results[name]['statuses'][status] = results[name]['statuses'].get(status, 0) + count
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {'elapsed': time.perf_counter() - started, 'scenarios': results}
+
+
+def summarize(results: Dict) -> Dict:
+    elapsed = results['elapsed']
+    rows = {}
+    everything = []
+    total_errors = 0
+    for name, data in results['scenarios'].items():
+        latencies = sorted(data['latencies'])
+        everything.extend(latencies)
+        total_errors += data['errors']
+        rows[name] = _row(latencies, data['errors'], elapsed)
+        rows[name]['statuses'] = {str(status): count for status, count in sorted(data['statuses'].items(), key=str)}
+    rows['total'] = _row(sorted(everything), total_errors, elapsed)
+    return rows
+
+
+def _row(latencies: List[float], errors: int, elapsed: float) -> Dict:
+    count = len(latencies)
+    return {
+        'requests': count,
+        'rps': count / elapsed if elapsed else 0.0,
+        'error_rate': errors / count if count else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p90_ms': percentile(latencies, 90) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'max_ms': (latencies[-1] if latencies else 0.0) * 1000,
+    }
+
+
+def print_report(rows: Dict) -> None:
+    print(f'{"scenario":10s} {"requests":>9s} {"req/s":>8s} {"errors":>7s} '
+          f'{"p50":>8s} {"p90":>8s} {"p95":>8s} {"p99":>8s} {"max":>8s}  (ms)')
+    for name, row in rows.items():
+        print(f'{name:10s} {row["requests"]:>9d} {row["rps"]:>8.1f} {row["error_rate"]:>6.1%} '
+              f'{row["p50_ms"]:>8.1f} {row["p90_ms"]:>8.1f} {row["p95_ms"]:>8.1f} '
+              f'{row["p99_ms"]:>8.1f} {row["max_ms"]:>8.1f}')
+
+
+def serve_locally(db_path: str, books: int, patrons: int, loans: int):
+    """Seed a synthetic database and serve the app on an ephemeral port."""
+    from werkzeug.serving import make_server
+    import logging
+    import database
+    from app import create_app
+    from services.batch_jobs import FeeAccrualJob
+    from services.rate_limit import RateLimiter
+
+    seed(db_path, books, patrons, loans)
+    database.DATABASE = db_path
+    # Charge the overdue loans so the pay scenario has balances to pay against
+    FeeAccrualJob().run()
+    # Every simulated user shares one IP, so per-client rate limits stay off;
+    # load shedding still applies
+    app = create_app(seed_sample_data=False, defer_startup=False, rate_limiter=RateLimiter(store=None))
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test the library app over HTTP.')
+    parser.add_argument('--url', help='Target an already running server (seeded with synthetic_data.py)')
+    parser.add_argument('--users', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=15.0, help='Seconds to run')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='Scenario weights, e.g. browse=3,search=4')
+    parser.add_argument('--books', type=int, default=5000, help='Synthetic books (and book ID range)')
+    parser.add_argument('--patrons', type=int, default=1000, help='Synthetic patrons')
+    parser.add_argument('--loans', type=int, default=20000, help='Synthetic loans (local server only)')
+    parser.add_argument('--admin-token', default=os.environ.get('ADMIN_TOKEN'),
+                        help='Sent with fee payments (default: $ADMIN_TOKEN)')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args()
+
+    weights = parse_mix(args.mix)
+    with tempfile.TemporaryDirectory() as tmp:
+        server = None
+        if args.url:
+            target = urlsplit(args.url)
+            host, port = target.hostname, target.port or 80
+        else:
+            server = serve_locally(os.path.join(tmp, 'load_test.db'), args.books, args.patrons, args.loans)
+            host, port = '127.0.0.1', server.server_port
+
+        results = run(host, port, args.users, args.duration, weights, patron_ids(args.patrons), args.books,
+                      args.admin_token)
+        if server is not None:
+            server.shutdown()
+
+    rows = summarize(results)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_report(rows)
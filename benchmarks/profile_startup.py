@@ -0,0 +1,87 @@
+"""
+Cold-start profile: import-time breakdown and time to first response
+
+Every measurement runs in a fresh interpreter so module caches do not hide
+import costs. The import breakdown comes from `python -X importtime`.
+
+Usage:
+    python benchmarks/profile_startup.py [repeats] [top]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each snippet prints the seconds it took, measured inside the child process
+SCENARIOS = {
+    'import app': '''
+import time; start = time.perf_counter()
+import app
+print(time.perf_counter() - start)
+''',
+    'create_app (deferred)': '''
+import time; start = time.perf_counter()
+from app import create_app
+create_app()
+print(time.perf_counter() - start)
+''',
+    'create_app (eager)': '''
+import time; start = time.perf_counter()
+from app import create_app
+create_app(defer_startup=False)
+print(time.perf_counter() - start)
+''',
+    'first response': '''
+import time; start = time.perf_counter()
+from app import create_app
+create_app().test_client().get('/catalog')
+print(time.perf_counter() - start)
+''',
+}
+
+
+def run_child(code: str, db_path: str, importtime: bool = False) -> subprocess.CompletedProcess:
+    setup = f'import database; database.DATABASE = {db_path!r}\n'
+    args = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', setup + code]
+    return subprocess.run(args, cwd=ROOT, capture_output=True, text=True, check=True)
+
+
+def import_breakdown(db_path: str, top: int) -> None:
+    """Print the slowest top-level packages and modules by cumulative import time."""
+    stderr = run_child(SCENARIOS['create_app (deferred)'], db_path, importtime=True).stderr
+    packages = {}
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, self_us, cumulative_us, name = [part.strip() for part in line.replace('import time:', '|').split('|')]
+        modules.append((int(cumulative_us), name))
+        if not name.startswith(' ') and '.' not in name.strip():
+            packages[name.strip()] = int(cumulative_us)
+
+    print('Top-level imports (cumulative):')
+    for name, micros in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f'  {name:32s} {micros / 1000:8.1f} ms')
+    print('Slowest modules (cumulative):')
+    for micros, name in sorted(modules, reverse=True)[:top]:
+        print(f'  {name.strip():32s} {micros / 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    top = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'profile.db')
+        # Initialize once so the scenarios measure a restart, not a first deploy
+        run_child(SCENARIOS['create_app (eager)'], db_path)
+
+        for label, code in SCENARIOS.items():
+            timings = [float(run_child(code, db_path).stdout.split()[-1]) for _ in range(repeats)]
+            print(f'{label:24s} runs={repeats:>3d}  median={statistics.median(timings) * 1000:8.1f} ms  '
+                  f'best={min(timings) * 1000:8.1f} ms')
+        print()
+        import_breakdown(db_path, top)
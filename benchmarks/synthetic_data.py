@@ -0,0 +1,112 @@
+"""
+Synthetic dataset for benchmarks and load tests
+
+Fills a database with books, patrons' active and returned loans (some
+overdue) and keeps available_copies consistent with the active loans.
+Patron IDs are consecutive from FIRST_PATRON_ID.
+
+Usage:
+    python benchmarks/synthetic_data.py library_synthetic.db [books] [patrons] [loans]
+"""
+
+from datetime import datetime, timedelta
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from models import to_timestamp
+from services.isbn import isbn13_check_digit
+
+FIRST_PATRON_ID = 100000
+
+_WORDS = ('Silent', 'River', 'Garden', 'Empire', 'Shadow', 'Winter', 'Glass', 'Ocean', 'Night',
+          'Iron', 'Paper', 'Golden', 'Hidden', 'Last', 'Broken', 'Distant', 'Crimson', 'Quiet')
+_FIRST_NAMES = ('Ada', 'Alan', 'Grace', 'Edsger', 'Barbara', 'Donald', 'Frances', 'Ken', 'Radia', 'Tim')
+_LAST_NAMES = ('Lovelace', 'Turing', 'Hopper', 'Dijkstra', 'Liskov', 'Knuth', 'Allen', 'Thompson', 'Perlman', 'Lee')
+
+
+def patron_ids(patrons: int):
+    """The patron IDs a dataset of this size uses."""
+    return [str(FIRST_PATRON_ID + i) for i in range(patrons)]
+
+
+def _isbn(n: int) -> str:
+    body = f'978{n:09d}'
+    return body + isbn13_check_digit(body)
+
+
+def seed(db_path: str, books: int = 5000, patrons: int = 1000, loans: int = 20000, seed_value: int = 327) -> None:
+    """
+    Create (or extend) a database with synthetic catalog and loan data.
+
+    About a third of the loans are still active, borrowed within the last
+    20 days so roughly a quarter of them are overdue. Loans only go out
+    while a copy is available.
+    """
+    rng = random.Random(seed_value)
+    database.DATABASE = db_path
+    database.init_database()
+
+    conn = database.get_db_connection()
+    start_id = conn.execute('SELECT COALESCE(MAX(id), 0) AS max_id FROM books').fetchone()['max_id']
+    book_rows = []
+    available = {}
+    for i in range(1, books + 1):
+        book_id = start_id + i
+        copies = rng.randint(1, 5)
+        title = ' '.join(rng.sample(_WORDS, rng.randint(2, 4))) + f' {book_id}'
+        author = f'{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}'
+        isbn = _isbn(book_id)
+        book_rows.append((book_id, title, author, isbn, copies, copies, isbn))
+        available[book_id] = copies
+
+    now = datetime.now()
+    patrons_list = patron_ids(patrons)
+    loan_rows = []
+    for _ in range(loans):
+        book_id = rng.randint(start_id + 1, start_id + books)
+        active = rng.random() < 0.33 and available[book_id] > 0
+        borrowed = now - timedelta(days=rng.randint(0, 20 if active else 365), minutes=rng.randint(0, 1440))
+        due = borrowed + timedelta(days=14)
+        returned = None
+        if active:
+            available[book_id] -= 1
+        else:
+            returned = min(borrowed + timedelta(days=rng.randint(1, 20)), now)
+        loan_rows.append((
+            rng.choice(patrons_list), book_id,
+            borrowed.isoformat(), due.isoformat(), returned.isoformat() if returned else None,
+            to_timestamp(borrowed), to_timestamp(due), to_timestamp(returned) if returned else None
+        ))
+
+    conn.executemany(
+        '''INSERT INTO books (id, title, author, isbn, total_copies, available_copies, isbn_normalized)
+           VALUES (?, ?, ?, ?, ?, ?, ?)''',
+        book_rows
+    )
+    conn.executemany(
+        '''INSERT INTO borrow_records
+           (patron_id, book_id, borrow_date, due_date, return_date, borrow_ts, due_ts, return_ts)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+        loan_rows
+    )
+    conn.executemany(
+        'UPDATE books SET available_copies = ? WHERE id = ?',
+        [(copies, book_id) for book_id, copies in available.items()]
+    )
+    database.write_missing_copies(conn, start_id)
+    conn.commit()
+    conn.close()
+    database.notify_catalog_change('reset')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    counts = [int(arg) for arg in sys.argv[2:5]]
+    seed(sys.argv[1], *counts)
+    print(f'Seeded {sys.argv[1]}')
@@ -3,22 +3,51 @@ Database module for Library Management System
 Handles all database operations and connections
 """
 
+import json
 import sqlite3
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
+
+from models import (
+    BOOK_COLUMNS, BORROW_RECORD_COLUMNS, SECONDS_PER_DAY, Book, BorrowRecord,
+    epoch_day, to_timestamp
+)
+from services.isbn import normalize_isbn
+from services.query_log import query_log
 
 # Database configuration
 DATABASE = 'library.db'
 
+# Bumped whenever init_database gains tables, columns or migrations; stored
+# in PRAGMA user_version so ensure_database can skip an up-to-date file
+SCHEMA_VERSION = 9
+
+# Callbacks run after catalog writes, called as listener(event, book_id).
+# Events: 'insert' (new book), 'availability' (copies changed), 'reset' (drop everything)
+_catalog_listeners: List[Callable[[str, Optional[int]], None]] = []
+
+def register_catalog_listener(listener: Callable[[str, Optional[int]], None]) -> None:
+    """Register a callback to be notified about catalog changes."""
+    if listener not in _catalog_listeners:
+        _catalog_listeners.append(listener)
+
+def notify_catalog_change(event: str, book_id: Optional[int] = None) -> None:
+    """Notify registered listeners that the catalog changed."""
+    for listener in list(_catalog_listeners):
+        listener(event, book_id)
+
 def get_db_connection():
     """Get a database connection."""
-    conn = sqlite3.connect(DATABASE)
+    conn = sqlite3.connect(DATABASE, factory=query_log.connection_factory())
     conn.row_factory = sqlite3.Row  # This enables column access by name
     return conn
 
 def init_database():
     """Initialize the database with required tables."""
     conn = get_db_connection()
+    # One transaction for all DDL and migrations: concurrent initializers
+    # (e.g. several workers starting at once) run one after another
+    conn.execute('BEGIN IMMEDIATE')
     
     # Create books table
     conn.execute('''
@@ -28,7 +57,8 @@ def init_database():
             author TEXT NOT NULL,
             isbn TEXT UNIQUE NOT NULL,
             total_copies INTEGER NOT NULL,
-            available_copies INTEGER NOT NULL
+            available_copies INTEGER NOT NULL,
+            isbn_normalized TEXT
         )
     ''')
     
@@ -41,16 +71,427 @@ def init_database():
             borrow_date TEXT NOT NULL,
             due_date TEXT NOT NULL,
             return_date TEXT,
+            borrow_ts INTEGER,
+            due_ts INTEGER,
+            return_ts INTEGER,
+            FOREIGN KEY (book_id) REFERENCES books (id)
+        )
+    ''')
+    
+    # Create borrow_records_archive table (returned loans moved out of the
+    # hot table by the archive_loans job; ids are kept)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS borrow_records_archive (
+            id INTEGER PRIMARY KEY,
+            patron_id TEXT NOT NULL,
+            book_id INTEGER NOT NULL,
+            borrow_date TEXT NOT NULL,
+            due_date TEXT NOT NULL,
+            return_date TEXT NOT NULL,
+            borrow_ts INTEGER NOT NULL,
+            due_ts INTEGER NOT NULL,
+            return_ts INTEGER NOT NULL,
+            archived_ts INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_archive_patron
+        ON borrow_records_archive (patron_id, borrow_ts)
+    ''')
+    
+    # Create holds table (waitlist per book, ordered by position)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS holds (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            book_id INTEGER NOT NULL,
+            patron_id TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            created_ts INTEGER NOT NULL,
+            ready_ts INTEGER,
+            FOREIGN KEY (book_id) REFERENCES books (id)
+        )
+    ''')
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_holds_book_position ON holds (book_id, position)')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_holds_waiting
+        ON holds (book_id, position) WHERE status = 'waiting'
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_holds_patron ON holds (patron_id, status)')
+    
+    # Create fee_ledger table (amounts in cents; charges are positive)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS fee_ledger (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            patron_id TEXT NOT NULL,
+            borrow_record_id INTEGER,
+            entry_type TEXT NOT NULL,
+            amount_cents INTEGER NOT NULL,
+            reference TEXT,
+            created_ts INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_fee_ledger_loan ON fee_ledger (borrow_record_id, entry_type)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_fee_ledger_patron ON fee_ledger (patron_id, created_ts)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_fee_ledger_reference ON fee_ledger (reference, entry_type)')
+    
+    # Create patron_balances table (running balance maintained with each ledger entry)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS patron_balances (
+            patron_id TEXT PRIMARY KEY,
+            balance_cents INTEGER NOT NULL,
+            updated_ts INTEGER NOT NULL
+        )
+    ''')
+    
+    # Create overdue_notices table (at most one notice per loan per day)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS overdue_notices (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            borrow_record_id INTEGER NOT NULL,
+            patron_id TEXT NOT NULL,
+            notice_day INTEGER NOT NULL,
+            days_overdue INTEGER NOT NULL,
+            fee_cents INTEGER NOT NULL,
+            sent_ts INTEGER,
+            UNIQUE (borrow_record_id, notice_day)
+        )
+    ''')
+    
+    # Create copies table (one row per physical copy; the number of
+    # 'available' copies matches books.available_copies)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS copies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            book_id INTEGER NOT NULL,
+            barcode TEXT UNIQUE NOT NULL,
+            branch TEXT NOT NULL DEFAULT 'main',
+            status TEXT NOT NULL,
+            updated_ts INTEGER NOT NULL,
             FOREIGN KEY (book_id) REFERENCES books (id)
         )
     ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_copies_book_status ON copies (book_id, status)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_copies_branch_status ON copies (branch, status, book_id)')
+    
+    # Create events table (append-only change feed; id is the consumers' cursor)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_type TEXT NOT NULL,
+            book_id INTEGER,
+            patron_id TEXT,
+            payload TEXT NOT NULL,
+            created_ts INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_events_type ON events (event_type, id)')
+    
+    # Create daily_circulation table (per-day, per-book rollup of loan
+    # activity, maintained from events by services/analytics.py)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS daily_circulation (
+            day INTEGER NOT NULL,
+            book_id INTEGER NOT NULL,
+            loans INTEGER NOT NULL DEFAULT 0,
+            returns INTEGER NOT NULL DEFAULT 0,
+            overdue_returns INTEGER NOT NULL DEFAULT 0,
+            loan_seconds INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, book_id)
+        ) WITHOUT ROWID
+    ''')
     
+    # Create rollup_cursors table (last event folded into each rollup)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS rollup_cursors (
+            name TEXT PRIMARY KEY,
+            last_event_id INTEGER NOT NULL
+        )
+    ''')
+    
+    # Create book_recommendations table (top co-borrowed books per book,
+    # rebuilt by the build_recommendations job)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS book_recommendations (
+            book_id INTEGER NOT NULL,
+            rank INTEGER NOT NULL,
+            recommended_book_id INTEGER NOT NULL,
+            co_borrows INTEGER NOT NULL,
+            PRIMARY KEY (book_id, rank)
+        ) WITHOUT ROWID
+    ''')
+    
+    # Create settings table (admin runtime settings shared by all workers,
+    # see services/runtime_settings.py)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS settings (
+            name TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            updated_ts INTEGER NOT NULL
+        )
+    ''')
+    
+    # Create job_runs table (batch job checkpoints)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS job_runs (
+            job_name TEXT NOT NULL,
+            run_key TEXT NOT NULL,
+            status TEXT NOT NULL,
+            last_id INTEGER NOT NULL DEFAULT 0,
+            processed INTEGER NOT NULL DEFAULT 0,
+            started_ts INTEGER NOT NULL,
+            finished_ts INTEGER,
+            watermark INTEGER,
+            PRIMARY KEY (job_name, run_key)
+        )
+    ''')
+    
+    _migrate_isbn_normalized(conn)
+    _migrate_integer_dates(conn)
+    _migrate_patron_balances(conn)
+    _migrate_copies(conn)
+    _migrate_books_updated_ts(conn)
+    if 'watermark' not in _table_columns(conn, 'job_runs'):
+        conn.execute('ALTER TABLE job_runs ADD COLUMN watermark INTEGER')
+    
+    conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
     conn.commit()
     conn.close()
 
+def get_schema_version() -> int:
+    """Return the schema version recorded in the database file."""
+    conn = get_db_connection()
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    conn.close()
+    return version
+
+def ensure_database() -> bool:
+    """
+    Initialize the database only if its schema is out of date.
+    
+    Cheap enough to call on every app creation: an up-to-date database costs
+    a single PRAGMA read instead of re-running the DDL and migrations.
+    
+    Returns:
+        bool: True if init_database ran
+    """
+    if get_schema_version() >= SCHEMA_VERSION:
+        return False
+    init_database()
+    return True
+
+def _table_columns(conn, table: str) -> List[str]:
+    """Return the column names of a table."""
+    return [row['name'] for row in conn.execute(f'PRAGMA table_info({table})').fetchall()]
+
+def _migrate_isbn_normalized(conn):
+    """Add and backfill the canonical ISBN-13 column used for lookups."""
+    if 'isbn_normalized' not in _table_columns(conn, 'books'):
+        conn.execute('ALTER TABLE books ADD COLUMN isbn_normalized TEXT')
+    
+    rows = conn.execute('SELECT id, isbn FROM books WHERE isbn_normalized IS NULL').fetchall()
+    conn.executemany(
+        'UPDATE books SET isbn_normalized = ? WHERE id = ?',
+        [(normalize_isbn(row['isbn']) or row['isbn'], row['id']) for row in rows]
+    )
+    
+    try:
+        conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_books_isbn_normalized ON books (isbn_normalized)')
+    except sqlite3.IntegrityError:
+        # Legacy duplicates: keep lookups indexed until they are cleaned up
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_books_isbn_normalized_dup ON books (isbn_normalized)')
+
+# SQL expression decoding an ISO date/datetime column into a to_timestamp() value
+_ISO_TO_TS = "CAST(strftime('%s', substr({0}, 1, 19)) AS INTEGER)"
+
+def _migrate_integer_dates(conn):
+    """
+    Add and backfill integer timestamp columns for borrow_records.
+    
+    borrow_ts/due_ts/return_ts hold to_timestamp() values and are what all
+    queries filter on. The ISO text columns are still written for
+    readability; triggers fill the integer columns for writers that only
+    set the text columns.
+    """
+    columns = _table_columns(conn, 'borrow_records')
+    for column in ('borrow_ts', 'due_ts', 'return_ts'):
+        if column not in columns:
+            conn.execute(f'ALTER TABLE borrow_records ADD COLUMN {column} INTEGER')
+    
+    conn.execute(f'''
+        UPDATE borrow_records
+        SET borrow_ts = {_ISO_TO_TS.format('borrow_date')}, due_ts = {_ISO_TO_TS.format('due_date')}
+        WHERE due_ts IS NULL
+    ''')
+    conn.execute(f'''
+        UPDATE borrow_records SET return_ts = {_ISO_TO_TS.format('return_date')}
+        WHERE return_date IS NOT NULL AND return_ts IS NULL
+    ''')
+    
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_borrow_records_ts_insert
+        AFTER INSERT ON borrow_records WHEN NEW.due_ts IS NULL
+        BEGIN
+            UPDATE borrow_records
+            SET borrow_ts = {_ISO_TO_TS.format('NEW.borrow_date')}, due_ts = {_ISO_TO_TS.format('NEW.due_date')}
+            WHERE id = NEW.id;
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_borrow_records_ts_return
+        AFTER UPDATE OF return_date ON borrow_records
+        WHEN NEW.return_date IS NOT NULL AND NEW.return_ts IS NULL
+        BEGIN
+            UPDATE borrow_records SET return_ts = {_ISO_TO_TS.format('NEW.return_date')} WHERE id = NEW.id;
+        END
+    ''')
+    
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_active
+        ON borrow_records (patron_id, book_id) WHERE return_ts IS NULL
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_due
+        ON borrow_records (due_ts) WHERE return_ts IS NULL
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_patron_history
+        ON borrow_records (patron_id, borrow_ts)
+    ''')
+
+def _migrate_patron_balances(conn):
+    """Seed running balances from ledger entries written before balances existed."""
+    if conn.execute('SELECT 1 FROM patron_balances LIMIT 1').fetchone():
+        return
+    conn.execute('''
+        INSERT INTO patron_balances (patron_id, balance_cents, updated_ts)
+        SELECT patron_id,
+               SUM(CASE WHEN entry_type = 'payment' THEN -amount_cents ELSE amount_cents END),
+               MAX(created_ts)
+        FROM fee_ledger
+        GROUP BY patron_id
+    ''')
+
+def _migrate_copies(conn):
+    """Add the loan -> copy link and record copies for books that have none yet."""
+    if 'copy_id' not in _table_columns(conn, 'borrow_records'):
+        conn.execute('ALTER TABLE borrow_records ADD COLUMN copy_id INTEGER')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_copy
+        ON borrow_records (copy_id) WHERE return_ts IS NULL
+    ''')
+    write_missing_copies(conn)
+
+# SQL expression for the current time as a to_timestamp() value
+_NOW_TS = "CAST(strftime('%s', 'now', 'localtime') AS INTEGER)"
+
+_BOOK_TOUCH_TRIGGERS = {
+    'trg_books_touch_counters': ('AFTER UPDATE OF total_copies, available_copies ON books', 'NEW.id'),
+    'trg_borrow_records_touch_insert': ('AFTER INSERT ON borrow_records', 'NEW.book_id'),
+    'trg_borrow_records_touch_return': ('AFTER UPDATE OF return_ts ON borrow_records', 'NEW.book_id'),
+    'trg_borrow_records_touch_delete': ('AFTER DELETE ON borrow_records WHEN OLD.return_ts IS NULL', 'OLD.book_id'),
+    'trg_holds_touch_status': ('AFTER UPDATE OF status ON holds', 'NEW.book_id'),
+}
+
+def _migrate_books_updated_ts(conn):
+    """
+    Add books.updated_ts and books.change_seq, stamped by triggers whenever
+    anything that determines a book's availability changes: its counters,
+    its loans or its holds. Lets reconciliation re-check only books changed
+    since its last run, whichever code path made the change.
+    
+    change_seq is one more than the largest in the table. Writers are
+    serialized, so unlike the wall clock it only ever increases in commit
+    order, which makes it safe to use as a cursor.
+    """
+    columns = _table_columns(conn, 'books')
+    if 'updated_ts' not in columns:
+        conn.execute('ALTER TABLE books ADD COLUMN updated_ts INTEGER')
+    if 'change_seq' not in columns:
+        conn.execute('ALTER TABLE books ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0')
+        # Triggers from before change_seq existed only set updated_ts
+        for name in _BOOK_TOUCH_TRIGGERS:
+            conn.execute(f'DROP TRIGGER IF EXISTS {name}')
+    conn.execute('DROP INDEX IF EXISTS idx_books_updated_ts')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_books_change_seq ON books (change_seq)')
+    
+    for name, (event, book_id) in _BOOK_TOUCH_TRIGGERS.items():
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {name}
+            {event}
+            BEGIN
+                UPDATE books SET updated_ts = {_NOW_TS},
+                                 change_seq = (SELECT MAX(change_seq) FROM books) + 1
+                WHERE id = {book_id};
+            END
+        ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_book_active
+        ON borrow_records (book_id) WHERE return_ts IS NULL
+    ''')
+
+def copy_barcode(book_id: int, number: int) -> str:
+    """Default barcode of a book's n-th copy."""
+    return f'{book_id:06d}-{number:03d}'
+
+def write_missing_copies(conn, after_book_id: int = 0) -> int:
+    """
+    Record copies for books (with id > after_book_id) that have none yet.
+    
+    Runs in the caller's transaction. Each book gets total_copies copies:
+    one per active loan (linked through borrow_records.copy_id), one per
+    ready hold, then available_copies on the shelf; copies the counters
+    do not account for are marked 'missing'.
+    
+    Returns:
+        int: number of copies written
+    """
+    books = conn.execute('''
+        SELECT id, total_copies, available_copies FROM books b
+        WHERE id > ? AND NOT EXISTS (SELECT 1 FROM copies c WHERE c.book_id = b.id)
+        ORDER BY id
+    ''', (after_book_id,)).fetchall()
+    if not books:
+        return 0
+    
+    loans: Dict[int, List[int]] = {}
+    for row in conn.execute('''
+        SELECT id, book_id FROM borrow_records
+        WHERE book_id > ? AND return_ts IS NULL AND copy_id IS NULL
+        ORDER BY borrow_ts, id
+    ''', (after_book_id,)).fetchall():
+        loans.setdefault(row['book_id'], []).append(row['id'])
+    ready_holds = {row['book_id']: row['count'] for row in conn.execute('''
+        SELECT book_id, COUNT(*) AS count FROM holds
+        WHERE book_id > ? AND status = 'ready'
+        GROUP BY book_id
+    ''', (after_book_id,)).fetchall()}
+    
+    now_ts = to_timestamp(datetime.now())
+    written = 0
+    for book in books:
+        book_id, total = book['id'], book['total_copies']
+        book_loans = loans.get(book_id, [])[:total]
+        statuses = ['on_loan'] * len(book_loans)
+        statuses += ['held'] * min(ready_holds.get(book_id, 0), total - len(statuses))
+        statuses += ['available'] * min(max(book['available_copies'], 0), total - len(statuses))
+        statuses += ['missing'] * (total - len(statuses))
+    
+        for number, status in enumerate(statuses, start=1):
+            copy_id = conn.execute(
+                'INSERT INTO copies (book_id, barcode, status, updated_ts) VALUES (?, ?, ?, ?)',
+                (book_id, copy_barcode(book_id, number), status, now_ts)
+            ).lastrowid
+            if number <= len(book_loans):
+                conn.execute('UPDATE borrow_records SET copy_id = ? WHERE id = ?', (copy_id, book_loans[number - 1]))
+        written += len(statuses)
+    return written
+    
 def add_sample_data():
     """Add sample data to the database if it's empty."""
     conn = get_db_connection()
+    # Hold the write lock across the emptiness check so only one process seeds
+    conn.execute('BEGIN IMMEDIATE')
     book_count = conn.execute('SELECT COUNT(*) as count FROM books').fetchone()['count']
     
     if book_count == 0:
@@ -63,79 +504,116 @@ def add_sample_data():
         
         for title, author, isbn, copies in sample_books:
             conn.execute('''
-                INSERT INTO books (title, author, isbn, total_copies, available_copies)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (title, author, isbn, copies, copies))
+                INSERT INTO books (title, author, isbn, total_copies, available_copies, isbn_normalized)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (title, author, isbn, copies, copies, isbn))
         
         # Make 1984 unavailable by adding a borrow record
+        borrow_date = datetime.now() - timedelta(days=5)
+        due_date = datetime.now() + timedelta(days=9)
         conn.execute('''
-            INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
-            VALUES (?, ?, ?, ?)
-        ''', ('123456', 3, 
-              (datetime.now() - timedelta(days=5)).isoformat(),
-              (datetime.now() + timedelta(days=9)).isoformat()))
+            INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date, borrow_ts, due_ts)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', ('123456', 3, borrow_date.isoformat(), due_date.isoformat(),
+              to_timestamp(borrow_date), to_timestamp(due_date)))
         
         # Update available copies for 1984
         conn.execute('UPDATE books SET available_copies = 0 WHERE id = 3')
-        
-        conn.commit()
+        write_missing_copies(conn)
     
+    conn.commit()
     conn.close()
 
 # Helper Functions for Database Operations
 
-def get_all_books() -> List[Dict]:
+def fetch_records(conn, row_factory, sql: str, params: Tuple = ()) -> List:
+    """Run a query whose rows are built directly by a record row factory."""
+    cursor = conn.cursor()
+    cursor.row_factory = row_factory
+    return cursor.execute(sql, params).fetchall()
+
+def get_all_books() -> List[Book]:
     """Get all books from the database."""
     conn = get_db_connection()
-    books = conn.execute('SELECT * FROM books ORDER BY title').fetchall()
+    books = fetch_records(conn, Book.row_factory, f'SELECT {BOOK_COLUMNS} FROM books ORDER BY title')
     conn.close()
-    return [dict(book) for book in books]
+    return books
 
-def get_book_by_id(book_id: int) -> Optional[Dict]:
+def get_book_by_id(book_id: int) -> Optional[Book]:
     """Get a specific book by ID."""
     conn = get_db_connection()
-    book = conn.execute('SELECT * FROM books WHERE id = ?', (book_id,)).fetchone()
+    books = fetch_records(conn, Book.row_factory, f'SELECT {BOOK_COLUMNS} FROM books WHERE id = ?', (book_id,))
     conn.close()
-    return dict(book) if book else None
+    return books[0] if books else None
 
-def get_book_by_isbn(isbn: str) -> Optional[Dict]:
-    """Get a specific book by ISBN."""
+def get_book_recommendations(limit: int) -> Dict[int, Tuple[int, ...]]:
+    """Top `limit` co-borrowed book ids for every book that has recommendations, best first."""
     conn = get_db_connection()
-    book = conn.execute('SELECT * FROM books WHERE isbn = ?', (isbn,)).fetchone()
+    rows = conn.execute(
+        'SELECT book_id, recommended_book_id FROM book_recommendations WHERE rank <= ? ORDER BY book_id, rank',
+        (limit,)
+    ).fetchall()
     conn.close()
-    return dict(book) if book else None
+    recommendations: Dict[int, Tuple[int, ...]] = {}
+    for row in rows:
+        recommendations[row['book_id']] = recommendations.get(row['book_id'], ()) + (row['recommended_book_id'],)
+    return recommendations
 
-def get_patron_borrowed_books(patron_id: str) -> List[Dict]:
+def get_book_by_isbn(isbn: str) -> Optional[Book]:
+    """Get a specific book by ISBN (hyphenated, ISBN-10 or ISBN-13)."""
+    key = normalize_isbn(isbn) or (isbn or '').strip()
+    conn = get_db_connection()
+    books = fetch_records(conn, Book.row_factory, f'SELECT {BOOK_COLUMNS} FROM books WHERE isbn_normalized = ?', (key,))
+    conn.close()
+    return books[0] if books else None
+
+def get_patron_borrowed_books(patron_id: str) -> List[BorrowRecord]:
     """Get currently borrowed books for a patron."""
     conn = get_db_connection()
-    records = conn.execute('''
-        SELECT br.*, b.title, b.author 
+    records = fetch_records(conn, BorrowRecord.row_factory, f'''
+        SELECT {BORROW_RECORD_COLUMNS}
         FROM borrow_records br 
         JOIN books b ON br.book_id = b.id 
-        WHERE br.patron_id = ? AND br.return_date IS NULL
-        ORDER BY br.borrow_date
-    ''', (patron_id,)).fetchall()
+        WHERE br.patron_id = ? AND br.return_ts IS NULL
+        ORDER BY br.borrow_ts
+    ''', (patron_id,))
     conn.close()
-    
-    borrowed_books = []
-    for record in records:
-        borrowed_books.append({
-            'book_id': record['book_id'],
-            'title': record['title'],
-            'author': record['author'],
-            'borrow_date': datetime.fromisoformat(record['borrow_date']),
-            'due_date': datetime.fromisoformat(record['due_date']),
-            'is_overdue': datetime.now() > datetime.fromisoformat(record['due_date'])
-        })
-    
-    return borrowed_books
+    return records
+
+def get_archived_borrow_records(patron_id: str, limit: int, offset: int = 0) -> List[BorrowRecord]:
+    """Get a page of a patron's archived (returned) loans, newest first."""
+    conn = get_db_connection()
+    records = fetch_records(conn, BorrowRecord.row_factory, f'''
+        SELECT {BORROW_RECORD_COLUMNS}
+        FROM borrow_records_archive br
+        JOIN books b ON br.book_id = b.id
+        WHERE br.patron_id = ?
+        ORDER BY br.borrow_ts DESC
+        LIMIT ? OFFSET ?
+    ''', (patron_id, limit, offset))
+    conn.close()
+    return records
+
+def get_overdue_borrow_records(as_of: datetime) -> List[BorrowRecord]:
+    """Get all unreturned loans due before the start of as_of's day, oldest due first."""
+    start_of_day = epoch_day(as_of) * SECONDS_PER_DAY
+    conn = get_db_connection()
+    records = fetch_records(conn, BorrowRecord.row_factory, f'''
+        SELECT {BORROW_RECORD_COLUMNS}
+        FROM borrow_records br
+        JOIN books b ON br.book_id = b.id
+        WHERE br.return_ts IS NULL AND br.due_ts < ?
+        ORDER BY br.due_ts
+    ''', (start_of_day,))
+    conn.close()
+    return records
 
 def get_patron_borrow_count(patron_id: str) -> int:
     """Get the number of books currently borrowed by a patron."""
     conn = get_db_connection()
     count = conn.execute('''
         SELECT COUNT(*) as count FROM borrow_records 
-        WHERE patron_id = ? AND return_date IS NULL
+        WHERE patron_id = ? AND return_ts IS NULL
     ''', (patron_id,)).fetchone()['count']
     conn.close()
     return count
@@ -144,25 +622,91 @@ def insert_book(title: str, author: str, isbn: str, total_copies: int, available
     """Insert a new book into the database."""
     conn = get_db_connection()
     try:
-        conn.execute('''
-            INSERT INTO books (title, author, isbn, total_copies, available_copies)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (title, author, isbn, total_copies, available_copies))
+        cursor = conn.execute('''
+            INSERT INTO books (title, author, isbn, total_copies, available_copies, isbn_normalized)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (title, author, isbn, total_copies, available_copies, normalize_isbn(isbn) or isbn))
+        write_missing_copies(conn, cursor.lastrowid - 1)
+        write_event(conn, 'book.added', _book_added_payload(cursor.lastrowid, title, author, isbn, total_copies),
+                    book_id=cursor.lastrowid)
         conn.commit()
         conn.close()
+        notify_catalog_change('insert', cursor.lastrowid)
         return True
     except Exception as e:
         conn.close()
         return False
 
+def get_existing_isbns(normalized_isbns: List[str]) -> set:
+    """Return which of the given canonical ISBNs are already in the catalog."""
+    existing = set()
+    conn = get_db_connection()
+    for start in range(0, len(normalized_isbns), 500):
+        chunk = normalized_isbns[start:start + 500]
+        placeholders = ', '.join('?' * len(chunk))
+        rows = conn.execute(
+            f'SELECT isbn_normalized FROM books WHERE isbn_normalized IN ({placeholders})', chunk
+        ).fetchall()
+        existing.update(row['isbn_normalized'] for row in rows)
+    conn.close()
+    return existing
+
+def insert_books(books: List[Tuple[str, str, str, int]]) -> bool:
+    """Insert many (title, author, isbn, total_copies) rows in one transaction."""
+    conn = get_db_connection()
+    try:
+        last_id = conn.execute('SELECT COALESCE(MAX(id), 0) AS last_id FROM books').fetchone()['last_id']
+        conn.executemany('''
+            INSERT INTO books (title, author, isbn, total_copies, available_copies, isbn_normalized)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [(title, author, isbn, copies, copies, normalize_isbn(isbn) or isbn)
+              for title, author, isbn, copies in books])
+        write_missing_copies(conn, last_id)
+        for row in conn.execute('SELECT id, title, author, isbn, total_copies FROM books WHERE id > ? ORDER BY id',
+                                (last_id,)).fetchall():
+            write_event(conn, 'book.added', _book_added_payload(*row), book_id=row['id'])
+        conn.commit()
+        conn.close()
+        notify_catalog_change('reset')
+        return True
+    except Exception as e:
+        conn.rollback()
+        conn.close()
+        return False
+
+def write_event(conn, event_type: str, payload: Dict, book_id: Optional[int] = None,
+                patron_id: Optional[str] = None) -> int:
+    """
+    Append a change event on an open connection (caller commits), so the
+    event is visible exactly when the change it describes is.
+    
+    Returns:
+        int: the event id (consumers' cursor)
+    """
+    cursor = conn.execute(
+        'INSERT INTO events (event_type, book_id, patron_id, payload, created_ts) VALUES (?, ?, ?, ?, ?)',
+        (event_type, book_id, patron_id, json.dumps(payload, separators=(',', ':')), to_timestamp(datetime.now()))
+    )
+    return cursor.lastrowid
+
+def _book_added_payload(book_id: int, title: str, author: str, isbn: str, total_copies: int) -> Dict:
+    return {'book_id': book_id, 'title': title, 'author': author, 'isbn': isbn, 'total_copies': total_copies}
+
+def write_borrow_record(conn, patron_id: str, book_id: int, borrow_date: datetime, due_date: datetime,
+                        copy_id: Optional[int] = None) -> int:
+    """Insert a borrow record on an open connection (caller commits). Returns the new record id."""
+    cursor = conn.execute('''
+        INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date, borrow_ts, due_ts, copy_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', (patron_id, book_id, borrow_date.isoformat(), due_date.isoformat(),
+          to_timestamp(borrow_date), to_timestamp(due_date), copy_id))
+    return cursor.lastrowid
+
 def insert_borrow_record(patron_id: str, book_id: int, borrow_date: datetime, due_date: datetime) -> bool:
     """Insert a new borrow record into the database."""
     conn = get_db_connection()
     try:
-        conn.execute('''
-            INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
-            VALUES (?, ?, ?, ?)
-        ''', (patron_id, book_id, borrow_date.isoformat(), due_date.isoformat()))
+        write_borrow_record(conn, patron_id, book_id, borrow_date, due_date)
         conn.commit()
         conn.close()
         return True
@@ -179,6 +723,7 @@ def update_book_availability(book_id: int, change: int) -> bool:
         ''', (change, book_id))
         conn.commit()
         conn.close()
+        notify_catalog_change('availability', book_id)
         return True
     except Exception as e:
         conn.close()
@@ -190,9 +735,9 @@ def update_borrow_record_return_date(patron_id: str, book_id: int, return_date:
     try:
         conn.execute('''
             UPDATE borrow_records 
-            SET return_date = ? 
-            WHERE patron_id = ? AND book_id = ? AND return_date IS NULL
-        ''', (return_date.isoformat(), patron_id, book_id))
+            SET return_date = ?, return_ts = ?
+            WHERE patron_id = ? AND book_id = ? AND return_ts IS NULL
+        ''', (return_date.isoformat(), to_timestamp(return_date), patron_id, book_id))
         conn.commit()
         conn.close()
         return True
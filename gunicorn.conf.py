@@ -0,0 +1,32 @@
+"""
+Gunicorn configuration for the Library Management System.
+
+    LIBRARY_ENV=production SECRET_KEY=... gunicorn -c gunicorn.conf.py wsgi:app
+
+The app is created once in the master (preload_app), so every worker
+inherits the same secret key. Creating it touches no database; each worker
+runs the app's startup tasks (schema check, cache warmup) after forking,
+before it accepts requests. Database connections are opened per call and
+never held across the fork.
+
+Workers run GUNICORN_THREADS requests at a time and the rest wait in the
+socket backlog, so load shedding relies on the X-Request-Start header from
+the proxy in front; set LIBRARY_TRUSTED_PROXIES so rate limits see client
+addresses rather than the proxy's (see services/rate_limit.py).
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+preload_app = True
+timeout = 30
+accesslog = '-'
+
+
+def post_fork(server, worker):
+    """Run database setup and warm the worker's in-process caches."""
+    server.app.wsgi().extensions['library_startup'].run()
+    server.log.info('Worker %s caches warmed', worker.pid)
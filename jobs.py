@@ -0,0 +1,74 @@
+"""
+Batch job entry point for the Library Management System.
+
+Runs scheduled jobs (e.g. nightly from cron) against the same database as app.py:
+
+    python jobs.py accrue_fees
+    python jobs.py accrue_fees --date 2025-10-01 --chunk-size 1000
+    python jobs.py accrue_fees --restart
+    python jobs.py archive_loans --archive-after-days 180
+    python jobs.py expire_holds --pickup-days 7
+    python jobs.py reconcile_availability --fix --full
+    python jobs.py build_recommendations --top-k 5
+"""
+
+import argparse
+import logging
+import sys
+from datetime import date
+
+from database import init_database
+from services.batch_jobs import DEFAULT_CHUNK_SIZE, JOBS
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Run a library batch job.')
+    parser.add_argument('job', choices=sorted(JOBS), help='job to run')
+    parser.add_argument('--date', type=date.fromisoformat, default=None,
+                        help='run date (YYYY-MM-DD), defaults to today')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help='rows processed per transaction')
+    parser.add_argument('--restart', action='store_true',
+                        help='ignore the checkpoint of an earlier run for the same date')
+    parser.add_argument('--archive-after-days', type=int, default=None,
+                        help='archive_loans: archive loans returned more than this many days ago')
+    parser.add_argument('--pickup-days', type=int, default=None,
+                        help='expire_holds: days a ready hold waits to be collected')
+    parser.add_argument('--fix', action='store_true',
+                        help='reconcile_availability: correct drifted counters instead of only reporting them')
+    parser.add_argument('--full', action='store_true',
+                        help='reconcile_availability: check every book, not only books changed since the last run')
+    parser.add_argument('--top-k', type=int, default=None,
+                        help='build_recommendations: recommendations kept per book')
+    args = parser.parse_args(argv)
+
+    options = {}
+    if args.archive_after_days is not None:
+        if args.job != 'archive_loans':
+            parser.error('--archive-after-days only applies to archive_loans')
+        options['archive_after_days'] = args.archive_after_days
+    if args.pickup_days is not None:
+        if args.job != 'expire_holds':
+            parser.error('--pickup-days only applies to expire_holds')
+        options['pickup_days'] = args.pickup_days
+    if args.fix or args.full:
+        if args.job != 'reconcile_availability':
+            parser.error('--fix and --full only apply to reconcile_availability')
+        options.update(fix=args.fix, full=args.full)
+    if args.top_k is not None:
+        if args.job != 'build_recommendations':
+            parser.error('--top-k only applies to build_recommendations')
+        options['top_k'] = args.top_k
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    init_database()
+    job = JOBS[args.job](run_date=args.date, chunk_size=args.chunk_size, **options)
+    result = job.run(restart=args.restart)
+    print(f"{args.job}: {result['status']}, {result['processed']} rows, "
+          f"{result['counters']}, {result['elapsed']:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
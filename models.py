@@ -0,0 +1,144 @@
+"""
+Record types for the Library Management System
+Compact immutable rows returned by the database layer
+"""
+
+from collections import namedtuple
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+import calendar
+
+SECONDS_PER_DAY = 86400
+_EPOCH = datetime(1970, 1, 1)
+
+
+def to_timestamp(value: datetime) -> int:
+    """
+    Encode a naive local datetime as integer seconds since 1970-01-01.
+
+    The wall-clock time is encoded as-is (no timezone conversion), which
+    matches SQLite's strftime('%s', ...) on the ISO text columns, so
+    timestamp // SECONDS_PER_DAY is the calendar day of the local date.
+    """
+    return calendar.timegm(value.timetuple())
+
+
+def from_timestamp(value: int) -> datetime:
+    """Decode a timestamp written by to_timestamp."""
+    return _EPOCH + timedelta(seconds=value)
+
+
+def epoch_day(value: datetime) -> int:
+    """Day number (days since 1970-01-01) of a naive local datetime."""
+    return to_timestamp(value) // SECONDS_PER_DAY
+
+
+class _Record:
+    """
+    Mixin for namedtuple rows.
+
+    Records support both attribute access (book.title, as used by the
+    templates) and key access (book['title'], as used by the service layer),
+    so they can replace the per-row dicts without changing callers.
+    """
+    __slots__ = ()
+    _properties = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if key in self._fields or key in self._properties:
+                return getattr(self, key)
+            raise KeyError(key)
+        return tuple.__getitem__(self, key)
+
+    def get(self, key: str, default=None):
+        """dict.get equivalent."""
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        """Field names, so dict(record) works."""
+        return self._fields + self._properties
+
+    def to_dict(self) -> Dict:
+        """Plain dict for JSON serialization."""
+        return {key: getattr(self, key) for key in self.keys()}
+
+    @classmethod
+    def row_factory(cls, cursor, row):
+        """sqlite3 row factory building this record directly from a result tuple."""
+        return cls._make(row)
+
+
+class Book(_Record, namedtuple('Book', 'id title author isbn total_copies available_copies')):
+    """A row of the books table."""
+    __slots__ = ()
+
+
+BOOK_COLUMNS = ', '.join(Book._fields)
+
+
+class BorrowRecord(_Record, namedtuple(
+        'BorrowRecord', 'id patron_id book_id borrow_ts due_ts return_ts title author isbn')):
+    """
+    A row of borrow_records joined with the borrowed book's title, author and ISBN.
+
+    Dates are stored as integer timestamps (see to_timestamp); the *_date
+    properties decode them only when needed.
+    """
+    __slots__ = ()
+    _properties = ('borrow_date', 'due_date', 'return_date', 'is_overdue')
+
+    @property
+    def borrow_date(self) -> datetime:
+        return from_timestamp(self.borrow_ts)
+
+    @property
+    def due_date(self) -> datetime:
+        return from_timestamp(self.due_ts)
+
+    @property
+    def return_date(self) -> Optional[datetime]:
+        return from_timestamp(self.return_ts) if self.return_ts is not None else None
+
+    @property
+    def is_overdue(self) -> bool:
+        """True if the loan is still out past its due date."""
+        return self.return_ts is None and to_timestamp(datetime.now()) > self.due_ts
+
+
+BORROW_RECORD_COLUMNS = ', '.join(
+    [f'br.{name}' for name in BorrowRecord._fields[:6]] + ['b.title', 'b.author', 'b.isbn']
+)
+
+
+class Hold(_Record, namedtuple('Hold', 'id book_id patron_id position status created_ts ready_ts')):
+    """
+    A row of the holds table.
+
+    position is assigned once per book in increasing order and never
+    renumbered; status is 'waiting', 'ready' (a returned copy is set aside
+    for the patron), 'fulfilled', 'cancelled' or 'expired' (not collected
+    by the pickup deadline).
+    """
+    __slots__ = ()
+
+
+HOLD_COLUMNS = ', '.join(Hold._fields)
+
+
+class Copy(_Record, namedtuple('Copy', 'id book_id barcode branch status updated_ts')):
+    """
+    A row of the copies table: one physical copy of a book.
+
+    status is 'available' (on the shelf), 'on_loan', 'held' (set aside for
+    a ready hold) or 'missing' (not accounted for when copies were first
+    recorded). The number of 'available' copies matches the book's
+    available_copies counter.
+    """
+    __slots__ = ()
+
+
+COPY_COLUMNS = ', '.join(Copy._fields)
@@ -1,15 +1,21 @@
 """
 Routes Package - Initialize all route blueprints
+Blueprint modules are imported when they are registered, not when the
+package is imported
 """
 
-from .catalog_routes import catalog_bp
-from .borrowing_routes import borrowing_bp
-from .search_routes import search_bp
-from .api_routes import api_bp
+from importlib import import_module
+
+# (module, blueprint attribute) for every blueprint, in registration order
+BLUEPRINTS = (
+    ('routes.catalog_routes', 'catalog_bp'),
+    ('routes.borrowing_routes', 'borrowing_bp'),
+    ('routes.search_routes', 'search_bp'),
+    ('routes.api_routes', 'api_bp'),
+    ('routes.admin_routes', 'admin_bp'),
+)
 
 def register_blueprints(app):
     """Register all route blueprints with the Flask app."""
-    app.register_blueprint(catalog_bp)
-    app.register_blueprint(borrowing_bp)
-    app.register_blueprint(search_bp)
-    app.register_blueprint(api_bp)
+    for module_name, attribute in BLUEPRINTS:
+        app.register_blueprint(getattr(import_module(module_name), attribute))
@@ -0,0 +1,101 @@
+"""
+Admin Routes - Operational endpoints (profiling, slow queries, rate limits)
+Set ADMIN_TOKEN and send it as the X-Admin-Token header (or a token query
+parameter for pages); without a token the endpoints are only available
+outside production
+"""
+
+import hmac
+import os
+import time
+
+from flask import Blueprint, abort, current_app, flash, jsonify, redirect, render_template, request, url_for
+from services.profiling import check_settings, profiler
+from services.query_log import query_log
+from services.runtime_settings import runtime_settings
+
+admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+@admin_bp.before_request
+def require_admin_token():
+    """Reject requests without the configured admin token."""
+    token = os.environ.get('ADMIN_TOKEN')
+    if token:
+        supplied = request.headers.get('X-Admin-Token') or request.args.get('token', '')
+        if not hmac.compare_digest(supplied, token):
+            abort(403)
+    elif os.environ.get('LIBRARY_ENV') == 'production':
+        abort(403)
+
+@admin_bp.route('/profiling')
+def profiling_stats():
+    """
+    Aggregated timings (and sampled cProfile output) for profiled service functions.
+    Statistics are per worker process; the response includes its pid.
+    """
+    lines = request.args.get('lines', 20, type=int)
+    return jsonify(profiler.stats(profile_lines=max(1, lines)))
+
+@admin_bp.route('/profiling', methods=['POST'])
+def configure_profiling():
+    """
+    Switch profiling mode at runtime in every worker process.
+    Form or JSON fields: mode (off, timing, cprofile), sample_rate (0-1), reset.
+    """
+    data = request.get_json(silent=True) or request.form
+    mode = data.get('mode', profiler.mode)
+    try:
+        sample_rate = float(data.get('sample_rate', profiler.sample_rate))
+        # Validate before storing a setting every worker will apply
+        check_settings(mode, sample_rate)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    runtime_settings.set('profiling', {'mode': mode, 'sample_rate': sample_rate})
+    if str(data.get('reset', '')).lower() in ('1', 'true', 'yes'):
+        runtime_settings.set('profiling_reset', time.time())
+    
+    return jsonify({'mode': profiler.mode, 'sample_rate': profiler.sample_rate, 'pid': os.getpid()})
+
+@admin_bp.route('/rate_limits')
+def rate_limit_stats():
+    """
+    Requests in flight, shed (503) and rate-limited (429) in this worker process.
+    """
+    return jsonify(current_app.extensions['rate_limiter'].stats())
+
+@admin_bp.route('/queries')
+def slow_queries():
+    """
+    Slow statements captured by the query log, grouped and most recent first.
+    The threshold is shared; captured statements are this worker's.
+    """
+    return render_template('admin_queries.html',
+                           pid=os.getpid(),
+                           threshold_ms=query_log.threshold_ms,
+                           summary=query_log.summary(),
+                           recent=query_log.recent(),
+                           token=request.args.get('token', ''))
+
+@admin_bp.route('/queries', methods=['POST'])
+def configure_slow_queries():
+    """
+    Change the slow-query threshold (blank disables tracing) or clear the
+    log, in every worker process.
+    """
+    token = request.args.get('token', '')
+    if request.form.get('action') == 'clear':
+        runtime_settings.set('slow_query_clear', time.time())
+        flash('Slow-query log cleared.', 'success')
+        return redirect(url_for('admin.slow_queries', token=token or None))
+    
+    threshold = request.form.get('threshold_ms', '').strip()
+    try:
+        threshold_ms = float(threshold) if threshold else None
+    except ValueError:
+        flash('Threshold must be a number of milliseconds.', 'error')
+        return redirect(url_for('admin.slow_queries', token=token or None))
+    runtime_settings.set('slow_query_threshold_ms', threshold_ms)
+    
+    flash('Slow-query threshold updated.' if threshold else 'Slow-query tracing disabled.', 'success')
+    return redirect(url_for('admin.slow_queries', token=token or None))
@@ -3,7 +3,12 @@ API Routes - JSON API endpoints
 """
 
 from flask import Blueprint, jsonify, request
-from services.library_service import calculate_late_fee_for_book, search_books_in_catalog
+from routes.admin_routes import require_admin_token
+from services import analytics
+from services.events import DEFAULT_EVENT_BATCH, EVENT_TYPES, get_event_page
+from services.library_service import calculate_late_fee_for_book, pay_late_fees
+from services.search_cache import search_books_cached, search_cache
+from services.suggest_index import DEFAULT_SUGGEST_LIMIT, MAX_SUGGEST_LIMIT, suggest_index
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
@@ -16,6 +21,81 @@ def get_late_fee(patron_id, book_id):
     result = calculate_late_fee_for_book(patron_id, book_id)
     return jsonify(result), 501 if 'not implemented' in result.get('status', '') else 200
 
+@api_bp.route('/pay_fees', methods=['POST'])
+def pay_fees_api():
+    """
+    Pay late fees through the payment gateway.
+    JSON or form fields: patron_id, amount.
+    Charges the gateway, so it is a staff operation behind the admin token.
+    """
+    require_admin_token()
+    data = request.get_json(silent=True) or request.form
+    patron_id = str(data.get('patron_id', '')).strip()
+    
+    try:
+        amount = float(data.get('amount', ''))
+    except (ValueError, TypeError):
+        return jsonify({'success': False, 'message': 'Amount must be a positive number.'}), 400
+    
+    success, message, transaction_id = pay_late_fees(patron_id, amount)
+    
+    return jsonify({
+        'success': success,
+        'message': message,
+        'transaction_id': transaction_id
+    }), 200 if success else 400
+
+@api_bp.route('/events')
+def events_feed():
+    """
+    Change feed of catalog and loan events, oldest first.
+    Query: after (cursor from the previous page), limit, type (repeatable).
+    Requires the admin token like /admin, since events carry patron IDs.
+    """
+    require_admin_token()
+    after = request.args.get('after', 0, type=int)
+    limit = request.args.get('limit', DEFAULT_EVENT_BATCH, type=int)
+    event_types = request.args.getlist('type')
+    
+    unknown = [event_type for event_type in event_types if event_type not in EVENT_TYPES]
+    if unknown:
+        return jsonify({'error': f'Unknown event type: {unknown[0]}'}), 400
+    
+    return jsonify(get_event_page(max(after, 0), limit, event_types))
+
+@api_bp.route('/stats/top_books')
+def top_books_stats():
+    """
+    Most borrowed books over the last `days` days (default 30).
+    """
+    days = request.args.get('days', analytics.DEFAULT_REPORT_DAYS, type=int)
+    limit = max(1, min(request.args.get('limit', 10, type=int), 100))
+    return jsonify({'days': days, 'books': analytics.most_borrowed_books(days, limit)})
+
+@api_bp.route('/stats/loans_per_day')
+def loans_per_day_stats():
+    """
+    Loans and returns per day over the last `days` days.
+    """
+    days = request.args.get('days', analytics.DEFAULT_REPORT_DAYS, type=int)
+    return jsonify({'days': days, 'per_day': analytics.loans_per_day(days)})
+
+@api_bp.route('/stats/loan_duration')
+def loan_duration_stats():
+    """
+    Average duration of loans returned in the last `days` days.
+    """
+    days = request.args.get('days', analytics.DEFAULT_REPORT_DAYS, type=int)
+    return jsonify({'days': days, **analytics.average_loan_duration(days)})
+
+@api_bp.route('/stats/overdue_by_author')
+def overdue_by_author_stats():
+    """
+    Share of returns that were late, per author, over the last `days` days.
+    """
+    days = request.args.get('days', analytics.DEFAULT_REPORT_DAYS, type=int)
+    return jsonify({'days': days, 'authors': analytics.overdue_rate_by_author(days)})
+
 @api_bp.route('/search')
 def search_books_api():
     """
@@ -29,11 +109,41 @@ def search_books_api():
         return jsonify({'error': 'Search term is required'}), 400
     
     # Use business logic function
-    books = search_books_in_catalog(search_term, search_type)
+    books = search_books_cached(search_term, search_type)
     
     return jsonify({
         'search_term': search_term,
         'search_type': search_type,
-        'results': books,
+        'results': [book.to_dict() for book in books],
         'count': len(books)
     })
+
+
+@api_bp.route('/search/cache_stats')
+def search_cache_stats():
+    """
+    Report size and hit-ratio metrics for the shared search result cache.
+    """
+    return jsonify(search_cache.stats())
+
+
+@api_bp.route('/suggest')
+def suggest_api():
+    """
+    Typeahead suggestions for titles and authors matching a prefix.
+    """
+    prefix = request.args.get('q', '').strip()
+    field = request.args.get('field')
+    limit = request.args.get('limit', DEFAULT_SUGGEST_LIMIT, type=int)
+    
+    if field not in (None, 'title', 'author'):
+        return jsonify({'error': 'Field must be title or author'}), 400
+    
+    limit = max(1, min(limit, MAX_SUGGEST_LIMIT))
+    suggestions = suggest_index.suggest(prefix, limit=limit, field=field)
+    
+    return jsonify({
+        'q': prefix,
+        'suggestions': suggestions,
+        'count': len(suggestions)
+    })
@@ -3,6 +3,7 @@ Borrowing Routes - Book borrowing and returning endpoints
 """
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash
+from services.hold_service import cancel_hold, place_hold
 from services.library_service import borrow_book_by_patron, return_book_by_patron
 
 borrowing_bp = Blueprint('borrowing', __name__)
@@ -49,3 +50,40 @@ def return_book():
     
     flash(message, 'success' if success else 'error')
     return render_template('return_book.html')
+
+
+@borrowing_bp.route('/hold', methods=['POST'])
+def hold_book():
+    """
+    Join the waitlist for a book with no available copies.
+    """
+    patron_id = request.form.get('patron_id', '').strip()
+    
+    try:
+        book_id = int(request.form.get('book_id', ''))
+    except (ValueError, TypeError):
+        flash('Invalid book ID.', 'error')
+        return redirect(url_for('catalog.catalog'))
+    
+    success, message = place_hold(patron_id, book_id)
+    
+    flash(message, 'success' if success else 'error')
+    return redirect(url_for('catalog.catalog'))
+
+@borrowing_bp.route('/hold/cancel', methods=['POST'])
+def cancel_hold_request():
+    """
+    Leave the waitlist for a book.
+    """
+    patron_id = request.form.get('patron_id', '').strip()
+    
+    try:
+        book_id = int(request.form.get('book_id', ''))
+    except (ValueError, TypeError):
+        flash('Invalid book ID.', 'error')
+        return redirect(url_for('catalog.catalog'))
+    
+    success, message = cancel_hold(patron_id, book_id)
+    
+    flash(message, 'success' if success else 'error')
+    return redirect(url_for('catalog.catalog'))
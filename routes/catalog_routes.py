@@ -3,7 +3,8 @@ Catalog Routes - Book catalog related endpoints
 """
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash
-from database import get_all_books
+from services.catalog_snapshot import catalog_snapshot
+from services.fragment_cache import render_book_rows
 from services.library_service import add_book_to_catalog
 
 catalog_bp = Blueprint('catalog', __name__)
@@ -18,9 +19,11 @@ def catalog():
     """
     Display all books in the catalog.
     Implements R2: Book Catalog Display
+    Rendered from the in-memory catalog snapshot, with cached per-book rows.
     """
-    books = get_all_books()
-    return render_template('catalog.html', books=books)
+    snapshot = catalog_snapshot.get()
+    book_rows = render_book_rows('_catalog_row.html', snapshot.books, snapshot.also_borrowed)
+    return render_template('catalog.html', books=snapshot.books, book_rows=book_rows)
 
 @catalog_bp.route('/add_book', methods=['GET', 'POST'])
 def add_book():
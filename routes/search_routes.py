@@ -3,7 +3,8 @@ Search Routes - Book search functionality
 """
 
 from flask import Blueprint, render_template, request, flash
-from services.library_service import search_books_in_catalog
+from services.fragment_cache import render_book_rows
+from services.search_cache import search_books_cached
 
 search_bp = Blueprint('search', __name__)
 
@@ -20,9 +21,11 @@ def search_books():
         return render_template('search.html', books=[], search_term='', search_type=search_type)
     
     # Use business logic function
-    books = search_books_in_catalog(search_term, search_type)
+    books = search_books_cached(search_term, search_type)
     
     if not books:
         flash('Search functionality is not yet implemented.', 'error')
     
-    return render_template('search.html', books=books, search_term=search_term, search_type=search_type)
+    book_rows = render_book_rows('_search_row.html', books)
+    return render_template('search.html', books=books, book_rows=book_rows,
+                           search_term=search_term, search_type=search_type)
@@ -0,0 +1,212 @@
+"""
+Circulation Analytics - Reports served from pre-aggregated daily rollups
+daily_circulation holds one row per (day, book) with loan, return, overdue
+and duration totals. It is folded forward from the events feed, so reports
+never scan borrow_records
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import json
+
+from database import get_db_connection
+from models import SECONDS_PER_DAY, epoch_day, from_timestamp
+
+ROLLUP_NAME = 'daily_circulation'
+ROLLUP_BATCH = 1000
+
+DEFAULT_REPORT_DAYS = 30
+MAX_REPORT_DAYS = 3650
+
+# Rollup of loans recorded before the events feed existed (active and archived)
+_BACKFILL_SQL = f'''
+    WITH loans AS (
+        SELECT book_id, borrow_ts, due_ts, return_ts FROM borrow_records
+        UNION ALL
+        SELECT book_id, borrow_ts, due_ts, return_ts FROM borrow_records_archive
+    ),
+    activity AS (
+        SELECT borrow_ts / {SECONDS_PER_DAY} AS day, book_id,
+               1 AS loans, 0 AS returns, 0 AS overdue_returns, 0 AS loan_seconds
+        FROM loans
+        UNION ALL
+        SELECT return_ts / {SECONDS_PER_DAY}, book_id,
+               0, 1, return_ts / {SECONDS_PER_DAY} > due_ts / {SECONDS_PER_DAY}, return_ts - borrow_ts
+        FROM loans WHERE return_ts IS NOT NULL
+    )
+    INSERT INTO daily_circulation (day, book_id, loans, returns, overdue_returns, loan_seconds)
+    SELECT day, book_id, SUM(loans), SUM(returns), SUM(overdue_returns), SUM(loan_seconds)
+    FROM activity
+    GROUP BY day, book_id
+'''
+
+
+def _event_deltas(rows) -> Dict:
+    """Sum loan events into {(day, book_id): [loans, returns, overdue_returns, loan_seconds]}."""
+    deltas: Dict = {}
+    for row in rows:
+        payload = json.loads(row['payload'])
+        if row['event_type'] == 'loan.created':
+            key = (payload['borrow_ts'] // SECONDS_PER_DAY, row['book_id'])
+            deltas.setdefault(key, [0, 0, 0, 0])[0] += 1
+        else:
+            return_day = payload['return_ts'] // SECONDS_PER_DAY
+            delta = deltas.setdefault((return_day, row['book_id']), [0, 0, 0, 0])
+            delta[1] += 1
+            delta[2] += return_day > payload['due_ts'] // SECONDS_PER_DAY
+            delta[3] += payload['return_ts'] - payload['borrow_ts']
+    return deltas
+
+
+def refresh_rollups(batch_size: int = ROLLUP_BATCH) -> int:
+    """
+    Fold loan events newer than the rollup's cursor into daily_circulation.
+
+    The first call builds the rollup from existing loans and starts the
+    cursor at the newest event. Each batch's rollup updates and cursor move
+    commit together, so every event is counted exactly once, and
+    concurrent refreshes queue on the write lock.
+
+    Returns:
+        int: number of events applied
+    """
+    conn = get_db_connection()
+    row = conn.execute('SELECT last_event_id FROM rollup_cursors WHERE name = ?', (ROLLUP_NAME,)).fetchone()
+    latest = conn.execute('SELECT COALESCE(MAX(id), 0) AS latest FROM events').fetchone()['latest']
+    if row is not None and row['last_event_id'] >= latest:
+        conn.close()
+        return 0
+
+    applied = 0
+    try:
+        while True:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT last_event_id FROM rollup_cursors WHERE name = ?', (ROLLUP_NAME,)).fetchone()
+            if row is None:
+                conn.execute('DELETE FROM daily_circulation')
+                conn.execute(_BACKFILL_SQL)
+                conn.execute(
+                    'INSERT INTO rollup_cursors (name, last_event_id) SELECT ?, COALESCE(MAX(id), 0) FROM events',
+                    (ROLLUP_NAME,)
+                )
+                conn.commit()
+                continue
+
+            events = conn.execute(
+                '''SELECT id, event_type, book_id, payload FROM events
+                   WHERE id > ? AND event_type IN ('loan.created', 'loan.returned')
+                   ORDER BY id LIMIT ?''',
+                (row['last_event_id'], batch_size)
+            ).fetchall()
+            if not events:
+                conn.execute('UPDATE rollup_cursors SET last_event_id = MAX(last_event_id, ?) WHERE name = ?',
+                             (latest, ROLLUP_NAME))
+                conn.commit()
+                break
+
+            conn.executemany(
+                '''INSERT INTO daily_circulation (day, book_id, loans, returns, overdue_returns, loan_seconds)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (day, book_id) DO UPDATE
+                   SET loans = loans + excluded.loans, returns = returns + excluded.returns,
+                       overdue_returns = overdue_returns + excluded.overdue_returns,
+                       loan_seconds = loan_seconds + excluded.loan_seconds''',
+                [(day, book_id, *delta) for (day, book_id), delta in _event_deltas(events).items()]
+            )
+            conn.execute('UPDATE rollup_cursors SET last_event_id = ? WHERE name = ?', (events[-1]['id'], ROLLUP_NAME))
+            conn.commit()
+            applied += len(events)
+    except Exception:
+        conn.rollback()
+        conn.close()
+        raise
+    conn.close()
+    return applied
+
+
+def _day_range(days: int, as_of: Optional[datetime]) -> Tuple[int, int]:
+    """(first_day, last_day) of the days-long window ending on as_of's day."""
+    last_day = epoch_day(as_of or datetime.now())
+    return last_day - max(1, min(days, MAX_REPORT_DAYS)) + 1, last_day
+
+
+def _query(sql: str, params) -> List:
+    refresh_rollups()
+    conn = get_db_connection()
+    rows = conn.execute(sql, params).fetchall()
+    conn.close()
+    return rows
+
+
+def most_borrowed_books(days: int = DEFAULT_REPORT_DAYS, limit: int = 10,
+                        as_of: Optional[datetime] = None) -> List[Dict]:
+    """Books with the most loans in the window, most borrowed first."""
+    first_day, last_day = _day_range(days, as_of)
+    rows = _query(
+        '''SELECT top.book_id, b.title, b.author, top.loans
+           FROM (SELECT book_id, SUM(loans) AS loans
+                 FROM daily_circulation
+                 WHERE day BETWEEN ? AND ?
+                 GROUP BY book_id
+                 HAVING SUM(loans) > 0
+                 ORDER BY loans DESC, book_id
+                 LIMIT ?) top
+           JOIN books b ON b.id = top.book_id
+           ORDER BY top.loans DESC, top.book_id''',
+        (first_day, last_day, limit)
+    )
+    return [dict(row) for row in rows]
+
+
+def loans_per_day(days: int = DEFAULT_REPORT_DAYS, as_of: Optional[datetime] = None) -> List[Dict]:
+    """Loans and returns for each day in the window that had any activity."""
+    first_day, last_day = _day_range(days, as_of)
+    rows = _query(
+        '''SELECT day, SUM(loans) AS loans, SUM(returns) AS returns
+           FROM daily_circulation
+           WHERE day BETWEEN ? AND ?
+           GROUP BY day
+           ORDER BY day''',
+        (first_day, last_day)
+    )
+    return [{
+        'date': from_timestamp(row['day'] * SECONDS_PER_DAY).date().isoformat(),
+        'loans': row['loans'],
+        'returns': row['returns'],
+    } for row in rows]
+
+
+def average_loan_duration(days: int = DEFAULT_REPORT_DAYS, as_of: Optional[datetime] = None) -> Dict:
+    """Average length in days of loans returned in the window."""
+    first_day, last_day = _day_range(days, as_of)
+    row = _query(
+        '''SELECT COALESCE(SUM(returns), 0) AS returns, COALESCE(SUM(loan_seconds), 0) AS loan_seconds
+           FROM daily_circulation
+           WHERE day BETWEEN ? AND ?''',
+        (first_day, last_day)
+    )[0]
+    average = row['loan_seconds'] / row['returns'] / SECONDS_PER_DAY if row['returns'] else None
+    return {'returns': row['returns'], 'average_days': round(average, 2) if average is not None else None}
+
+
+def overdue_rate_by_author(days: int = DEFAULT_REPORT_DAYS, as_of: Optional[datetime] = None) -> List[Dict]:
+    """Share of each author's loans returned in the window that came back late, highest first."""
+    first_day, last_day = _day_range(days, as_of)
+    rows = _query(
+        '''SELECT b.author, SUM(per_book.returns) AS returns, SUM(per_book.overdue_returns) AS overdue_returns
+           FROM (SELECT book_id, SUM(returns) AS returns, SUM(overdue_returns) AS overdue_returns
+                 FROM daily_circulation
+                 WHERE day BETWEEN ? AND ?
+                 GROUP BY book_id
+                 HAVING SUM(returns) > 0) per_book
+           JOIN books b ON b.id = per_book.book_id
+           GROUP BY b.author
+           ORDER BY CAST(SUM(per_book.overdue_returns) AS REAL) / SUM(per_book.returns) DESC, b.author''',
+        (first_day, last_day)
+    )
+    return [{
+        'author': row['author'],
+        'returns': row['returns'],
+        'overdue_returns': row['overdue_returns'],
+        'overdue_rate': round(row['overdue_returns'] / row['returns'], 4),
+    } for row in rows]
@@ -0,0 +1,490 @@
+"""
+Batch Jobs - Chunked, resumable jobs run outside the web process
+Each chunk's writes and its checkpoint are committed together, so an
+interrupted run resumes after the last committed chunk
+"""
+
+from collections import Counter
+from datetime import date, datetime
+from typing import Dict, List, Optional, Set
+import heapq
+import logging
+import time
+
+from database import get_db_connection, notify_catalog_change
+from models import SECONDS_PER_DAY, epoch_day, to_timestamp
+from services.fee_ledger import post_ledger_entry, to_cents
+from services.hold_service import HOLD_PICKUP_DAYS, release_held_copy
+from services.library_service import late_fee_for_days
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+
+# Returned loans older than this move to borrow_records_archive
+DEFAULT_ARCHIVE_AFTER_DAYS = 365
+
+# Recommendations kept per book by build_recommendations
+DEFAULT_RECOMMENDATIONS_TOP_K = 10
+
+# Patrons with longer histories (staff, test or institutional accounts)
+# are left out of co-borrow counts; each would add history² pairs
+MAX_RECOMMENDATION_HISTORY = 500
+
+
+class BatchJob:
+    """
+    Base class for a keyset-paginated batch job.
+
+    Subclasses implement fetch_chunk (rows with an 'id' column, ordered by
+    id, after a given id) and process_chunk (writes on the same connection).
+    """
+
+    name = 'batch_job'
+
+    def __init__(self, run_date: Optional[date] = None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.run_date = run_date or date.today()
+        self.run_day = epoch_day(datetime.combine(self.run_date, datetime.min.time()))
+        self.chunk_size = chunk_size
+
+    @property
+    def run_key(self) -> str:
+        return self.run_date.isoformat()
+
+    def fetch_chunk(self, conn, after_id: int, limit: int) -> List:
+        raise NotImplementedError
+
+    def process_chunk(self, conn, rows: List) -> Dict[str, int]:
+        """Process rows and return counters to add to the run totals."""
+        raise NotImplementedError
+
+    def chunk_committed(self, rows: List) -> None:
+        """Called after a chunk's writes are committed (e.g. to notify listeners)."""
+
+    def run(self, restart: bool = False) -> Dict:
+        """
+        Run the job to completion, resuming an interrupted run for the same run_date.
+
+        Args:
+            restart: Ignore any checkpoint and process everything again
+
+        Returns:
+            dict: run status, rows processed, job counters and elapsed seconds
+        """
+        conn = get_db_connection()
+        checkpoint = conn.execute(
+            'SELECT status, last_id, processed FROM job_runs WHERE job_name = ? AND run_key = ?',
+            (self.name, self.run_key)
+        ).fetchone()
+
+        if checkpoint and checkpoint['status'] == 'completed' and not restart:
+            conn.close()
+            logger.info('%s %s already completed; skipping', self.name, self.run_key)
+            return {'status': 'skipped', 'processed': checkpoint['processed'], 'counters': {}, 'elapsed': 0.0}
+
+        if checkpoint and not restart:
+            last_id, processed = checkpoint['last_id'], checkpoint['processed']
+            logger.info('%s %s resuming after id %d', self.name, self.run_key, last_id)
+        else:
+            last_id, processed = 0, 0
+        # A resumed run keeps the watermark it recorded when it first started
+        conn.execute(
+            '''INSERT INTO job_runs (job_name, run_key, status, last_id, processed, started_ts)
+               VALUES (?, ?, 'running', ?, ?, ?)
+               ON CONFLICT (job_name, run_key) DO UPDATE SET
+                   status = 'running', last_id = excluded.last_id, processed = excluded.processed,
+                   started_ts = excluded.started_ts, finished_ts = NULL,
+                   watermark = CASE WHEN excluded.last_id = 0 THEN NULL ELSE watermark END''',
+            (self.name, self.run_key, last_id, processed, to_timestamp(datetime.now()))
+        )
+        conn.commit()
+
+        counters: Dict[str, int] = {}
+        started = time.perf_counter()
+        try:
+            while True:
+                chunk_started = time.perf_counter()
+                rows = self.fetch_chunk(conn, last_id, self.chunk_size)
+                if not rows:
+                    break
+                chunk_counters = self.process_chunk(conn, rows)
+                last_id = rows[-1]['id']
+                processed += len(rows)
+                conn.execute(
+                    'UPDATE job_runs SET last_id = ?, processed = ? WHERE job_name = ? AND run_key = ?',
+                    (last_id, processed, self.name, self.run_key)
+                )
+                conn.commit()
+                self.chunk_committed(rows)
+                for key, value in chunk_counters.items():
+                    counters[key] = counters.get(key, 0) + value
+                elapsed = time.perf_counter() - chunk_started
+                logger.info('%s chunk: %d rows up to id %d in %.3fs (%.0f rows/s) %s',
+                            self.name, len(rows), last_id, elapsed,
+                            len(rows) / elapsed if elapsed else 0.0, chunk_counters)
+
+            conn.execute(
+                "UPDATE job_runs SET status = 'completed', finished_ts = ? WHERE job_name = ? AND run_key = ?",
+                (to_timestamp(datetime.now()), self.name, self.run_key)
+            )
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            conn.close()
+            raise
+        conn.close()
+
+        total_elapsed = time.perf_counter() - started
+        logger.info('%s %s completed: %d rows in %.3fs %s', self.name, self.run_key, processed, total_elapsed, counters)
+        return {'status': 'completed', 'processed': processed, 'counters': counters, 'elapsed': total_elapsed}
+
+
+class FeeAccrualJob(BatchJob):
+    """
+    Charge accrued late fees for every overdue active loan and queue overdue notices.
+
+    Each loan is charged the difference between its fee as of run_date and
+    what the ledger already holds for it, so re-running never double-charges.
+    """
+
+    name = 'accrue_fees'
+
+    def fetch_chunk(self, conn, after_id: int, limit: int) -> List:
+        return conn.execute(
+            '''SELECT br.id, br.patron_id, br.due_ts,
+                      (SELECT COALESCE(SUM(amount_cents), 0) FROM fee_ledger fl
+                       WHERE fl.borrow_record_id = br.id AND fl.entry_type = 'charge') AS charged_cents
+               FROM borrow_records br
+               WHERE br.id > ? AND br.return_ts IS NULL AND br.due_ts < ?
+               ORDER BY br.id
+               LIMIT ?''',
+            (after_id, self.run_day * SECONDS_PER_DAY, limit)
+        ).fetchall()
+
+    def process_chunk(self, conn, rows: List) -> Dict[str, int]:
+        now = datetime.now()
+        charges = notices = 0
+        for row in rows:
+            days_overdue = self.run_day - row['due_ts'] // SECONDS_PER_DAY
+            fee_cents = to_cents(late_fee_for_days(days_overdue))
+            delta = fee_cents - row['charged_cents']
+            if delta > 0:
+                post_ledger_entry(conn, row['patron_id'], 'charge', delta,
+                                  borrow_record_id=row['id'], reference=f'{self.name}:{self.run_key}', now=now)
+                charges += 1
+            cursor = conn.execute(
+                '''INSERT OR IGNORE INTO overdue_notices
+                   (borrow_record_id, patron_id, notice_day, days_overdue, fee_cents)
+                   VALUES (?, ?, ?, ?, ?)''',
+                (row['id'], row['patron_id'], self.run_day, days_overdue, fee_cents)
+            )
+            notices += cursor.rowcount
+        return {'charges': charges, 'notices': notices}
+
+
+class ArchiveLoansJob(BatchJob):
+    """
+    Move loans returned before the retention cutoff into borrow_records_archive.
+
+    Rows keep their ids, so ledger entries and notices still resolve. Each
+    chunk is copied and deleted in the same transaction.
+    """
+
+    name = 'archive_loans'
+
+    def __init__(self, run_date: Optional[date] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 archive_after_days: int = DEFAULT_ARCHIVE_AFTER_DAYS):
+        super().__init__(run_date, chunk_size)
+        self.archive_after_days = archive_after_days
+        self.cutoff_ts = (self.run_day - archive_after_days) * SECONDS_PER_DAY
+
+    @property
+    def run_key(self) -> str:
+        return f'{self.run_date.isoformat()}:{self.archive_after_days}d'
+
+    def fetch_chunk(self, conn, after_id: int, limit: int) -> List:
+        return conn.execute(
+            '''SELECT id FROM borrow_records
+               WHERE id > ? AND return_ts IS NOT NULL AND return_ts < ?
+               ORDER BY id
+               LIMIT ?''',
+            (after_id, self.cutoff_ts, limit)
+        ).fetchall()
+
+    def process_chunk(self, conn, rows: List) -> Dict[str, int]:
+        ids = [row['id'] for row in rows]
+        placeholders = ', '.join('?' * len(ids))
+        cursor = conn.execute(
+            f'''INSERT OR IGNORE INTO borrow_records_archive
+                (id, patron_id, book_id, borrow_date, due_date, return_date,
+                 borrow_ts, due_ts, return_ts, archived_ts)
+                SELECT id, patron_id, book_id, borrow_date, due_date, return_date,
+                       borrow_ts, due_ts, return_ts, ?
+                FROM borrow_records WHERE id IN ({placeholders})''',
+            [to_timestamp(datetime.now())] + ids
+        )
+        archived = cursor.rowcount
+        conn.execute(f'DELETE FROM borrow_records WHERE id IN ({placeholders})', ids)
+        return {'archived': archived}
+
+
+class ExpireHoldsJob(BatchJob):
+    """
+    Expire ready holds not collected by their pickup deadline.
+
+    Each expired hold's copy goes to the next waiting patron, or back on
+    the shelf if nobody is waiting, in the chunk's transaction. A hold
+    fulfilled or cancelled since it was fetched is left alone.
+    """
+
+    name = 'expire_holds'
+
+    def __init__(self, run_date: Optional[date] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 pickup_days: int = HOLD_PICKUP_DAYS):
+        super().__init__(run_date, chunk_size)
+        self.pickup_days = pickup_days
+        # Holds that became ready before this day are past their deadline
+        self.cutoff_ts = (self.run_day - pickup_days) * SECONDS_PER_DAY
+        self._shelved: List[int] = []
+
+    @property
+    def run_key(self) -> str:
+        return f'{self.run_date.isoformat()}:{self.pickup_days}d'
+
+    def fetch_chunk(self, conn, after_id: int, limit: int) -> List:
+        return conn.execute(
+            '''SELECT id, book_id FROM holds
+               WHERE id > ? AND status = 'ready' AND ready_ts < ?
+               ORDER BY id
+               LIMIT ?''',
+            (after_id, self.cutoff_ts, limit)
+        ).fetchall()
+
+    def process_chunk(self, conn, rows: List) -> Dict[str, int]:
+        now_ts = to_timestamp(datetime.now())
+        expired = 0
+        self._shelved = []
+        for row in rows:
+            cursor = conn.execute("UPDATE holds SET status = 'expired' WHERE id = ? AND status = 'ready'", (row['id'],))
+            if cursor.rowcount == 0:
+                continue
+            expired += 1
+            if release_held_copy(conn, row['book_id'], now_ts):
+                self._shelved.append(row['book_id'])
+        return {'expired': expired, 'passed_on': expired - len(self._shelved), 'shelved': len(self._shelved)}
+
+    def chunk_committed(self, rows: List) -> None:
+        for book_id in self._shelved:
+            notify_catalog_change('availability', book_id)
+
+
+# Availability implied by a book's loans and holds: copies not on loan and
+# not set aside for a ready hold. Correlated on b.id; both counts are
+# single probes of partial indexes.
+EXPECTED_AVAILABLE_SQL = '''(b.total_copies
+    - (SELECT COUNT(*) FROM borrow_records br WHERE br.book_id = b.id AND br.return_ts IS NULL)
+    - (SELECT COUNT(*) FROM holds h WHERE h.book_id = b.id AND h.status = 'ready'))'''
+
+
+def find_availability_drift(conn, after_id: int = 0, limit: int = -1,
+                            changed_after: Optional[int] = None) -> List:
+    """
+    Compare books' available_copies with what their loans and holds imply.
+
+    One query per page of books, whatever the size of the catalog.
+
+    Args:
+        after_id, limit: keyset page of books (by id)
+        changed_after: only books whose change_seq is greater than this
+
+    Returns:
+        list: rows with id, total_copies, available_copies, expected and
+        drift (available_copies - expected) for every book in the page
+    """
+    changed = 'AND b.change_seq > ?' if changed_after is not None else ''
+    params = [after_id] + ([changed_after] if changed_after is not None else []) + [limit]
+    return conn.execute(
+        f'''SELECT id, total_copies, available_copies, expected, available_copies - expected AS drift
+            FROM (SELECT b.id, b.total_copies, b.available_copies, {EXPECTED_AVAILABLE_SQL} AS expected
+                  FROM books b
+                  WHERE b.id > ? {changed}
+                  ORDER BY b.id
+                  LIMIT ?)''',
+        params
+    ).fetchall()
+
+
+class ReconcileAvailabilityJob(BatchJob):
+    """
+    Find (and with fix=True repair) books whose available_copies counter has
+    drifted from their loans and holds.
+
+    Runs incrementally: each run records the largest books.change_seq when
+    it starts as its watermark, and the next run only checks books changed
+    after the watermark of the last completed run in the same mode (report
+    or fix), unless full=True or there is no earlier run. Repairs set the counter to the expected value (never
+    below zero) in the chunk's transaction.
+    """
+
+    name = 'reconcile_availability'
+
+    def __init__(self, run_date: Optional[date] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 fix: bool = False, full: bool = False):
+        super().__init__(run_date, chunk_size)
+        self.fix = fix
+        self.full = full
+        self.changed_after: Optional[int] = None
+        self.drift: List[Dict] = []
+        self._watermark_loaded = False
+        self._fixed: List[int] = []
+
+    @property
+    def mode(self) -> str:
+        return 'fix' if self.fix else 'report'
+
+    @property
+    def run_key(self) -> str:
+        return f'{self.run_date.isoformat()}:{self.mode}{":full" if self.full else ""}'
+
+    def _load_watermark(self, conn) -> None:
+        # Changes committed after this point get a larger change_seq
+        conn.execute(
+            '''UPDATE job_runs SET watermark = COALESCE(watermark, (SELECT COALESCE(MAX(change_seq), 0) FROM books))
+               WHERE job_name = ? AND run_key = ?''',
+            (self.name, self.run_key)
+        )
+        if self.full:
+            return
+        # Report and fix runs keep separate watermarks: a report run only
+        # finds drift, so a fix run must still check what it found
+        row = conn.execute(
+            """SELECT MAX(watermark) AS watermark FROM job_runs
+               WHERE job_name = ? AND status = 'completed' AND (run_key LIKE ? OR run_key LIKE ?)""",
+            (self.name, f'%:{self.mode}', f'%:{self.mode}:full')
+        ).fetchone()
+        self.changed_after = row['watermark']
+
+    def fetch_chunk(self, conn, after_id: int, limit: int) -> List:
+        if not self._watermark_loaded:
+            self._load_watermark(conn)
+            self._watermark_loaded = True
+        return find_availability_drift(conn, after_id, limit, self.changed_after)
+
+    def process_chunk(self, conn, rows: List) -> Dict[str, int]:
+        drifted = [row for row in rows if row['drift'] != 0]
+        for row in drifted:
+            logger.warning('%s: book %d has available_copies %d, expected %d',
+                           self.name, row['id'], row['available_copies'], row['expected'])
+        self.drift.extend(dict(row) for row in drifted)
+        self._fixed = []
+        if self.fix and drifted:
+            # Recompute inside the UPDATE so loans made since the read are counted
+            ids = [row['id'] for row in drifted]
+            placeholders = ', '.join('?' * len(ids))
+            conn.execute(
+                f'''UPDATE books AS b SET available_copies = MAX({EXPECTED_AVAILABLE_SQL}, 0)
+                    WHERE b.id IN ({placeholders}) AND b.available_copies != MAX({EXPECTED_AVAILABLE_SQL}, 0)''',
+                ids
+            )
+            self._fixed = ids
+        return {'drifted': len(drifted), 'fixed': len(self._fixed)}
+
+    def chunk_committed(self, rows: List) -> None:
+        for book_id in self._fixed:
+            notify_catalog_change('availability', book_id)
+
+
+class BuildRecommendationsJob(BatchJob):
+    """
+    Rebuild "patrons who borrowed this also borrowed" for every book.
+
+    Co-borrow counts form a sparse book x book matrix: entry (a, b) is the
+    number of patrons who borrowed both a and b. On first fetch the job
+    reads every patron's distinct books (active and archived loans) in
+    keyset batches into dicts of sets, then fills in one chunk of matrix
+    rows per chunk of books and keeps each row's top_k entries. A resumed
+    run reloads the histories and continues with the remaining books.
+    """
+
+    name = 'build_recommendations'
+
+    def __init__(self, run_date: Optional[date] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 top_k: int = DEFAULT_RECOMMENDATIONS_TOP_K):
+        super().__init__(run_date, chunk_size)
+        self.top_k = top_k
+        self.patron_books: Optional[Dict[str, Set[int]]] = None
+        self.book_patrons: Dict[int, List[str]] = {}
+
+    @property
+    def run_key(self) -> str:
+        return f'{self.run_date.isoformat()}:top{self.top_k}'
+
+    def _load_histories(self, conn) -> None:
+        patron_books: Dict[str, Set[int]] = {}
+        for table in ('borrow_records', 'borrow_records_archive'):
+            last_id = 0
+            while True:
+                rows = conn.execute(
+                    f'SELECT id, patron_id, book_id FROM {table} WHERE id > ? ORDER BY id LIMIT ?',
+                    (last_id, self.chunk_size * 10)
+                ).fetchall()
+                if not rows:
+                    break
+                for row in rows:
+                    patron_books.setdefault(row['patron_id'], set()).add(row['book_id'])
+                last_id = rows[-1]['id']
+        self.patron_books = {patron_id: books for patron_id, books in patron_books.items()
+                             if 1 < len(books) <= MAX_RECOMMENDATION_HISTORY}
+        self.book_patrons = {}
+        for patron_id, books in self.patron_books.items():
+            for book_id in books:
+                self.book_patrons.setdefault(book_id, []).append(patron_id)
+
+    def co_borrows(self, book_id: int) -> Dict[int, int]:
+        """One row of the co-borrow matrix: {other_book_id: patrons who borrowed both}."""
+        counts: Counter = Counter()
+        for patron_id in self.book_patrons.get(book_id, ()):
+            counts.update(self.patron_books[patron_id])
+        counts.pop(book_id, None)
+        return counts
+
+    def top_co_borrows(self, book_id: int) -> List:
+        """The top_k (other_book_id, co_borrows) pairs, most first and lower id breaking ties."""
+        counts = self.co_borrows(book_id)
+        if len(counts) > self.top_k:
+            # Only entries reaching the k-th largest count can make the cut
+            cutoff = heapq.nlargest(self.top_k, counts.values())[-1]
+            candidates = [item for item in counts.items() if item[1] >= cutoff]
+        else:
+            candidates = list(counts.items())
+        return sorted(candidates, key=lambda item: (-item[1], item[0]))[:self.top_k]
+
+    def fetch_chunk(self, conn, after_id: int, limit: int) -> List:
+        if self.patron_books is None:
+            self._load_histories(conn)
+        return conn.execute('SELECT id FROM books WHERE id > ? ORDER BY id LIMIT ?', (after_id, limit)).fetchall()
+
+    def process_chunk(self, conn, rows: List) -> Dict[str, int]:
+        recommendations = []
+        books = 0
+        for row in rows:
+            top = self.top_co_borrows(row['id'])
+            recommendations.extend((row['id'], rank, other_id, count)
+                                   for rank, (other_id, count) in enumerate(top, start=1))
+            books += bool(top)
+        conn.execute('DELETE FROM book_recommendations WHERE book_id BETWEEN ? AND ?',
+                     (rows[0]['id'], rows[-1]['id']))
+        conn.executemany(
+            'INSERT INTO book_recommendations (book_id, rank, recommended_book_id, co_borrows) VALUES (?, ?, ?, ?)',
+            recommendations
+        )
+        return {'books': books, 'recommendations': len(recommendations)}
+
+
+JOBS = {
+    FeeAccrualJob.name: FeeAccrualJob,
+    ArchiveLoansJob.name: ArchiveLoansJob,
+    ExpireHoldsJob.name: ExpireHoldsJob,
+    ReconcileAvailabilityJob.name: ReconcileAvailabilityJob,
+    BuildRecommendationsJob.name: BuildRecommendationsJob,
+}
@@ -0,0 +1,134 @@
+"""
+Catalog Snapshot - In-process materialized view of the book catalog
+The /catalog page renders from an immutable snapshot instead of querying SQLite
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import os
+import threading
+import time
+
+from database import get_all_books, get_book_by_id, get_book_recommendations, register_catalog_listener
+from models import Book
+
+# Seconds before a snapshot is refreshed in the background to pick up
+# writes that bypassed database.py (e.g. manual SQL)
+DEFAULT_MAX_AGE = 30.0
+
+# "Also borrowed" titles shown per book on the catalog page
+CATALOG_RECOMMENDATIONS = 3
+
+
+class CatalogSnapshot(NamedTuple):
+    """Immutable catalog state: books ordered by title."""
+    books: Tuple[Book, ...]
+    positions: Dict[int, int]
+    version: int
+    built_at: float
+    recommendations: Dict[int, Tuple[int, ...]] = {}
+
+    def also_borrowed(self, book_id: int) -> List[Book]:
+        """Precomputed co-borrowed books for book_id, read from this snapshot."""
+        return [self.books[self.positions[other_id]]
+                for other_id in self.recommendations.get(book_id, ()) if other_id in self.positions]
+
+
+def _build(books, version: int) -> CatalogSnapshot:
+    books = tuple(books)
+    return CatalogSnapshot(
+        books=books,
+        positions={book.id: i for i, book in enumerate(books)},
+        version=version,
+        built_at=time.monotonic(),
+        recommendations=get_book_recommendations(CATALOG_RECOMMENDATIONS)
+    )
+
+
+class CatalogSnapshotStore:
+    """
+    Holds the current snapshot and swaps in a new one on catalog writes.
+
+    Readers never lock: they take a reference to the current snapshot, which
+    is never mutated. Writers are serialized and replace the reference.
+    """
+
+    def __init__(self, max_age: float = DEFAULT_MAX_AGE):
+        self.max_age = max_age
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._write_lock = threading.Lock()
+        self._refreshing = threading.Event()
+
+    def get(self) -> CatalogSnapshot:
+        """Return the current snapshot, loading it on first use."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.refresh()
+        if time.monotonic() - snapshot.built_at > self.max_age and not self._refreshing.is_set():
+            self._refreshing.set()
+            threading.Thread(target=self._background_refresh, daemon=True).start()
+        return snapshot
+
+    def refresh(self) -> CatalogSnapshot:
+        """Rebuild the snapshot from the books table."""
+        with self._write_lock:
+            previous = self._snapshot
+            snapshot = _build(get_all_books(), previous.version + 1 if previous else 1)
+            self._snapshot = snapshot
+            return snapshot
+
+    def update_book(self, book_id: int) -> None:
+        """Swap in a snapshot with one book's row re-read from the database."""
+        with self._write_lock:
+            previous = self._snapshot
+            if previous is None:
+                return
+            position = previous.positions.get(book_id)
+            book = get_book_by_id(book_id)
+            if position is None or book is None:
+                self._snapshot = None
+                return
+            books = list(previous.books)
+            books[position] = book
+            # Keep built_at from the last full rebuild: patching one row does
+            # not pick up what other workers changed
+            self._snapshot = previous._replace(books=tuple(books), version=previous.version + 1)
+
+    def clear(self) -> None:
+        """Drop the snapshot; the next read reloads it."""
+        with self._write_lock:
+            self._snapshot = None
+
+    def reset_after_fork(self) -> None:
+        """
+        Give a forked child fresh synchronization state and no snapshot.
+
+        A refresh thread running in the parent at fork time does not exist in
+        the child, so its lock and flag would otherwise stay held forever.
+        """
+        self._write_lock = threading.Lock()
+        self._refreshing = threading.Event()
+        self._snapshot = None
+
+    def _background_refresh(self) -> None:
+        try:
+            self.refresh()
+        except Exception as e:
+            # Keep serving the current snapshot; the next stale read retries
+            pass
+        finally:
+            self._refreshing.clear()
+
+    def on_catalog_change(self, event: str, book_id: Optional[int]) -> None:
+        """Catalog listener: patch availability changes, reload on inserts."""
+        if event == 'availability' and book_id is not None:
+            self.update_book(book_id)
+        elif event == 'insert' and self._snapshot is not None:
+            self.refresh()
+        else:
+            self.clear()
+
+
+catalog_snapshot = CatalogSnapshotStore()
+register_catalog_listener(catalog_snapshot.on_catalog_change)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=catalog_snapshot.reset_after_fork)
@@ -0,0 +1,95 @@
+"""
+Fee Ledger - Append-only record of late fee charges, payments and refunds
+Amounts are stored in integer cents; each patron's running balance is
+maintained in patron_balances in the same transaction as every entry
+"""
+
+from datetime import datetime
+from typing import Dict, Optional
+
+from database import get_db_connection
+from models import to_timestamp
+
+# Effect of each entry type on the amount the patron owes
+BALANCE_SIGN = {
+    'charge': 1,
+    'payment': -1,
+    'refund': 1,
+}
+
+
+def to_cents(amount: float) -> int:
+    """Convert a dollar amount to integer cents."""
+    return int(round(amount * 100))
+
+
+def post_ledger_entry(conn, patron_id: str, entry_type: str, amount_cents: int,
+                      borrow_record_id: Optional[int] = None, reference: Optional[str] = None,
+                      now: Optional[datetime] = None) -> int:
+    """
+    Append a ledger entry and apply it to the patron's balance on an open
+    connection (caller commits).
+
+    Returns:
+        int: id of the new entry
+    """
+    created_ts = to_timestamp(now or datetime.now())
+    cursor = conn.execute(
+        '''INSERT INTO fee_ledger (patron_id, borrow_record_id, entry_type, amount_cents, reference, created_ts)
+           VALUES (?, ?, ?, ?, ?, ?)''',
+        (patron_id, borrow_record_id, entry_type, amount_cents, reference, created_ts)
+    )
+    conn.execute(
+        '''INSERT INTO patron_balances (patron_id, balance_cents, updated_ts) VALUES (?, ?, ?)
+           ON CONFLICT (patron_id) DO UPDATE
+           SET balance_cents = balance_cents + excluded.balance_cents, updated_ts = excluded.updated_ts''',
+        (patron_id, BALANCE_SIGN[entry_type] * amount_cents, created_ts)
+    )
+    return cursor.lastrowid
+
+
+def get_balance_cents(conn, patron_id: str) -> int:
+    """Amount the patron owes in cents (0 without any ledger entries), on an open connection."""
+    row = conn.execute(
+        'SELECT balance_cents FROM patron_balances WHERE patron_id = ?', (patron_id,)
+    ).fetchone()
+    return row['balance_cents'] if row else 0
+
+
+def get_outstanding_balance(patron_id: str) -> float:
+    """
+    Amount the patron currently owes according to the ledger.
+
+    Returns:
+        float: balance in dollars (0.0 for a patron with no entries)
+    """
+    conn = get_db_connection()
+    try:
+        return get_balance_cents(conn, patron_id) / 100
+    finally:
+        conn.close()
+
+
+def get_refundable_payment(conn, transaction_id: str) -> Optional[Dict]:
+    """
+    Look up a recorded payment and how much of it can still be refunded,
+    on an open connection.
+
+    Returns:
+        dict: patron_id and refundable amount in cents, or None if the
+        payment is not in the ledger
+    """
+    row = conn.execute(
+        """SELECT patron_id, amount_cents,
+                  (SELECT COALESCE(SUM(amount_cents), 0) FROM fee_ledger
+                   WHERE reference = p.reference AND entry_type = 'refund') AS refunded_cents
+           FROM fee_ledger p
+           WHERE reference = ? AND entry_type = 'payment'""",
+        (transaction_id,)
+    ).fetchone()
+    if not row:
+        return None
+    return {
+        'patron_id': row['patron_id'],
+        'refundable_cents': row['amount_cents'] - row['refunded_cents']
+    }
@@ -0,0 +1,109 @@
+"""
+Fragment Cache - Rendered HTML for per-book table rows
+The catalog and search pages render each book's row once and reuse it until
+the book changes; a page is the cached rows joined together
+"""
+
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+import threading
+
+from flask import current_app
+from markupsafe import Markup
+
+from database import register_catalog_listener
+from models import Book
+
+DEFAULT_MAX_FRAGMENTS = 10000
+
+
+class FragmentCache:
+    """
+    LRU cache of rendered fragments, indexed by book id for invalidation.
+
+    Keys contain the Book record itself, so a row whose book changed is
+    never served; dropping a book's entries on change only frees memory.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_FRAGMENTS):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Hashable, Tuple[Markup, int]]' = OrderedDict()
+        self._keys_by_book: Dict[int, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, key: Hashable, book_id: int, render: Callable[[], str]) -> Markup:
+        """Return the cached fragment for key, rendering and storing it on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # Render outside the lock; two threads may render the same row once each
+        fragment = Markup(render())
+        with self._lock:
+            self._entries[key] = (fragment, book_id)
+            self._keys_by_book.setdefault(book_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                old_key, (_, old_book_id) = self._entries.popitem(last=False)
+                keys = self._keys_by_book[old_book_id]
+                keys.discard(old_key)
+                if not keys:
+                    del self._keys_by_book[old_book_id]
+        return fragment
+
+    def invalidate_book(self, book_id: int) -> None:
+        """Drop every fragment rendered for a book."""
+        with self._lock:
+            for key in self._keys_by_book.pop(book_id, ()):
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_book.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+    def on_catalog_change(self, event: str, book_id: Optional[int]) -> None:
+        """Catalog listener: drop a changed book's rows; new books need nothing."""
+        if event == 'availability' and book_id is not None:
+            self.invalidate_book(book_id)
+        elif event != 'insert':
+            self.clear()
+
+
+fragment_cache = FragmentCache()
+register_catalog_listener(fragment_cache.on_catalog_change)
+
+
+def render_book_rows(template_name: str, books: Iterable[Book],
+                     related: Optional[Callable[[int], List[Book]]] = None) -> Markup:
+    """
+    Render template_name once per book (as `book`, plus `related` books if
+    given) and join the rows, reusing cached rows for unchanged books.
+
+    Must be called in a request context; rows may contain url_for links.
+    """
+    template = current_app.jinja_env.get_template(template_name)
+    rows = []
+    for book in books:
+        extra = tuple(related(book.id)) if related else ()
+        key = (template_name, book, extra)
+        rows.append(fragment_cache.get_or_render(
+            key, book.id, lambda: template.render(book=book, related=extra)
+        ))
+    return Markup('').join(rows)
@@ -0,0 +1,226 @@
+"""
+Hold Service - Reservation queue for books with no available copies
+Patrons join a per-book waitlist; returned copies go to the head of the queue
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from database import get_book_by_id, get_db_connection, fetch_records, notify_catalog_change
+from services.inventory import shelve_held_copy
+from services.validation import INVALID_PATRON_ID, is_valid_patron_id
+from models import HOLD_COLUMNS, SECONDS_PER_DAY, Hold, from_timestamp, to_timestamp
+
+ACTIVE_HOLD_STATUSES = ('waiting', 'ready')
+
+# Queue places are counted up to this many holds ahead; further back a
+# patron is told only that the queue is longer
+MAX_QUEUE_RANK = 100
+
+# Days a patron has to collect a copy set aside for a ready hold; after
+# that the expire_holds job passes it on
+HOLD_PICKUP_DAYS = 7
+
+
+def get_active_hold(conn, patron_id: str, book_id: int) -> Optional[Hold]:
+    """Return the patron's waiting or ready hold on a book, if any."""
+    holds = fetch_records(
+        conn, Hold.row_factory,
+        f"""SELECT {HOLD_COLUMNS} FROM holds
+            WHERE patron_id = ? AND book_id = ? AND status IN ('waiting', 'ready')""",
+        (patron_id, book_id)
+    )
+    return holds[0] if holds else None
+
+
+def assign_next_hold(conn, book_id: int, now_ts: int) -> Optional[Hold]:
+    """
+    Set a returned copy aside for the first waiting patron.
+
+    Must run inside the caller's transaction. The head of the queue is found
+    with one probe of the partial (book_id, position) index on waiting holds.
+
+    Returns:
+        Hold: the hold that became ready, or None if nobody is waiting
+    """
+    holds = fetch_records(
+        conn, Hold.row_factory,
+        f"""SELECT {HOLD_COLUMNS} FROM holds
+            WHERE book_id = ? AND status = 'waiting'
+            ORDER BY position LIMIT 1""",
+        (book_id,)
+    )
+    if not holds:
+        return None
+    conn.execute("UPDATE holds SET status = 'ready', ready_ts = ? WHERE id = ?", (now_ts, holds[0].id))
+    return holds[0]._replace(status='ready', ready_ts=now_ts)
+
+
+def release_held_copy(conn, book_id: int, now_ts: int) -> bool:
+    """
+    Pass a copy set aside for a ready hold that ended to the next waiting
+    patron, or back to the shelf if nobody is waiting.
+
+    Must run inside the caller's transaction.
+
+    Returns:
+        bool: True if the copy went back on the shelf (availability changed)
+    """
+    if assign_next_hold(conn, book_id, now_ts):
+        return False
+    conn.execute('UPDATE books SET available_copies = available_copies + 1 WHERE id = ?', (book_id,))
+    shelve_held_copy(conn, book_id)
+    return True
+
+
+def pickup_deadline(hold: Hold, pickup_days: int = HOLD_PICKUP_DAYS) -> Optional[date]:
+    """Last day a ready hold's copy can be collected, or None if it is not ready."""
+    if hold.status != 'ready':
+        return None
+    return from_timestamp(hold.ready_ts // SECONDS_PER_DAY * SECONDS_PER_DAY).date() + timedelta(days=pickup_days)
+
+
+def _queue_rank(conn, hold: Hold) -> Optional[int]:
+    """
+    1-based place of a waiting hold in its book's queue, or None if more
+    than MAX_QUEUE_RANK holds are ahead of it. Reads at most that many
+    entries of the waiting-holds index, however long the queue.
+    """
+    ahead = conn.execute(
+        """SELECT COUNT(*) AS ahead FROM (
+               SELECT 1 FROM holds WHERE book_id = ? AND status = 'waiting' AND position < ?
+               LIMIT ?)""",
+        (hold.book_id, hold.position, MAX_QUEUE_RANK + 1)
+    ).fetchone()['ahead']
+    return ahead + 1 if ahead <= MAX_QUEUE_RANK else None
+
+
+def place_hold(patron_id: str, book_id: int) -> Tuple[bool, str]:
+    """
+    Add a patron to the waitlist for a book with no available copies.
+
+    Args:
+        patron_id: 6-digit library card ID
+        book_id: ID of the book to hold
+
+    Returns:
+        tuple: (success: bool, message: str)
+    """
+    if not is_valid_patron_id(patron_id):
+        return False, INVALID_PATRON_ID
+
+    book = get_book_by_id(book_id)
+    if not book:
+        return False, "Book not found."
+
+    if book['available_copies'] > 0:
+        return False, "This book is available. Borrow it instead of placing a hold."
+
+    conn = get_db_connection()
+    try:
+        # Take the write lock first so concurrent holds get distinct positions
+        conn.execute('BEGIN IMMEDIATE')
+        if get_active_hold(conn, patron_id, book_id):
+            conn.rollback()
+            conn.close()
+            return False, "You already have a hold on this book."
+
+        on_loan = conn.execute(
+            'SELECT 1 FROM borrow_records WHERE patron_id = ? AND book_id = ? AND return_ts IS NULL',
+            (patron_id, book_id)
+        ).fetchone()
+        if on_loan:
+            conn.rollback()
+            conn.close()
+            return False, "You already have this book borrowed."
+
+        position = conn.execute(
+            'SELECT COALESCE(MAX(position), 0) + 1 AS next FROM holds WHERE book_id = ?', (book_id,)
+        ).fetchone()['next']
+        cursor = conn.execute(
+            "INSERT INTO holds (book_id, patron_id, position, status, created_ts) VALUES (?, ?, ?, 'waiting', ?)",
+            (book_id, patron_id, position, to_timestamp(datetime.now()))
+        )
+        rank = _queue_rank(conn, Hold(cursor.lastrowid, book_id, patron_id, position, 'waiting', None, None))
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        conn.rollback()
+        conn.close()
+        return False, "Database error occurred while placing the hold."
+
+    if rank is None:
+        return True, f'Hold placed on "{book["title"]}". More than {MAX_QUEUE_RANK} patrons are ahead of you in the queue.'
+    return True, f'Hold placed on "{book["title"]}". You are number {rank} in the queue.'
+
+
+def cancel_hold(patron_id: str, book_id: int) -> Tuple[bool, str]:
+    """
+    Cancel a patron's hold. A copy set aside for a ready hold passes to the
+    next waiting patron, or back to the shelf if nobody is waiting.
+
+    Returns:
+        tuple: (success: bool, message: str)
+    """
+    if not is_valid_patron_id(patron_id):
+        return False, INVALID_PATRON_ID
+
+    released_copy = False
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        hold = get_active_hold(conn, patron_id, book_id)
+        if not hold:
+            conn.rollback()
+            conn.close()
+            return False, "No active hold found for this book."
+
+        conn.execute("UPDATE holds SET status = 'cancelled' WHERE id = ?", (hold.id,))
+        if hold.status == 'ready':
+            released_copy = release_held_copy(conn, book_id, to_timestamp(datetime.now()))
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        conn.rollback()
+        conn.close()
+        return False, "Database error occurred while cancelling the hold."
+
+    if released_copy:
+        notify_catalog_change('availability', book_id)
+    return True, "Hold cancelled."
+
+
+def get_patron_holds(patron_id: str) -> List[Dict]:
+    """
+    List a patron's waiting and ready holds with their place in each queue
+    (0 for ready holds, None when more than MAX_QUEUE_RANK are ahead).
+    pickup_by is the ISO date a ready hold must be collected by (None while waiting).
+    """
+    conn = get_db_connection()
+    holds = fetch_records(
+        conn, Hold.row_factory,
+        f"""SELECT {HOLD_COLUMNS} FROM holds
+            WHERE patron_id = ? AND status IN ('waiting', 'ready')
+            ORDER BY created_ts""",
+        (patron_id,)
+    )
+    result = []
+    for hold in holds:
+        result.append({
+            'book_id': hold.book_id,
+            'status': hold.status,
+            'queue_position': _queue_rank(conn, hold) if hold.status == 'waiting' else 0,
+            'pickup_by': pickup_deadline(hold).isoformat() if hold.status == 'ready' else None
+        })
+    conn.close()
+    return result
+
+
+def get_hold_queue_length(book_id: int) -> int:
+    """Number of patrons waiting for a book."""
+    conn = get_db_connection()
+    count = conn.execute(
+        "SELECT COUNT(*) AS count FROM holds WHERE book_id = ? AND status = 'waiting'", (book_id,)
+    ).fetchone()['count']
+    conn.close()
+    return count
@@ -0,0 +1,136 @@
+"""
+Inventory Service - Physical copies behind the availability counters
+Every copy has a barcode, a branch and a status; loans record which copy
+went out, and copy statuses change in the same transaction as the
+books.available_copies counter
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from database import fetch_records, get_db_connection
+from models import COPY_COLUMNS, Copy, to_timestamp
+
+
+def _set_status(conn, copy_id: int, status: str) -> None:
+    conn.execute('UPDATE copies SET status = ?, updated_ts = ? WHERE id = ?',
+                 (status, to_timestamp(datetime.now()), copy_id))
+
+
+def take_copy(conn, book_id: int, from_status: str = 'available') -> Optional[int]:
+    """
+    Mark one of the book's copies in from_status as on loan.
+
+    Must run inside the caller's transaction, next to the counter update.
+
+    Returns:
+        int: id of the copy to record on the loan, or None if the book has
+        no copy in that status (books whose copies were never recorded)
+    """
+    row = conn.execute(
+        'SELECT id FROM copies WHERE book_id = ? AND status = ? ORDER BY id LIMIT 1',
+        (book_id, from_status)
+    ).fetchone()
+    if row is None:
+        return None
+    _set_status(conn, row['id'], 'on_loan')
+    return row['id']
+
+
+def release_copy(conn, book_id: int, copy_id: Optional[int], to_status: str = 'available') -> Optional[int]:
+    """
+    Move a returned loan's copy to to_status ('available' or 'held').
+
+    Loans written without a copy (before copies existed, or by code that
+    bypasses take_copy) release a copy of the book that is out but not
+    linked to any active loan, if there is one.
+
+    Returns:
+        int: id of the released copy, or None if none could be found
+    """
+    if copy_id is None:
+        row = conn.execute('''
+            SELECT c.id FROM copies c
+            WHERE c.book_id = ? AND c.status IN ('on_loan', 'missing')
+              AND NOT EXISTS (SELECT 1 FROM borrow_records br WHERE br.copy_id = c.id AND br.return_ts IS NULL)
+            ORDER BY c.status = 'missing', c.id
+            LIMIT 1
+        ''', (book_id,)).fetchone()
+        if row is None:
+            return None
+        copy_id = row['id']
+    _set_status(conn, copy_id, to_status)
+    return copy_id
+
+
+def shelve_held_copy(conn, book_id: int) -> Optional[int]:
+    """Put a copy that was set aside for a hold back on the shelf."""
+    row = conn.execute(
+        "SELECT id FROM copies WHERE book_id = ? AND status = 'held' ORDER BY id LIMIT 1", (book_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    _set_status(conn, row['id'], 'available')
+    return row['id']
+
+
+def get_book_copies(book_id: int) -> List[Copy]:
+    """All copies of a book, by barcode."""
+    conn = get_db_connection()
+    copies = fetch_records(conn, Copy.row_factory,
+                           f'SELECT {COPY_COLUMNS} FROM copies WHERE book_id = ? ORDER BY barcode', (book_id,))
+    conn.close()
+    return copies
+
+
+def get_branch_inventory(branch: str) -> Dict[int, Dict[str, int]]:
+    """
+    Copies per book and status at one branch.
+
+    Answered from the (branch, status, book_id) index without touching
+    the books or borrow_records tables.
+
+    Returns:
+        dict: book_id -> {status: count}
+    """
+    conn = get_db_connection()
+    rows = conn.execute(
+        'SELECT book_id, status, COUNT(*) AS count FROM copies WHERE branch = ? GROUP BY book_id, status',
+        (branch,)
+    ).fetchall()
+    conn.close()
+    inventory: Dict[int, Dict[str, int]] = {}
+    for row in rows:
+        inventory.setdefault(row['book_id'], {})[row['status']] = row['count']
+    return inventory
+
+
+def find_counter_mismatches(conn) -> List[Dict]:
+    """
+    Books whose counters disagree with their copies.
+
+    One grouped pass over the (book_id, status) index: total_copies must
+    equal the number of copies and available_copies the number of copies
+    on the shelf. Books without recorded copies are skipped.
+
+    Returns:
+        list: dicts with book_id, total_copies, available_copies, copies
+        and shelved (copies with status 'available')
+    """
+    rows = conn.execute('''
+        SELECT b.id AS book_id, b.total_copies, b.available_copies, c.copies, c.shelved
+        FROM books b
+        JOIN (SELECT book_id, COUNT(*) AS copies, SUM(status = 'available') AS shelved
+              FROM copies GROUP BY book_id) c ON c.book_id = b.id
+        WHERE b.total_copies != c.copies OR b.available_copies != c.shelved
+        ORDER BY b.id
+    ''').fetchall()
+    return [dict(row) for row in rows]
+
+
+def check_inventory() -> List[Dict]:
+    """find_counter_mismatches on the app database."""
+    conn = get_db_connection()
+    mismatches = find_counter_mismatches(conn)
+    conn.close()
+    return mismatches
@@ -0,0 +1,63 @@
+"""
+ISBN Utilities - Normalization and checksum validation
+Every ISBN is stored and looked up in canonical ISBN-13 form
+"""
+
+from typing import Optional
+
+def _clean(isbn: str) -> str:
+    """Strip spaces and hyphens and uppercase a trailing ISBN-10 'x'."""
+    # str.replace is several times faster than translate with a deletion table
+    return (isbn or '').replace('-', '').replace(' ', '').strip().upper()
+
+
+# Weighted sum (1, 3, 1, 3, ...) of ord('0') over 12 digits, subtracted so the
+# check digit can be computed from byte values without int() per digit
+_ASCII_ZERO_WEIGHT = 6 * ord('0') + 6 * 3 * ord('0')
+
+
+def isbn13_check_digit(first12: str) -> str:
+    """Compute the ISBN-13 check digit for the first 12 (ASCII) digits."""
+    codes = first12.encode('ascii')
+    total = sum(codes[0::2]) + 3 * sum(codes[1::2]) - _ASCII_ZERO_WEIGHT
+    return str(-total % 10)
+
+
+def is_valid_isbn13(isbn: str) -> bool:
+    """True if isbn is 13 digits with a correct check digit."""
+    return len(isbn) == 13 and isbn.isascii() and isbn.isdigit() and isbn13_check_digit(isbn[:12]) == isbn[12]
+
+
+def is_valid_isbn10(isbn: str) -> bool:
+    """True if isbn is 9 digits plus a correct check digit (0-9 or X)."""
+    if len(isbn) != 10 or not isbn.isascii() or not isbn[:9].isdigit():
+        return False
+    if not (isbn[9].isdigit() or isbn[9] == 'X'):
+        return False
+    total = sum(int(d) * (10 - i) for i, d in enumerate(isbn[:9]))
+    total += 10 if isbn[9] == 'X' else int(isbn[9])
+    return total % 11 == 0
+
+
+def isbn10_to_isbn13(isbn10: str) -> str:
+    """Convert a valid ISBN-10 to its 978-prefixed ISBN-13."""
+    first12 = '978' + isbn10[:9]
+    return first12 + isbn13_check_digit(first12)
+
+
+def normalize_isbn(isbn: str) -> Optional[str]:
+    """
+    Convert user input to canonical ISBN-13.
+
+    Hyphens and spaces are ignored and valid ISBN-10s are converted.
+    13-digit input is returned as-is (see is_valid_isbn13 for the checksum).
+
+    Returns:
+        str: 13-digit ISBN, or None if the input cannot be an ISBN
+    """
+    cleaned = _clean(isbn)
+    if len(cleaned) == 13 and cleaned.isascii() and cleaned.isdigit():
+        return cleaned
+    if is_valid_isbn10(cleaned):
+        return isbn10_to_isbn13(cleaned)
+    return None
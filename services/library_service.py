@@ -5,18 +5,92 @@ Contains all the core business logic for the Library Management System
 
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
-import sys
-import os
-
-# Add parent directory to path to import database module
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import logging
 
 from database import (
     get_book_by_id, get_book_by_isbn, get_patron_borrow_count,
-    insert_book, insert_borrow_record, update_book_availability,
-    update_borrow_record_return_date, get_all_books, get_db_connection
+    insert_book, get_db_connection, get_existing_isbns, insert_books,
+    fetch_records, write_borrow_record, notify_catalog_change,
+    get_archived_borrow_records, write_event
+)
+from models import (
+    BOOK_COLUMNS, BORROW_RECORD_COLUMNS, SECONDS_PER_DAY, Book, BorrowRecord,
+    epoch_day, to_timestamp
+)
+from services.fee_ledger import (
+    get_balance_cents, get_refundable_payment, post_ledger_entry, to_cents
 )
+from services.hold_service import assign_next_hold, get_active_hold, get_patron_holds
+from services.inventory import release_copy, take_copy
 from services.payment_service import PaymentGateway, PaymentGatewayError
+from services.profiling import profiled
+from services.validation import (
+    INVALID_PATRON_ID, clean_book_fields, is_valid_patron_id, validate_book_rows
+)
+
+# Archived loans shown per page in the patron status report
+DEFAULT_ARCHIVE_PAGE_SIZE = 20
+MAX_ARCHIVE_PAGE_SIZE = 100
+
+logger = logging.getLogger(__name__)
+
+
+def late_fee_for_days(days_overdue: int) -> float:
+    """
+    Late fee for a loan overdue by the given number of days.
+    $0.50/day for the first 7 days, $1.00/day after that, capped at $15.00.
+    """
+    if days_overdue <= 0:
+        return 0.0
+    if days_overdue <= 7:
+        fee = days_overdue * 0.50
+    else:
+        fee = (7 * 0.50) + ((days_overdue - 7) * 1.00)
+    return min(fee, 15.00)
+
+
+def days_overdue_on(due_ts: int, as_of: datetime) -> int:
+    """Whole calendar days between a loan's due date and as_of (negative if not yet due)."""
+    return epoch_day(as_of) - due_ts // SECONDS_PER_DAY
+
+
+def _charged_late_fee_cents(conn, borrow_record_id: int) -> int:
+    """Late fees already charged to the ledger for a loan, in cents."""
+    return conn.execute(
+        "SELECT COALESCE(SUM(amount_cents), 0) AS charged FROM fee_ledger WHERE borrow_record_id = ? AND entry_type = 'charge'",
+        (borrow_record_id,)
+    ).fetchone()['charged']
+
+
+def charge_late_fee(conn, patron_id: str, borrow_record_id: int, days_overdue: int, reference: str) -> int:
+    """
+    Charge a loan's late fee for days_overdue, less what the ledger already
+    holds for it, on the caller's transaction.
+
+    Returns:
+        int: cents charged (0 if nothing more was owed)
+    """
+    delta = to_cents(late_fee_for_days(days_overdue)) - _charged_late_fee_cents(conn, borrow_record_id)
+    if delta <= 0:
+        return 0
+    post_ledger_entry(conn, patron_id, 'charge', delta, borrow_record_id=borrow_record_id, reference=reference)
+    return delta
+
+
+def accrue_patron_late_fees(conn, patron_id: str, as_of: datetime, reference: str) -> int:
+    """
+    Charge what the patron's overdue active loans have accrued up to as_of
+    that the accrue_fees job has not charged yet, on the caller's transaction.
+
+    Returns:
+        int: cents charged
+    """
+    loans = conn.execute(
+        'SELECT id, due_ts FROM borrow_records WHERE patron_id = ? AND return_ts IS NULL AND due_ts < ?',
+        (patron_id, epoch_day(as_of) * SECONDS_PER_DAY)
+    ).fetchall()
+    return sum(charge_late_fee(conn, patron_id, loan['id'], days_overdue_on(loan['due_ts'], as_of), reference)
+               for loan in loans)
 
 
 def add_book_to_catalog(title: str, author: str, isbn: str, total_copies: int) -> Tuple[bool, str]:
@@ -27,44 +101,67 @@ def add_book_to_catalog(title: str, author: str, isbn: str, total_copies: int) -
     Args:
         title: Book title (max 200 chars)
         author: Book author (max 100 chars)
-        isbn: 13-digit ISBN
+        isbn: ISBN-13 or ISBN-10, hyphens allowed; stored as canonical ISBN-13
         total_copies: Number of copies (positive integer)
         
     Returns:
         tuple: (success: bool, message: str)
     """
-    # Input validation
-    if not title or not title.strip():
-        return False, "Title is required."
-    
-    if len(title.strip()) > 200:
-        return False, "Title must be less than 200 characters."
-    
-    if not author or not author.strip():
-        return False, "Author is required."
-    
-    if len(author.strip()) > 100:
-        return False, "Author must be less than 100 characters."
-    
-    if len(isbn) != 13:
-        return False, "ISBN must be exactly 13 digits."
-    
-    if not isinstance(total_copies, int) or total_copies <= 0:
-        return False, "Total copies must be a positive integer."
+    # Input validation (including the ISBN check digit) before any lookup
+    fields, error = clean_book_fields(title, author, isbn, total_copies)
+    if error:
+        return False, error
     
     # Check for duplicate ISBN
-    existing = get_book_by_isbn(isbn)
+    existing = get_book_by_isbn(fields.isbn)
     if existing:
         return False, "A book with this ISBN already exists."
     
     # Insert new book
-    success = insert_book(title.strip(), author.strip(), isbn, total_copies, total_copies)
+    success = insert_book(fields.title, fields.author, fields.isbn, total_copies, total_copies)
     if success:
-        return True, f'Book "{title.strip()}" has been successfully added to the catalog.'
+        return True, f'Book "{fields.title}" has been successfully added to the catalog.'
     else:
         return False, "Database error occurred while adding the book."
 
 
+def import_books_to_catalog(rows: List[Dict]) -> Dict:
+    """
+    Add many books to the catalog at once.
+    
+    Rows are validated like add_book_to_catalog. Rows whose ISBN (after
+    normalization) is already in the catalog or earlier in the batch are
+    skipped, so re-running an import never creates duplicates.
+    
+    Args:
+        rows: dicts with title, author, isbn and total_copies
+        
+    Returns:
+        dict: counts of added/skipped rows and per-row errors (by row index)
+    """
+    valid, errors = validate_book_rows(rows)
+    accepted = []
+    seen = set()
+    duplicates = 0
+    
+    for _, fields in valid:
+        if fields.isbn in seen:
+            duplicates += 1
+            continue
+        seen.add(fields.isbn)
+        accepted.append(tuple(fields))
+    
+    existing = get_existing_isbns([book[2] for book in accepted])
+    new_books = [book for book in accepted if book[2] not in existing]
+    duplicates += len(accepted) - len(new_books)
+    
+    if new_books and not insert_books(new_books):
+        return {'added': 0, 'duplicates': duplicates, 'errors': errors + [{'row': None, 'error': "Database error occurred while importing books."}]}
+    
+    return {'added': len(new_books), 'duplicates': duplicates, 'errors': errors}
+
+
+@profiled
 def borrow_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
     """
     Allow a patron to borrow a book.
@@ -78,15 +175,20 @@ def borrow_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
         tuple: (success: bool, message: str)
     """
     # Validate patron ID
-    if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
-        return False, "Invalid patron ID. Must be exactly 6 digits."
+    if not is_valid_patron_id(patron_id):
+        return False, INVALID_PATRON_ID
     
     # Check if book exists and is available
     book = get_book_by_id(book_id)
     if not book:
         return False, "Book not found."
     
-    if book['available_copies'] <= 0:
+    conn = get_db_connection()
+    hold = get_active_hold(conn, patron_id, book_id)
+    conn.close()
+    has_ready_hold = hold is not None and hold.status == 'ready'
+    
+    if book['available_copies'] <= 0 and not has_ready_hold:
         return False, "This book is currently not available."
     
     # Check patron's current borrowed books count
@@ -99,64 +201,107 @@ def borrow_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
     borrow_date = datetime.now()
     due_date = borrow_date + timedelta(days=14)
     
-    # Insert borrow record and update availability
-    borrow_success = insert_borrow_record(patron_id, book_id, borrow_date, due_date)
-    if not borrow_success:
+    # Claim a copy and insert the borrow record in one transaction
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        if has_ready_hold:
+            # The hold may have expired or been cancelled since it was read;
+            # then its copy has moved on and this is an ordinary borrow
+            has_ready_hold = conn.execute(
+                "UPDATE holds SET status = 'fulfilled' WHERE id = ? AND status = 'ready'", (hold.id,)
+            ).rowcount == 1
+        if has_ready_hold:
+            # The copy was set aside when it was returned; availability is unchanged
+            copy_id = take_copy(conn, book_id, from_status='held')
+        else:
+            claimed = conn.execute(
+                'UPDATE books SET available_copies = available_copies - 1 WHERE id = ? AND available_copies > 0',
+                (book_id,)
+            ).rowcount
+            if not claimed:
+                conn.rollback()
+                conn.close()
+                return False, "This book is currently not available."
+            copy_id = take_copy(conn, book_id)
+        loan_id = write_borrow_record(conn, patron_id, book_id, borrow_date, due_date, copy_id)
+        write_event(conn, 'loan.created', {
+            'loan_id': loan_id, 'patron_id': patron_id, 'book_id': book_id, 'copy_id': copy_id,
+            'borrow_ts': to_timestamp(borrow_date), 'due_ts': to_timestamp(due_date), 'from_hold': has_ready_hold
+        }, book_id=book_id, patron_id=patron_id)
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        conn.rollback()
+        conn.close()
         return False, "Database error occurred while creating borrow record."
     
-    availability_success = update_book_availability(book_id, -1)
-    if not availability_success:
-        return False, "Database error occurred while updating book availability."
+    if not has_ready_hold:
+        notify_catalog_change('availability', book_id)
     
     return True, f'Successfully borrowed "{book["title"]}". Due date: {due_date.strftime("%Y-%m-%d")}.'
 
 
+@profiled
 def return_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
     """
     Process book return by a patron.
     Implements R4: Book Return Processing
     """
-    if not patron_id or len(patron_id) != 6 or not patron_id.isdigit():
-        return False, "Invalid patron ID. Must be exactly 6 digits."
+    if not is_valid_patron_id(patron_id):
+        return False, INVALID_PATRON_ID
     
     book = get_book_by_id(book_id)
     if not book:
         return False, f"Book with ID {book_id} not found."
     
-    conn = get_db_connection()
-    borrow_record = conn.execute(
-        'SELECT * FROM borrow_records WHERE patron_id = ? AND book_id = ? AND return_date IS NULL',
-        (patron_id, book_id)
-    ).fetchone()
-    conn.close()
-    
-    if not borrow_record:
-        return False, f"No active borrow record found for patron {patron_id} and book ID {book_id}."
-    
     return_date = datetime.now()
+    return_ts = to_timestamp(return_date)
     
+    # Close the loan and hand the copy to the next hold (or the shelf) atomically
     conn = get_db_connection()
-    conn.execute(
-        'UPDATE borrow_records SET return_date = ? WHERE patron_id = ? AND book_id = ? AND return_date IS NULL',
-        (return_date.strftime('%Y-%m-%d'), patron_id, book_id)
-    )
-    conn.commit()
-    conn.close()
-    
-    update_book_availability(book_id, 1)
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        borrow_record = conn.execute(
+            '''SELECT id, borrow_ts, due_ts, copy_id FROM borrow_records
+               WHERE patron_id = ? AND book_id = ? AND return_ts IS NULL''',
+            (patron_id, book_id)
+        ).fetchone()
+        
+        if not borrow_record:
+            conn.rollback()
+            conn.close()
+            return False, f"No active borrow record found for patron {patron_id} and book ID {book_id}."
+        
+        conn.execute(
+            'UPDATE borrow_records SET return_date = ?, return_ts = ? WHERE id = ?',
+            (return_date.isoformat(), return_ts, borrow_record['id'])
+        )
+        # accrue_fees only charges active loans, so the final fee is charged here
+        days_late = days_overdue_on(borrow_record['due_ts'], return_date)
+        charge_late_fee(conn, patron_id, borrow_record['id'], days_late, reference='return')
+        next_hold = assign_next_hold(conn, book_id, return_ts)
+        release_copy(conn, book_id, borrow_record['copy_id'], 'held' if next_hold else 'available')
+        if next_hold is None:
+            conn.execute('UPDATE books SET available_copies = available_copies + 1 WHERE id = ?', (book_id,))
+        write_event(conn, 'loan.returned', {
+            'loan_id': borrow_record['id'], 'patron_id': patron_id, 'book_id': book_id,
+            'copy_id': borrow_record['copy_id'], 'borrow_ts': borrow_record['borrow_ts'],
+            'due_ts': borrow_record['due_ts'], 'return_ts': return_ts,
+            'held_for_patron_id': next_hold.patron_id if next_hold else None
+        }, book_id=book_id, patron_id=patron_id)
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        conn.rollback()
+        conn.close()
+        return False, "Database error occurred while returning the book."
     
-    due_date_str = str(borrow_record['due_date'])
-    if 'T' in due_date_str:
-        due_date_str = due_date_str.split('T')[0]
-    due_date = datetime.strptime(due_date_str, '%Y-%m-%d')
-    days_late = (return_date - due_date).days
+    if next_hold is None:
+        notify_catalog_change('availability', book_id)
     
     if days_late > 0:
-        if days_late <= 7:
-            late_fee = days_late * 0.50
-        else:
-            late_fee = (7 * 0.50) + ((days_late - 7) * 1.00)
-        late_fee = min(late_fee, 15.00)
+        late_fee = late_fee_for_days(days_late)
         return True, f'Book returned successfully. Late fee: ${late_fee:.2f} ({days_late} days overdue).'
     else:
         return True, f'Book returned successfully. No late fees.'
@@ -169,7 +314,7 @@ def calculate_late_fee_for_book(patron_id: str, book_id: int) -> Dict:
     """
     conn = get_db_connection()
     borrow_record = conn.execute(
-        'SELECT * FROM borrow_records WHERE patron_id = ? AND book_id = ? AND return_date IS NULL',
+        'SELECT due_ts FROM borrow_records WHERE patron_id = ? AND book_id = ? AND return_ts IS NULL',
         (patron_id, book_id)
     ).fetchone()
     conn.close()
@@ -181,12 +326,7 @@ def calculate_late_fee_for_book(patron_id: str, book_id: int) -> Dict:
             'status': 'No active borrow record found'
         }
     
-    due_date_str = str(borrow_record['due_date'])
-    if 'T' in due_date_str:
-        due_date_str = due_date_str.split('T')[0]
-    due_date = datetime.strptime(due_date_str, '%Y-%m-%d')
-    current_date = datetime.now()
-    days_overdue = (current_date - due_date).days
+    days_overdue = days_overdue_on(borrow_record['due_ts'], datetime.now())
     
     if days_overdue <= 0:
         return {
@@ -195,20 +335,14 @@ def calculate_late_fee_for_book(patron_id: str, book_id: int) -> Dict:
             'status': 'Book not overdue'
         }
     
-    if days_overdue <= 7:
-        fee_amount = days_overdue * 0.50
-    else:
-        fee_amount = (7 * 0.50) + ((days_overdue - 7) * 1.00)
-    
-    fee_amount = min(fee_amount, 15.00)
-    
     return {
-        'fee_amount': round(fee_amount, 2),
+        'fee_amount': round(late_fee_for_days(days_overdue), 2),
         'days_overdue': days_overdue,
         'status': 'Overdue'
     }
 
 
+@profiled
 def search_books_in_catalog(search_term: str, search_type: str) -> List[Dict]:
     """
     Search for books in the catalog.
@@ -217,113 +351,145 @@ def search_books_in_catalog(search_term: str, search_type: str) -> List[Dict]:
     if not search_term:
         return []
     
+    if search_type == 'isbn':
+        # Single probe of the unique canonical-ISBN index
+        book = get_book_by_isbn(search_term)
+        return [book] if book else []
+    
     conn = get_db_connection()
     
-    if search_type == 'isbn':
-        books = conn.execute(
-            'SELECT * FROM books WHERE isbn = ?',
-            (search_term,)
-        ).fetchall()
-    elif search_type == 'author':
-        books = conn.execute(
-            'SELECT * FROM books WHERE LOWER(author) LIKE LOWER(?)',
+    if search_type == 'author':
+        books = fetch_records(
+            conn, Book.row_factory,
+            f'SELECT {BOOK_COLUMNS} FROM books WHERE LOWER(author) LIKE LOWER(?)',
             (f'%{search_term}%',)
-        ).fetchall()
+        )
     else:
-        books = conn.execute(
-            'SELECT * FROM books WHERE LOWER(title) LIKE LOWER(?)',
+        books = fetch_records(
+            conn, Book.row_factory,
+            f'SELECT {BOOK_COLUMNS} FROM books WHERE LOWER(title) LIKE LOWER(?)',
             (f'%{search_term}%',)
-        ).fetchall()
+        )
     
     conn.close()
     
-    return [dict(book) for book in books]
+    return books
 
 
-def get_patron_status_report(patron_id: str) -> Dict:
+@profiled
+def get_patron_status_report(patron_id: str, archive_page: int = 1,
+                             archive_page_size: int = DEFAULT_ARCHIVE_PAGE_SIZE) -> Dict:
     """
     Get status report for a patron.
     Implements R7: Patron Status Report
+    
+    borrowing_history lists every loan, newest first, with ISO date strings
+    and return_date 'Not returned' for books still out. Loans moved out by
+    the archive_loans job are paged separately in archived_history, in the
+    same shape.
+    
+    Fees are read from the ledger, plus what overdue active loans have
+    accrued since the accrue_fees job last charged them: each loan's
+    late_fee is its fee to date, and total_late_fees is the patron's balance
+    including those not yet charged fees.
     """
-    if not patron_id or len(patron_id) != 6 or not patron_id.isdigit():
+    if not is_valid_patron_id(patron_id):
         return {'error': 'Invalid patron ID'}
     
     conn = get_db_connection()
     
-    active_borrows = conn.execute(
-        '''SELECT br.*, b.title, b.author, b.isbn 
+    all_borrows = fetch_records(
+        conn, BorrowRecord.row_factory,
+        f'''SELECT {BORROW_RECORD_COLUMNS}
            FROM borrow_records br
            JOIN books b ON br.book_id = b.id
-           WHERE br.patron_id = ? AND br.return_date IS NULL''',
+           WHERE br.patron_id = ?
+           ORDER BY br.borrow_ts DESC''',
         (patron_id,)
-    ).fetchall()
+    )
     
-    all_borrows = conn.execute(
-        '''SELECT br.*, b.title, b.author 
-           FROM borrow_records br
-           JOIN books b ON br.book_id = b.id
-           WHERE br.patron_id = ?
-           ORDER BY br.borrow_date DESC''',
+    # Charged by the accrue_fees job and on return
+    charged_cents = dict(conn.execute(
+        '''SELECT borrow_record_id, SUM(amount_cents) FROM fee_ledger
+           WHERE patron_id = ? AND entry_type = 'charge' AND borrow_record_id IS NOT NULL
+           GROUP BY borrow_record_id''',
         (patron_id,)
-    ).fetchall()
+    ).fetchall())
+    balance_cents = get_balance_cents(conn, patron_id)
     
     conn.close()
     
-    total_late_fees = 0.0
+    today = epoch_day(datetime.now())
     currently_borrowed = []
     
-    for record in active_borrows:
-        due_date_str = str(record['due_date'])
-        if 'T' in due_date_str:
-            due_date_str = due_date_str.split('T')[0]
-        due_date = datetime.strptime(due_date_str, '%Y-%m-%d')
-        current_date = datetime.now()
-        days_overdue = (current_date - due_date).days
-        
-        late_fee = 0.0
-        if days_overdue > 0:
-            if days_overdue <= 7:
-                late_fee = days_overdue * 0.50
-            else:
-                late_fee = (7 * 0.50) + ((days_overdue - 7) * 1.00)
-            late_fee = min(late_fee, 15.00)
-            total_late_fees += late_fee
-        
+    for record in all_borrows:
+        if record.return_ts is not None:
+            continue
+        days_overdue = today - record.due_ts // SECONDS_PER_DAY
+        fee_cents = max(to_cents(late_fee_for_days(days_overdue)), charged_cents.get(record.id, 0))
+        balance_cents += fee_cents - charged_cents.get(record.id, 0)
         currently_borrowed.append({
             'book_id': record['book_id'],
             'title': record['title'],
             'author': record['author'],
             'isbn': record['isbn'],
-            'borrow_date': record['borrow_date'],
-            'due_date': record['due_date'],
+            'borrow_date': record.borrow_date.isoformat(),
+            'due_date': record.due_date.isoformat(),
             'days_overdue': max(0, days_overdue),
-            'late_fee': round(late_fee, 2)
+            'late_fee': fee_cents / 100
         })
     
-    borrowing_history = []
-    for record in all_borrows:
-        borrowing_history.append({
-            'book_id': record['book_id'],
-            'title': record['title'],
-            'author': record['author'],
-            'borrow_date': record['borrow_date'],
-            'due_date': record['due_date'],
-            'return_date': record['return_date'] if record['return_date'] else 'Not returned'
-        })
+    archived_history = get_archived_history_page(patron_id, archive_page, archive_page_size)
+    archived_history['records'] = [_history_entry(record) for record in archived_history['records']]
     
     return {
         'patron_id': patron_id,
         'currently_borrowed': currently_borrowed,
         'total_books_borrowed': len(currently_borrowed),
-        'total_late_fees': round(total_late_fees, 2),
-        'borrowing_history': borrowing_history
+        'total_late_fees': balance_cents / 100,
+        'outstanding_balance': balance_cents / 100,
+        'borrowing_history': [_history_entry(record) for record in all_borrows],
+        'archived_history': archived_history,
+        'holds': get_patron_holds(patron_id)
+    }
+
+
+def _history_entry(record: BorrowRecord) -> Dict:
+    """A loan as listed in the status report's borrowing history."""
+    return {
+        'book_id': record.book_id,
+        'title': record.title,
+        'author': record.author,
+        'borrow_date': record.borrow_date.isoformat(),
+        'due_date': record.due_date.isoformat(),
+        'return_date': record.return_date.isoformat() if record.return_ts is not None else 'Not returned'
+    }
+
+
+def get_archived_history_page(patron_id: str, page: int = 1,
+                              page_size: int = DEFAULT_ARCHIVE_PAGE_SIZE) -> Dict:
+    """
+    One page of a patron's archived loans, newest first.
+    
+    Returns:
+        dict: records (BorrowRecord list), page, page_size and has_more
+    """
+    page = max(1, page)
+    page_size = max(1, min(page_size, MAX_ARCHIVE_PAGE_SIZE))
+    # Fetch one extra row to learn whether another page exists
+    records = get_archived_borrow_records(patron_id, page_size + 1, (page - 1) * page_size)
+    return {
+        'records': records[:page_size],
+        'page': page,
+        'page_size': page_size,
+        'has_more': len(records) > page_size
     }
 
 
 def pay_late_fees(patron_id: str, amount: float, payment_gateway: Optional[PaymentGateway] = None) -> Tuple[bool, str, Optional[str]]:
     # Validate patron ID
-    if not patron_id or len(patron_id) != 6 or not patron_id.isdigit():
-        return False, "Invalid patron ID. Must be exactly 6 digits.", None
+    if not is_valid_patron_id(patron_id):
+        return False, INVALID_PATRON_ID, None
     
     # Validate amount
     if not isinstance(amount, (int, float)) or amount <= 0:
@@ -332,6 +498,25 @@ def pay_late_fees(patron_id: str, amount: float, payment_gateway: Optional[Payme
     if amount > 15.00:
         return False, "Amount exceeds maximum late fee of $15.00.", None
     
+    # The ledger is the record of what the patron owes; charge fees accrued
+    # since the last accrue_fees run first so they can be paid too
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        accrue_patron_late_fees(conn, patron_id, datetime.now(), reference='pay_late_fees')
+        conn.commit()
+        outstanding_cents = get_balance_cents(conn, patron_id)
+    except Exception as e:
+        conn.rollback()
+        conn.close()
+        return False, f"Could not read late fee balance: {str(e)}", None
+    if outstanding_cents <= 0:
+        conn.close()
+        return False, "No outstanding late fees to pay.", None
+    if to_cents(amount) > outstanding_cents:
+        conn.close()
+        return False, f"Amount exceeds outstanding balance of ${outstanding_cents / 100:.2f}.", None
+    
     # Use provided gateway or create new one
     gateway = payment_gateway or PaymentGateway()
     
@@ -342,17 +527,53 @@ def pay_late_fees(patron_id: str, amount: float, payment_gateway: Optional[Payme
             amount=amount,
             description=f"Library late fees for patron {patron_id}"
         )
-        
-        if result['status'] == 'success':
-            transaction_id = result['transaction_id']
-            return True, f"Payment of ${amount:.2f} processed successfully. Transaction ID: {transaction_id}", transaction_id
-        else:
-            return False, "Payment processing failed.", None
-            
     except PaymentGatewayError as e:
+        conn.close()
         return False, f"Payment gateway error: {str(e)}", None
     except Exception as e:
+        conn.close()
         return False, f"Unexpected error during payment processing: {str(e)}", None
+    
+    if result['status'] != 'success':
+        conn.close()
+        return False, "Payment processing failed.", None
+    
+    # Post the gateway's transaction to the ledger; a charged but unrecorded
+    # payment is an error staff must reconcile by transaction ID
+    transaction_id = result['transaction_id']
+    try:
+        # Re-check under the write lock: a concurrent payment may have
+        # reduced the balance since the check above
+        conn.execute('BEGIN IMMEDIATE')
+        outstanding_cents = get_balance_cents(conn, patron_id)
+        if to_cents(amount) > outstanding_cents:
+            conn.rollback()
+            conn.close()
+            return _refund_overpayment(gateway, patron_id, amount, transaction_id, outstanding_cents)
+        post_ledger_entry(conn, patron_id, 'payment', to_cents(amount), reference=transaction_id)
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        conn.rollback()
+        conn.close()
+        logger.error('payment %s for patron %s not recorded in ledger: %s', transaction_id, patron_id, e)
+        return False, f"Payment was processed but could not be recorded. Transaction ID: {transaction_id}", transaction_id
+    
+    return True, f"Payment of ${amount:.2f} processed successfully. Transaction ID: {transaction_id}", transaction_id
+
+
+def _refund_overpayment(gateway: PaymentGateway, patron_id: str, amount: float, transaction_id: str,
+                        outstanding_cents: int) -> Tuple[bool, str, Optional[str]]:
+    """Refund a payment that no longer fits the patron's balance; it was never posted."""
+    try:
+        result = gateway.process_refund(transaction_id=transaction_id, amount=amount)
+        refunded = result['status'] == 'success'
+    except Exception as e:
+        refunded = False
+    if not refunded:
+        logger.error('payment %s for patron %s exceeds balance and was not refunded', transaction_id, patron_id)
+        return False, f"Payment exceeds outstanding balance and could not be refunded. Transaction ID: {transaction_id}", transaction_id
+    return False, f"Amount exceeds outstanding balance of ${max(outstanding_cents, 0) / 100:.2f}. The payment was refunded.", None
 
 
 def refund_late_fee_payment(transaction_id: str, amount: float, payment_gateway: Optional[PaymentGateway] = None) -> Tuple[bool, str, Optional[str]]:
@@ -367,6 +588,17 @@ def refund_late_fee_payment(transaction_id: str, amount: float, payment_gateway:
     if amount > 15.00:
         return False, "Refund amount exceeds maximum late fee of $15.00.", None
     
+    # Payments recorded in the ledger cannot be refunded beyond what was paid
+    conn = get_db_connection()
+    try:
+        payment = get_refundable_payment(conn, transaction_id)
+    except Exception as e:
+        conn.close()
+        return False, f"Could not read payment record: {str(e)}", None
+    if payment is not None and to_cents(amount) > payment['refundable_cents']:
+        conn.close()
+        return False, f"Refund amount exceeds refundable amount of ${payment['refundable_cents'] / 100:.2f}.", None
+    
     # Use provided gateway or create new one
     gateway = payment_gateway or PaymentGateway()
     
@@ -376,14 +608,28 @@ def refund_late_fee_payment(transaction_id: str, amount: float, payment_gateway:
             transaction_id=transaction_id,
             amount=amount
         )
-        
-        if result['status'] == 'success':
-            refund_id = result['refund_id']
-            return True, f"Refund of ${amount:.2f} processed successfully. Refund ID: {refund_id}", refund_id
-        else:
-            return False, "Refund processing failed.", None
-            
     except PaymentGatewayError as e:
+        conn.close()
         return False, f"Payment gateway error: {str(e)}", None
     except Exception as e:
+        conn.close()
         return False, f"Unexpected error during refund processing: {str(e)}", None
+    
+    if result['status'] != 'success':
+        conn.close()
+        return False, "Refund processing failed.", None
+    
+    refund_id = result['refund_id']
+    if payment is not None:
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            post_ledger_entry(conn, payment['patron_id'], 'refund', to_cents(amount), reference=transaction_id)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            conn.close()
+            logger.error('refund %s of payment %s not recorded in ledger: %s', refund_id, transaction_id, e)
+            return False, f"Refund was processed but could not be recorded. Refund ID: {refund_id}", refund_id
+    conn.close()
+    
+    return True, f"Refund of ${amount:.2f} processed successfully. Refund ID: {refund_id}", refund_id
@@ -0,0 +1,166 @@
+"""
+Profiling - Opt-in per-function timing and sampled cProfile for service calls
+Profiling is off by default and can be switched on at runtime from the
+admin endpoints (for every worker); each process keeps its own statistics
+"""
+
+from typing import Callable, Dict, Optional
+import cProfile
+import functools
+import io
+import os
+import pstats
+import random
+import threading
+import time
+
+MODES = ('off', 'timing', 'cprofile')
+
+# Number of pstats rows reported per function
+DEFAULT_PROFILE_LINES = 20
+
+
+def check_settings(mode: str, sample_rate: Optional[float] = None) -> None:
+    """Raise ValueError for an unknown mode or a sample rate outside 0-1."""
+    if mode not in MODES:
+        raise ValueError(f'Profiling mode must be one of {", ".join(MODES)}')
+    if sample_rate is not None and not 0.0 <= sample_rate <= 1.0:
+        raise ValueError('Sample rate must be between 0 and 1')
+
+
+class FunctionStats:
+    """Aggregated wall-clock timings (and sampled profiles) for one function."""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+        self.profiled_calls = 0
+        self.profile: Optional[pstats.Stats] = None
+
+    def record(self, elapsed: float, failed: bool) -> None:
+        self.calls += 1
+        self.errors += failed
+        self.total += elapsed
+        self.min = elapsed if self.min is None else min(self.min, elapsed)
+        self.max = max(self.max, elapsed)
+
+    def add_profile(self, profile: cProfile.Profile) -> None:
+        self.profiled_calls += 1
+        if self.profile is None:
+            self.profile = pstats.Stats(profile)
+        else:
+            self.profile.add(profile)
+
+    def to_dict(self, profile_lines: int = DEFAULT_PROFILE_LINES) -> Dict:
+        result = {
+            'calls': self.calls,
+            'errors': self.errors,
+            'total_ms': self.total * 1000,
+            'mean_ms': self.total * 1000 / self.calls if self.calls else 0.0,
+            'min_ms': (self.min or 0.0) * 1000,
+            'max_ms': self.max * 1000,
+            'profiled_calls': self.profiled_calls,
+        }
+        if self.profile is not None:
+            output = io.StringIO()
+            self.profile.stream = output
+            self.profile.sort_stats('cumulative').print_stats(profile_lines)
+            result['profile'] = output.getvalue()
+        return result
+
+
+class Profiler:
+    """
+    Registry of profiled functions and their statistics.
+
+    In 'timing' mode every call is timed. In 'cprofile' mode every call is
+    timed and a sample_rate fraction of calls also runs under cProfile.
+    When off, a profiled function costs one attribute check per call.
+    """
+
+    def __init__(self, mode: str = 'off', sample_rate: float = 0.1):
+        self.enabled = False
+        self.mode = 'off'
+        self.sample_rate = sample_rate
+        self._functions: Dict[str, Callable] = {}
+        self._stats: Dict[str, FunctionStats] = {}
+        self._lock = threading.Lock()
+        # Only one cProfile.Profile may be active per thread
+        self._local = threading.local()
+        self.configure(mode, sample_rate)
+
+    def configure(self, mode: str, sample_rate: Optional[float] = None) -> None:
+        """Switch profiling mode at runtime."""
+        check_settings(mode, sample_rate)
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        self.mode = mode
+        self.enabled = mode != 'off'
+
+    def profiled(self, func: Callable = None, *, name: Optional[str] = None):
+        """Decorator registering a function for profiling."""
+        if func is None:
+            return functools.partial(self.profiled, name=name)
+
+        key = name or f'{func.__module__}.{func.__qualname__}'
+        self._functions[key] = func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return func(*args, **kwargs)
+            return self._call(key, func, args, kwargs)
+
+        return wrapper
+
+    def _call(self, key: str, func: Callable, args, kwargs):
+        profile = None
+        if (self.mode == 'cprofile' and not getattr(self._local, 'profiling', False)
+                and random.random() < self.sample_rate):
+            profile = cProfile.Profile()
+            self._local.profiling = True
+
+        failed = True
+        start = time.perf_counter()
+        try:
+            if profile is not None:
+                result = profile.runcall(func, *args, **kwargs)
+            else:
+                result = func(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            if profile is not None:
+                self._local.profiling = False
+            with self._lock:
+                stats = self._stats.get(key)
+                if stats is None:
+                    stats = self._stats[key] = FunctionStats()
+                stats.record(elapsed, failed)
+                if profile is not None:
+                    stats.add_profile(profile)
+
+    def reset(self) -> None:
+        """Discard collected statistics."""
+        with self._lock:
+            self._stats.clear()
+
+    def stats(self, profile_lines: int = DEFAULT_PROFILE_LINES) -> Dict:
+        """Current mode and per-function statistics."""
+        with self._lock:
+            functions = {key: stats.to_dict(profile_lines) for key, stats in self._stats.items()}
+        return {
+            'mode': self.mode,
+            'sample_rate': self.sample_rate,
+            'pid': os.getpid(),
+            'registered': sorted(self._functions),
+            'functions': functions,
+        }
+
+
+profiler = Profiler(os.environ.get('LIBRARY_PROFILING', 'off'))
+profiled = profiler.profiled
@@ -0,0 +1,187 @@
+"""
+Query Log - Slow-query capture for every connection from database.get_db_connection
+Statements slower than a threshold are logged with their parameter shape,
+duration and EXPLAIN QUERY PLAN, kept in memory for the admin page and
+optionally written to a rotating log file
+"""
+
+from collections import deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from typing import Dict, List, Optional
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger('library.slow_queries')
+# Silent unless the app configures logging or configure_log_file is called
+logger.addHandler(logging.NullHandler())
+
+DEFAULT_THRESHOLD_MS = 100.0
+DEFAULT_MAX_RECENT = 200
+DEFAULT_LOG_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_LOG_BACKUPS = 5
+
+# Statements EXPLAIN QUERY PLAN can describe
+_EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'WITH')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace so the same statement always has the same text."""
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def parameter_shape(parameters, many: bool = False) -> str:
+    """
+    Describe bound parameters by type only (values may be patron data).
+
+    e.g. '(str, int)', '{patron_id: str}', '500 x (str, int)'
+    """
+    if many:
+        rows = list(parameters) if not isinstance(parameters, (list, tuple)) else parameters
+        return f'{len(rows)} x {parameter_shape(rows[0])}' if rows else '0 rows'
+    if isinstance(parameters, dict):
+        return '{' + ', '.join(f'{key}: {type(value).__name__}' for key, value in parameters.items()) + '}'
+    return '(' + ', '.join(type(value).__name__ for value in parameters) + ')'
+
+
+class QueryLog:
+    """
+    Collects statements that ran longer than threshold_ms.
+
+    Tracing applies to connections opened after it is enabled; disabled
+    tracing hands out plain sqlite3 connections, so it costs nothing.
+    """
+
+    def __init__(self, threshold_ms: Optional[float] = DEFAULT_THRESHOLD_MS, max_recent: int = DEFAULT_MAX_RECENT):
+        self.threshold_ms = threshold_ms
+        self._recent = deque(maxlen=max_recent)
+        self._summary: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms is not None
+
+    def connection_factory(self):
+        """sqlite3.connect factory for new connections."""
+        return TracingConnection if self.enabled else sqlite3.Connection
+
+    def record(self, conn: sqlite3.Connection, sql: str, parameters, shape: str, elapsed_ms: float) -> None:
+        """Log a slow statement and capture its query plan."""
+        statement = normalize_sql(sql)
+        entry = {
+            'sql': statement,
+            'parameters': shape,
+            'duration_ms': round(elapsed_ms, 3),
+            'plan': explain_query_plan(conn, sql, parameters),
+            'logged_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        with self._lock:
+            self._recent.append(entry)
+            summary = self._summary.get(statement)
+            if summary is None:
+                summary = self._summary[statement] = {'sql': statement, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+            summary['count'] += 1
+            summary['total_ms'] += elapsed_ms
+            summary['max_ms'] = max(summary['max_ms'], elapsed_ms)
+        logger.warning('slow query %.1f ms params=%s plan=%s sql=%s',
+                       elapsed_ms, shape, ' | '.join(entry['plan']), statement)
+
+    def recent(self) -> List[Dict]:
+        """Slow statements, newest first."""
+        with self._lock:
+            return list(reversed(self._recent))
+
+    def summary(self) -> List[Dict]:
+        """Slow statements grouped by text, by total time spent."""
+        with self._lock:
+            rows = [dict(row) for row in self._summary.values()]
+        return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._recent.clear()
+            self._summary.clear()
+
+
+def explain_query_plan(conn: sqlite3.Connection, sql: str, parameters=()) -> List[str]:
+    """EXPLAIN QUERY PLAN rows for a statement, or [] if it cannot be explained."""
+    if not sql.lstrip().upper().startswith(_EXPLAINABLE):
+        return []
+    try:
+        # Plain cursor so explaining is not itself traced
+        cursor = sqlite3.Cursor(conn)
+        cursor.row_factory = None
+        rows = cursor.execute(f'EXPLAIN QUERY PLAN {sql}', parameters).fetchall()
+    except sqlite3.Error:
+        return []
+    return [row[-1] for row in rows]
+
+
+class TracingCursor(sqlite3.Cursor):
+    """Cursor that times execute/executemany against the query log."""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._check(sql, parameters, start, False)
+
+    def executemany(self, sql, seq_of_parameters):
+        if not isinstance(seq_of_parameters, (list, tuple)):
+            seq_of_parameters = list(seq_of_parameters)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._check(sql, seq_of_parameters, start, True)
+
+    def _check(self, sql, parameters, start: float, many: bool) -> None:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        threshold_ms = query_log.threshold_ms
+        if threshold_ms is not None and elapsed_ms >= threshold_ms:
+            shape = parameter_shape(parameters, many)
+            if many:
+                parameters = parameters[0] if parameters else ()
+            query_log.record(self.connection, sql, parameters, shape, elapsed_ms)
+
+
+class TracingConnection(sqlite3.Connection):
+    """Connection whose cursors, including the execute() shortcuts, are traced."""
+
+    def cursor(self, factory=TracingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def configure_log_file(path: str, max_bytes: int = DEFAULT_LOG_MAX_BYTES, backups: int = DEFAULT_LOG_BACKUPS) -> None:
+    """Write slow queries to a size-rotated log file."""
+    handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups)
+    handler.setFormatter(logging.Formatter('%(asctime)s %(process)d %(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.WARNING)
+
+
+def _threshold_from_env() -> Optional[float]:
+    value = os.environ.get('LIBRARY_SLOW_QUERY_MS')
+    if value is None:
+        return DEFAULT_THRESHOLD_MS
+    if value.strip().lower() in ('', 'off'):
+        return None
+    return float(value)
+
+
+query_log = QueryLog(_threshold_from_env())
+if os.environ.get('LIBRARY_SLOW_QUERY_LOG'):
+    configure_log_file(os.environ['LIBRARY_SLOW_QUERY_LOG'])
@@ -0,0 +1,349 @@
+"""
+Rate Limiting - Token buckets per client and patron, plus load shedding
+Requests are admitted in a before_request hook, so rejected requests never
+reach the route or the database
+"""
+
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from flask import g, jsonify, make_response, request
+
+logger = logging.getLogger(__name__)
+
+
+class Limit(NamedTuple):
+    """A token bucket: up to capacity requests at once, refilled at rate per second."""
+    capacity: float
+    rate: float
+
+
+def parse_limit(text: str) -> Limit:
+    """Parse 'requests/seconds' (e.g. '20/60') into a Limit."""
+    try:
+        requests, seconds = (float(part) for part in text.split('/'))
+    except ValueError:
+        raise ValueError(f'Rate limit must look like requests/seconds, got {text!r}') from None
+    if requests <= 0 or seconds <= 0:
+        raise ValueError(f'Rate limit must be positive, got {text!r}')
+    return Limit(requests, requests / seconds)
+
+
+# Default buckets: writes per client IP, writes per patron, searches per client IP
+DEFAULT_LIMITS = {
+    'write': parse_limit('30/60'),
+    'patron': parse_limit('10/60'),
+    'search': parse_limit('120/60'),
+}
+
+# Requests per worker process that may run at once before new ones are shed.
+# A gunicorn worker never runs more than its threads at once, so these only
+# trip on servers with more threads than the caps; queue wait covers the rest
+DEFAULT_MAX_IN_FLIGHT = 32
+# Writes beyond this would only queue on SQLite's write lock
+DEFAULT_MAX_IN_FLIGHT_WRITES = 4
+# Seconds a request may wait for a worker (measured from the proxy's
+# X-Request-Start header) before it is shed instead of served late
+DEFAULT_MAX_QUEUE_WAIT = 2.0
+DEFAULT_MAX_QUEUE_WAIT_WRITES = 0.5
+
+# (endpoint, methods) -> bucket group; GET /return only renders the form
+LIMITED_ENDPOINTS = {
+    'borrowing.borrow_book': ('write', ('POST',)),
+    'borrowing.return_book': ('write', ('POST',)),
+    'borrowing.hold_book': ('write', ('POST',)),
+    'borrowing.cancel_hold_request': ('write', ('POST',)),
+    'catalog.add_book': ('write', ('POST',)),
+    'api.pay_fees_api': ('write', ('POST',)),
+    'search.search_books': ('search', ('GET',)),
+    'api.search_books_api': ('search', ('GET',)),
+    'api.suggest_api': ('search', ('GET',)),
+}
+
+
+def parse_request_start(value: Optional[str]) -> Optional[float]:
+    """
+    Epoch seconds from an X-Request-Start header: 't=1700000000.123'
+    (nginx $msec) or a bare number in seconds, milliseconds or microseconds.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.startswith('t='):
+        value = value[2:]
+    try:
+        started = float(value)
+    except ValueError:
+        return None
+    # Scale milliseconds and microseconds down to seconds
+    while started > 1e11:
+        started /= 1000
+    return started
+
+
+def _refill(tokens: float, updated: float, now: float, limit: Limit) -> float:
+    return min(limit.capacity, tokens + max(now - updated, 0.0) * limit.rate)
+
+
+def _retry_after(tokens: float, limit: Limit) -> float:
+    return (1 - tokens) / limit.rate
+
+
+def _full_at(tokens: float, now: float, limit: Limit) -> float:
+    return now + (limit.capacity - tokens) / limit.rate
+
+
+# Takes between sweeps for buckets that have refilled (and can be forgotten)
+PRUNE_EVERY = 1000
+
+
+class MemoryBucketStore:
+    """Token buckets for one process, dropped once idle long enough to be full again."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        # key -> (tokens, updated, time the bucket is full again)
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}
+        self._lock = threading.Lock()
+        self._takes = 0
+
+    def take(self, key: str, limit: Limit) -> Tuple[bool, float]:
+        """Take one token; returns (allowed, seconds until a token is available)."""
+        with self._lock:
+            now = self.clock()
+            tokens, updated, _ = self._buckets.get(key, (limit.capacity, now, now))
+            tokens = _refill(tokens, updated, now, limit)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now, _full_at(tokens, now, limit))
+            self._takes += 1
+            if self._takes % PRUNE_EVERY == 0:
+                self._buckets = {key: bucket for key, bucket in self._buckets.items() if bucket[2] > now}
+            return allowed, 0.0 if allowed else _retry_after(tokens, limit)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class SQLiteBucketStore:
+    """
+    Token buckets in a SQLite file shared by every worker on the host.
+
+    Kept apart from the library database so limiter writes never wait on
+    (or hold) its write lock. If the file stays locked past lock_timeout
+    the request is allowed: the limiter never takes the site down with it.
+    """
+
+    def __init__(self, path: str, lock_timeout: float = 0.05, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.lock_timeout = lock_timeout
+        self.clock = clock
+        self._local = threading.local()
+        self._takes = 0
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+                key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated REAL NOT NULL,
+                full_at REAL NOT NULL
+            ) WITHOUT ROWID
+        ''')
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.lock_timeout, isolation_level=None)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def take(self, key: str, limit: Limit) -> Tuple[bool, float]:
+        """Take one token; returns (allowed, seconds until a token is available)."""
+        conn = self._connection()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            now = self.clock()
+            row = conn.execute('SELECT tokens, updated FROM rate_limit_buckets WHERE key = ?', (key,)).fetchone()
+            tokens = _refill(*row, now, limit) if row else limit.capacity
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            conn.execute(
+                'INSERT OR REPLACE INTO rate_limit_buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?)',
+                (key, tokens, now, _full_at(tokens, now, limit))
+            )
+            self._takes += 1
+            if self._takes % PRUNE_EVERY == 0:
+                conn.execute('DELETE FROM rate_limit_buckets WHERE full_at <= ?', (now,))
+            conn.execute('COMMIT')
+        except sqlite3.OperationalError as e:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            logger.warning('Rate limit store unavailable, allowing request: %s', e)
+            return True, 0.0
+        return allowed, 0.0 if allowed else _retry_after(tokens, limit)
+
+
+class AdmissionController:
+    """
+    Sheds requests that already waited too long for a worker, and new ones
+    past the per-process caps on running requests.
+
+    The wait is the real queue: under gunicorn requests back up in the
+    listen socket and in each worker, where no in-process counter sees
+    them. Shed requests get 503 immediately instead of being served after
+    the client has given up (for writes, behind SQLite's write lock).
+    """
+
+    def __init__(self, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                 max_in_flight_writes: int = DEFAULT_MAX_IN_FLIGHT_WRITES,
+                 max_queue_wait: float = DEFAULT_MAX_QUEUE_WAIT,
+                 max_queue_wait_writes: float = DEFAULT_MAX_QUEUE_WAIT_WRITES):
+        self.max_in_flight = max_in_flight
+        self.max_in_flight_writes = max_in_flight_writes
+        self.max_queue_wait = max_queue_wait
+        self.max_queue_wait_writes = max_queue_wait_writes
+        self.in_flight = 0
+        self.in_flight_writes = 0
+        self.shed = 0
+        self.shed_waited = 0
+        self._lock = threading.Lock()
+
+    def admit(self, write: bool, queue_wait: Optional[float] = None) -> bool:
+        """queue_wait: seconds the request waited before reaching the app, if known."""
+        with self._lock:
+            if queue_wait is not None and queue_wait > (self.max_queue_wait_writes if write else self.max_queue_wait):
+                self.shed += 1
+                self.shed_waited += 1
+                return False
+            if self.in_flight >= self.max_in_flight or (write and self.in_flight_writes >= self.max_in_flight_writes):
+                self.shed += 1
+                return False
+            self.in_flight += 1
+            self.in_flight_writes += write
+            return True
+
+    def release(self, write: bool) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.in_flight_writes -= write
+
+
+def create_bucket_store(spec: Optional[str]):
+    """
+    Bucket store from a LIBRARY_RATE_LIMIT_STORE value.
+
+    'memory' (default) keeps buckets per worker process, so each of N
+    workers allows the full rate; a file path shares them across workers;
+    'off' disables rate limiting.
+    """
+    if not spec or spec == 'memory':
+        return MemoryBucketStore()
+    if spec == 'off':
+        return None
+    return SQLiteBucketStore(spec)
+
+
+class RateLimiter:
+    """
+    Admission checks for one Flask app: load shedding first (cheapest),
+    then the client's IP bucket and, for writes, the patron's bucket.
+    """
+
+    def __init__(self, store=None, limits: Optional[Dict[str, Limit]] = None,
+                 admission: Optional[AdmissionController] = None, clock: Callable[[], float] = time.time):
+        self.store = store
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self.admission = admission or AdmissionController()
+        self.clock = clock
+        self.rejected = 0
+
+    @classmethod
+    def from_env(cls) -> 'RateLimiter':
+        """
+        Configure from the environment: LIBRARY_RATE_LIMIT_STORE,
+        LIBRARY_RATE_LIMIT_WRITE / _PATRON / _SEARCH ('requests/seconds'),
+        LIBRARY_MAX_IN_FLIGHT, LIBRARY_MAX_IN_FLIGHT_WRITES and
+        LIBRARY_MAX_QUEUE_WAIT / _WRITES (seconds).
+        """
+        limits = {}
+        for group in DEFAULT_LIMITS:
+            value = os.environ.get(f'LIBRARY_RATE_LIMIT_{group.upper()}')
+            if value:
+                limits[group] = parse_limit(value)
+        admission = AdmissionController(
+            int(os.environ.get('LIBRARY_MAX_IN_FLIGHT', DEFAULT_MAX_IN_FLIGHT)),
+            int(os.environ.get('LIBRARY_MAX_IN_FLIGHT_WRITES', DEFAULT_MAX_IN_FLIGHT_WRITES)),
+            float(os.environ.get('LIBRARY_MAX_QUEUE_WAIT', DEFAULT_MAX_QUEUE_WAIT)),
+            float(os.environ.get('LIBRARY_MAX_QUEUE_WAIT_WRITES', DEFAULT_MAX_QUEUE_WAIT_WRITES))
+        )
+        return cls(create_bucket_store(os.environ.get('LIBRARY_RATE_LIMIT_STORE')), limits, admission)
+
+    def init_app(self, app) -> None:
+        app.extensions['rate_limiter'] = self
+        app.before_request(self.before_request)
+        app.teardown_request(self.teardown_request)
+
+    def _take(self, group: str, key: str) -> Tuple[bool, float]:
+        return self.store.take(f'{group}:{key}', self.limits[group])
+
+    def before_request(self):
+        g.admitted_write = None
+        group, methods = LIMITED_ENDPOINTS.get(request.endpoint, (None, ()))
+        if request.method not in methods:
+            group = None
+        write = group == 'write'
+
+        started = parse_request_start(request.headers.get('X-Request-Start'))
+        queue_wait = self.clock() - started if started is not None else None
+        if not self.admission.admit(write, queue_wait):
+            return self._reject(503, 'Server is busy, please retry shortly.', 1)
+        g.admitted_write = write
+
+        if group is None or self.store is None:
+            return None
+        allowed, retry_after = self._take(group, request.remote_addr or 'unknown')
+        if allowed and write:
+            data = request.get_json(silent=True) or request.form
+            patron_id = str(data.get('patron_id', '')).strip()
+            if patron_id:
+                allowed, retry_after = self._take('patron', patron_id)
+        if not allowed:
+            return self._reject(429, 'Too many requests, please slow down.', retry_after)
+        return None
+
+    def teardown_request(self, exc=None) -> None:
+        write = g.pop('admitted_write', None)
+        if write is not None:
+            self.admission.release(write)
+
+    def _reject(self, status: int, message: str, retry_after: float):
+        self.rejected += 1
+        if request.path.startswith('/api/'):
+            response = jsonify({'error': message})
+        else:
+            response = make_response(message)
+            response.mimetype = 'text/plain'
+        response.status_code = status
+        response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        return response
+
+    def stats(self) -> Dict:
+        """Counters for this worker process."""
+        return {
+            'pid': os.getpid(),
+            'store': type(self.store).__name__ if self.store else 'off',
+            'in_flight': self.admission.in_flight,
+            'in_flight_writes': self.admission.in_flight_writes,
+            'shed': self.admission.shed,
+            'shed_waited': self.admission.shed_waited,
+            'rejected': self.rejected,
+        }
@@ -0,0 +1,101 @@
+"""
+Runtime Settings - Admin changes shared by every worker process
+Settings are JSON values in the settings table; each worker re-reads the
+table before a request at most once per poll interval and applies what
+changed, so a change made through one worker reaches all of them
+"""
+
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from database import get_db_connection
+from models import to_timestamp
+from services.profiling import profiler
+from services.query_log import query_log
+
+logger = logging.getLogger(__name__)
+
+# Seconds a worker may run on settings it has already read
+DEFAULT_POLL_INTERVAL = 1.0
+
+
+class RuntimeSettings:
+    """
+    Named settings with a listener each; a listener runs in every worker
+    whenever the stored value differs from the one it last applied.
+    """
+
+    def __init__(self, poll_interval: float = DEFAULT_POLL_INTERVAL, clock: Callable[[], float] = time.monotonic):
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self._listeners: Dict[str, Callable[[Any], None]] = {}
+        self._applied: Dict[str, str] = {}
+        self._next_poll = 0.0
+        self._lock = threading.Lock()
+
+    def on_change(self, name: str, listener: Callable[[Any], None]) -> None:
+        self._listeners[name] = listener
+
+    def set(self, name: str, value: Any) -> None:
+        """Store a setting for all workers and apply it in this one now."""
+        raw = json.dumps(value, sort_keys=True)
+        conn = get_db_connection()
+        conn.execute(
+            '''INSERT INTO settings (name, value, updated_ts) VALUES (?, ?, ?)
+               ON CONFLICT (name) DO UPDATE SET value = excluded.value, updated_ts = excluded.updated_ts''',
+            (name, raw, to_timestamp(datetime.now()))
+        )
+        conn.commit()
+        conn.close()
+        with self._lock:
+            self._applied[name] = raw
+        self._notify(name, raw)
+
+    def get(self, name: str, default: Any = None) -> Any:
+        conn = get_db_connection()
+        row = conn.execute('SELECT value FROM settings WHERE name = ?', (name,)).fetchone()
+        conn.close()
+        return json.loads(row['value']) if row else default
+
+    def poll(self, force: bool = False) -> None:
+        """Apply settings changed by other workers (before_request hook)."""
+        now = self.clock()
+        if not force and now < self._next_poll:
+            return
+        self._next_poll = now + self.poll_interval
+        try:
+            conn = get_db_connection()
+            rows = conn.execute('SELECT name, value FROM settings').fetchall()
+            conn.close()
+        except sqlite3.OperationalError as e:
+            # Keep serving on the settings already applied
+            logger.warning('could not read runtime settings: %s', e)
+            return
+        for row in rows:
+            with self._lock:
+                if self._applied.get(row['name']) == row['value']:
+                    continue
+                self._applied[row['name']] = row['value']
+            self._notify(row['name'], row['value'])
+
+    def _notify(self, name: str, raw: str) -> None:
+        listener = self._listeners.get(name)
+        if listener is not None:
+            listener(json.loads(raw))
+
+
+def _set_slow_query_threshold(threshold_ms: Optional[float]) -> None:
+    query_log.threshold_ms = threshold_ms
+
+
+runtime_settings = RuntimeSettings()
+runtime_settings.on_change('profiling', lambda value: profiler.configure(value['mode'], value['sample_rate']))
+# Reset and clear store when they were requested, so each worker acts once
+runtime_settings.on_change('profiling_reset', lambda requested_at: profiler.reset())
+runtime_settings.on_change('slow_query_threshold_ms', _set_slow_query_threshold)
+runtime_settings.on_change('slow_query_clear', lambda requested_at: query_log.clear())
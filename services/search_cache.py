@@ -0,0 +1,203 @@
+"""
+Search Cache - Bounded LRU cache for catalog search results
+Shared by the HTML search page and the JSON search API
+"""
+
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+import json
+import threading
+import time
+
+from database import register_catalog_listener
+from models import Book
+from services.isbn import normalize_isbn
+from services.library_service import search_books_in_catalog
+
+# Default limits for the shared cache
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024
+# Seconds an entry is served; bounds staleness from writes made by other
+# worker processes, whose catalog notifications never reach this one
+DEFAULT_MAX_AGE = 30.0
+
+# SQLite's LOWER() and LIKE only fold ASCII letters, so the cache key must too
+_ASCII_LOWER = str.maketrans('ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')
+
+
+def normalize_search_key(search_term: str, search_type: str) -> Tuple[str, str]:
+    """
+    Build the cache key for a search.
+
+    Two searches share a key only if search_books_in_catalog would return
+    the same rows for both: unknown search types fall back to title search,
+    ISBNs are canonicalized, and title/author terms are compared
+    case-insensitively for ASCII letters.
+    """
+    term = (search_term or '').strip()
+    if search_type == 'isbn':
+        return 'isbn', normalize_isbn(term) or term
+    if search_type != 'author':
+        search_type = 'title'
+    return search_type, term.translate(_ASCII_LOWER)
+
+
+def _estimate_size(key: Tuple[str, str], results: Tuple[Book, ...]) -> int:
+    """Approximate memory cost of an entry by its serialized size."""
+    return len(key[1]) + len(json.dumps(results, default=str))
+
+
+class SearchResultCache:
+    """
+    LRU cache of search results bounded by entry count and approximate bytes.
+
+    Results are immutable Book records, so entries are shared with callers
+    without copying.
+
+    Entries are dropped when a book they contain changes availability and the
+    whole cache is cleared when a new book is inserted. Those notifications
+    only come from this process, so entries also expire after max_age.
+
+    Every invalidation bumps the generation; put() with the generation read
+    before the query refuses results that an invalidation may have outdated.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_age: float = DEFAULT_MAX_AGE, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.clock = clock
+        self._entries: 'OrderedDict[Tuple[str, str], Tuple[Tuple[Book, ...], int, float]]' = OrderedDict()
+        self._keys_by_book: Dict[int, Set[Tuple[str, str]]] = {}
+        self._bytes = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.expirations = 0
+        self.stale_puts = 0
+
+    @property
+    def generation(self) -> int:
+        """Read before running a query whose results will be put()."""
+        return self._generation
+
+    def get(self, search_term: str, search_type: str) -> Optional[List[Book]]:
+        """Return cached results, or None on a miss."""
+        key = normalize_search_key(search_term, search_type)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.clock() - entry[2] > self.max_age:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(entry[0])
+
+    def put(self, search_term: str, search_type: str, results: List[Book],
+            generation: Optional[int] = None) -> None:
+        """
+        Store results for a search, evicting least recently used entries as needed.
+
+        If generation is given and the cache was invalidated since it was
+        read, the results may predate that change and are not stored.
+        """
+        key = normalize_search_key(search_term, search_type)
+        books = tuple(results)
+        size = _estimate_size(key, books)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                self.stale_puts += 1
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (books, size, self.clock())
+            self._bytes += size
+            for book in books:
+                self._keys_by_book.setdefault(book['id'], set()).add(key)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_book(self, book_id: int) -> None:
+        """Drop every entry whose results include the given book."""
+        with self._lock:
+            self._generation += 1
+            for key in self._keys_by_book.pop(book_id, set()):
+                if key in self._entries:
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        with self._lock:
+            self._generation += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._keys_by_book.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        """Return size and hit-ratio metrics."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'max_age': self.max_age,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'expirations': self.expirations,
+                'stale_puts': self.stale_puts
+            }
+
+    def _remove(self, key: Tuple[str, str]) -> None:
+        books, size, _ = self._entries.pop(key)
+        self._bytes -= size
+        for book in books:
+            keys = self._keys_by_book.get(book['id'])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_book[book['id']]
+
+    def on_catalog_change(self, event: str, book_id: Optional[int]) -> None:
+        """Catalog listener: keep cached results consistent with the books table."""
+        if event == 'availability' and book_id is not None:
+            self.invalidate_book(book_id)
+        else:
+            self.clear()
+
+
+search_cache = SearchResultCache()
+register_catalog_listener(search_cache.on_catalog_change)
+
+
+def search_books_cached(search_term: str, search_type: str) -> List[Book]:
+    """
+    Search the catalog through the shared result cache.
+    Same contract as search_books_in_catalog.
+    """
+    if not search_term:
+        return []
+    results = search_cache.get(search_term, search_type)
+    if results is None:
+        generation = search_cache.generation
+        results = search_books_in_catalog(search_term, search_type)
+        search_cache.put(search_term, search_type, results, generation)
+    return results
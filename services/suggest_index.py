@@ -0,0 +1,177 @@
+"""
+Suggest Index - In-memory prefix index over book titles and authors
+Backs typeahead suggestions without scanning the books table
+"""
+
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+import os
+import re
+import threading
+import time
+import unicodedata
+
+from database import get_all_books, get_book_by_id, register_catalog_listener
+
+DEFAULT_SUGGEST_LIMIT = 10
+MAX_SUGGEST_LIMIT = 50
+
+# Seconds before the index is rebuilt in the background to pick up books
+# added by other worker processes (whose notifications never reach this one)
+DEFAULT_MAX_AGE = 30.0
+
+_NON_WORD = re.compile(r'[\W_]+')
+
+# Entry layout: (normalized key, field, book_id)
+IndexEntry = Tuple[str, str, int]
+
+
+def normalize_text(text: str) -> str:
+    """Casefold, strip accents and punctuation, and collapse whitespace."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return ' '.join(_NON_WORD.sub(' ', stripped.casefold()).split())
+
+
+def _word_suffixes(normalized: str) -> List[str]:
+    """Every suffix of the text that starts at a word boundary."""
+    words = normalized.split(' ')
+    return [' '.join(words[i:]) for i in range(len(words))]
+
+
+class PrefixIndex:
+    """
+    Sorted list of normalized title/author suffixes searched with bisect.
+
+    Each title and author is indexed once per word so that "gats" finds
+    "The Great Gatsby". Lookups cost O(log n + k) for k returned suggestions.
+
+    An index built from the books table is rebuilt in the background once
+    it is older than max_age, like the catalog snapshot.
+    """
+
+    def __init__(self, max_age: float = DEFAULT_MAX_AGE):
+        self.max_age = max_age
+        self._entries: List[IndexEntry] = []
+        self._display: Dict[Tuple[str, int], str] = {}
+        self._lock = threading.Lock()
+        self._rebuilding = threading.Event()
+        self.built = False
+        self.built_at: Optional[float] = None
+
+    def build(self, books: Optional[List[Dict]] = None) -> None:
+        """(Re)build the index from the books table or the given rows."""
+        # Only an index of the whole books table can be refreshed from it
+        built_at = time.monotonic() if books is None else None
+        if books is None:
+            books = get_all_books()
+        entries: List[IndexEntry] = []
+        display: Dict[Tuple[str, int], str] = {}
+        for book in books:
+            for field in ('title', 'author'):
+                display[(field, book['id'])] = book[field]
+                for key in _word_suffixes(normalize_text(book[field])):
+                    if key:
+                        entries.append((key, field, book['id']))
+        entries.sort()
+        with self._lock:
+            self._entries = entries
+            self._display = display
+            self.built = True
+            self.built_at = built_at
+
+    def add_book(self, book: Dict) -> None:
+        """Index a single newly inserted book."""
+        with self._lock:
+            for field in ('title', 'author'):
+                self._display[(field, book['id'])] = book[field]
+                for key in _word_suffixes(normalize_text(book[field])):
+                    if key:
+                        insort(self._entries, (key, field, book['id']))
+
+    def clear(self) -> None:
+        """Drop all entries; the next lookup rebuilds from the database."""
+        with self._lock:
+            self._entries = []
+            self._display = {}
+            self.built = False
+            self.built_at = None
+
+    def reset_after_fork(self) -> None:
+        """Give a forked child a fresh lock and rebuild flag (see CatalogSnapshotStore)."""
+        self._lock = threading.Lock()
+        self._rebuilding = threading.Event()
+
+    def _rebuild_if_stale(self) -> None:
+        built_at = self.built_at
+        if built_at is None or time.monotonic() - built_at <= self.max_age or self._rebuilding.is_set():
+            return
+        self._rebuilding.set()
+        threading.Thread(target=self._background_rebuild, daemon=True).start()
+
+    def _background_rebuild(self) -> None:
+        try:
+            self.build()
+        except Exception as e:
+            # Keep serving the current index; the next stale lookup retries
+            pass
+        finally:
+            self._rebuilding.clear()
+
+    def suggest(self, prefix: str, limit: int = DEFAULT_SUGGEST_LIMIT, field: Optional[str] = None) -> List[Dict]:
+        """
+        Return up to `limit` distinct titles/authors containing a word starting with prefix.
+
+        Args:
+            prefix: Text typed so far
+            limit: Maximum number of suggestions
+            field: Restrict to 'title' or 'author'
+
+        Returns:
+            list: dicts with 'text', 'field' and 'book_id'
+        """
+        normalized = normalize_text(prefix)
+        if not normalized or limit <= 0:
+            return []
+        if not self.built:
+            self.build()
+        else:
+            self._rebuild_if_stale()
+
+        suggestions = []
+        seen = set()
+        with self._lock:
+            entries = self._entries
+            i = bisect_left(entries, (normalized,))
+            while i < len(entries) and len(suggestions) < limit:
+                key, entry_field, book_id = entries[i]
+                if not key.startswith(normalized):
+                    break
+                i += 1
+                if field and entry_field != field:
+                    continue
+                text = self._display[(entry_field, book_id)]
+                if (entry_field, text) in seen:
+                    continue
+                seen.add((entry_field, text))
+                suggestions.append({'text': text, 'field': entry_field, 'book_id': book_id})
+        return suggestions
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def on_catalog_change(self, event: str, book_id: Optional[int]) -> None:
+        """Catalog listener: index inserted books, rebuild lazily after a reset."""
+        if event == 'insert' and book_id is not None:
+            if self.built:
+                book = get_book_by_id(book_id)
+                if book:
+                    self.add_book(book)
+        elif event == 'reset':
+            self.clear()
+
+
+suggest_index = PrefixIndex()
+register_catalog_listener(suggest_index.on_catalog_change)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=suggest_index.reset_after_fork)
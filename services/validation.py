@@ -0,0 +1,88 @@
+"""
+Validation - Shared checks for patron IDs and book fields
+Error messages are built once at import; the batch API validates many rows
+without repeating per-row setup (used by bulk import)
+"""
+
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from services.isbn import is_valid_isbn13, normalize_isbn
+
+PATRON_ID_LENGTH = 6
+MAX_TITLE_LENGTH = 200
+MAX_AUTHOR_LENGTH = 100
+
+INVALID_PATRON_ID = f"Invalid patron ID. Must be exactly {PATRON_ID_LENGTH} digits."
+TITLE_REQUIRED = "Title is required."
+TITLE_TOO_LONG = f"Title must be less than {MAX_TITLE_LENGTH} characters."
+AUTHOR_REQUIRED = "Author is required."
+AUTHOR_TOO_LONG = f"Author must be less than {MAX_AUTHOR_LENGTH} characters."
+INVALID_ISBN = "ISBN must be exactly 13 digits (or a valid ISBN-10)."
+INVALID_ISBN_CHECK_DIGIT = "ISBN check digit is invalid."
+INVALID_TOTAL_COPIES = "Total copies must be a positive integer."
+
+
+class BookFields(NamedTuple):
+    """Book fields after validation: stripped text and canonical ISBN-13."""
+    title: str
+    author: str
+    isbn: str
+    total_copies: int
+
+
+def is_valid_patron_id(patron_id) -> bool:
+    """True for a library card ID of exactly six ASCII digits."""
+    return (isinstance(patron_id, str) and len(patron_id) == PATRON_ID_LENGTH
+            and patron_id.isascii() and patron_id.isdigit())
+
+
+def clean_book_fields(title, author, isbn, total_copies) -> Tuple[Optional[BookFields], Optional[str]]:
+    """
+    Validate book fields and normalize them for storage, including the
+    ISBN-13 check digit.
+
+    Returns:
+        tuple: (BookFields, None) if valid, else (None, error message)
+    """
+    title = title.strip() if isinstance(title, str) else ''
+    if not title:
+        return None, TITLE_REQUIRED
+    if len(title) > MAX_TITLE_LENGTH:
+        return None, TITLE_TOO_LONG
+
+    author = author.strip() if isinstance(author, str) else ''
+    if not author:
+        return None, AUTHOR_REQUIRED
+    if len(author) > MAX_AUTHOR_LENGTH:
+        return None, AUTHOR_TOO_LONG
+
+    normalized_isbn = normalize_isbn(isbn) if isinstance(isbn, str) else None
+    if normalized_isbn is None:
+        return None, INVALID_ISBN
+    if not is_valid_isbn13(normalized_isbn):
+        return None, INVALID_ISBN_CHECK_DIGIT
+
+    if not isinstance(total_copies, int) or total_copies <= 0:
+        return None, INVALID_TOTAL_COPIES
+
+    return BookFields(title, author, normalized_isbn, total_copies), None
+
+
+def validate_book_rows(rows: Iterable[Dict]) -> Tuple[List[Tuple[int, BookFields]], List[Dict]]:
+    """
+    Validate many book rows (dicts with title, author, isbn, total_copies).
+
+    Returns:
+        tuple: ([(row index, BookFields)] for valid rows,
+                [{'row': index, 'error': message}] for the rest)
+    """
+    valid = []
+    errors = []
+    for index, row in enumerate(rows):
+        fields, error = clean_book_fields(row.get('title'), row.get('author'), row.get('isbn'),
+                                          row.get('total_copies'))
+        if error:
+            errors.append({'row': index, 'error': error})
+        else:
+            valid.append((index, fields))
+    return valid, errors
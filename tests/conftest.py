@@ -42,9 +42,12 @@ def test_db():
     import database
     old_db = database.DATABASE
     database.DATABASE = test_db_name
+    database.init_database()
+    database.notify_catalog_change('reset')
     
     yield test_db_name
     
     database.DATABASE = old_db
+    database.notify_catalog_change('reset')
     if os.path.exists(test_db_name):
         os.remove(test_db_name)
\ No newline at end of file
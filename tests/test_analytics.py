@@ -0,0 +1,75 @@
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+from datetime import datetime, timedelta
+from app import create_app
+from services import analytics, library_service
+
+AS_OF = datetime(2025, 3, 30, 12, 0)
+
+def _past_loan(patron_id, book_id, borrowed, days_kept=None, loan_days=14):
+    database.insert_borrow_record(patron_id, book_id, borrowed, borrowed + timedelta(days=loan_days))
+    if days_kept is not None:
+        conn = database.get_db_connection()
+        conn.execute('UPDATE borrow_records SET return_date = ? WHERE patron_id = ? AND book_id = ? AND return_date IS NULL',
+                     ((borrowed + timedelta(days=days_kept)).isoformat(), patron_id, book_id))
+        conn.commit()
+        conn.close()
+
+@pytest.fixture
+def history(test_db):
+    _past_loan('111111', 1, datetime(2025, 3, 1, 10), days_kept=20)
+    _past_loan('222222', 1, datetime(2025, 3, 1, 11), days_kept=4)
+    _past_loan('333333', 2, datetime(2025, 3, 2, 10), days_kept=10)
+    _past_loan('444444', 1, datetime(2025, 3, 10, 10))
+
+def test_first_refresh_backfills_existing_loans(history):
+    assert analytics.refresh_rollups() == 0
+    assert analytics.loans_per_day(as_of=AS_OF) == [
+        {'date': '2025-03-01', 'loans': 2, 'returns': 0},
+        {'date': '2025-03-02', 'loans': 1, 'returns': 0},
+        {'date': '2025-03-05', 'loans': 0, 'returns': 1},
+        {'date': '2025-03-10', 'loans': 1, 'returns': 0},
+        {'date': '2025-03-12', 'loans': 0, 'returns': 1},
+        {'date': '2025-03-21', 'loans': 0, 'returns': 1},
+    ]
+
+def test_reports(history):
+    assert [(row['book_id'], row['loans']) for row in analytics.most_borrowed_books(as_of=AS_OF)] == [(1, 3), (2, 1)]
+    assert analytics.most_borrowed_books(days=10, as_of=AS_OF) == []
+    assert analytics.average_loan_duration(as_of=AS_OF) == {'returns': 3, 'average_days': round(34 / 3, 2)}
+    assert analytics.overdue_rate_by_author(as_of=AS_OF) == [
+        {'author': 'Test Author', 'returns': 2, 'overdue_returns': 1, 'overdue_rate': 0.5},
+        {'author': 'Another Author', 'returns': 1, 'overdue_returns': 0, 'overdue_rate': 0.0},
+    ]
+
+def test_rollups_follow_new_events(history):
+    analytics.refresh_rollups()
+    library_service.borrow_book_by_patron('555555', 1)
+    library_service.return_book_by_patron('555555', 1)
+    library_service.add_book_to_catalog('New Book', 'Some Author', '9780306406157', 1)
+    assert analytics.refresh_rollups() == 2
+    assert analytics.refresh_rollups() == 0
+    today = analytics.loans_per_day(days=1)
+    assert [(row['loans'], row['returns']) for row in today] == [(1, 1)]
+    assert analytics.average_loan_duration(days=1)['returns'] == 1
+
+def test_refresh_in_small_batches(history):
+    analytics.refresh_rollups()
+    for patron_id in ('555555', '666666'):
+        library_service.borrow_book_by_patron(patron_id, 1)
+    assert analytics.refresh_rollups(batch_size=1) == 2
+    assert analytics.most_borrowed_books(days=1)[0]['loans'] == 2
+
+def test_stats_api(history):
+    app = create_app(defer_startup=False)
+    with app.test_client() as client:
+        library_service.borrow_book_by_patron('555555', 1)
+        response = client.get('/api/stats/top_books?days=7')
+        assert response.status_code == 200
+        assert response.get_json()['books'][0]['title'] == 'Test Book'
+        assert client.get('/api/stats/loans_per_day').get_json()['per_day'][-1]['loans'] == 1
+        assert client.get('/api/stats/loan_duration').get_json()['returns'] == 0
+        assert client.get('/api/stats/overdue_by_author').status_code == 200
@@ -0,0 +1,52 @@
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+from app import create_app
+
+def test_ensure_database_skips_current_schema(test_db):
+    assert database.get_schema_version() == database.SCHEMA_VERSION
+    assert database.ensure_database() == False
+
+def test_ensure_database_initializes_new_file(test_db):
+    conn = database.get_db_connection()
+    conn.execute('PRAGMA user_version = 0')
+    conn.close()
+    assert database.ensure_database() == True
+    assert database.get_schema_version() == database.SCHEMA_VERSION
+
+def test_secret_key_from_environment(test_db, monkeypatch):
+    monkeypatch.setenv('SECRET_KEY', 'from-env')
+    assert create_app().secret_key == 'from-env'
+
+def test_production_does_not_seed_sample_data(test_db, monkeypatch):
+    conn = database.get_db_connection()
+    conn.execute('DELETE FROM books')
+    conn.commit()
+    conn.close()
+    monkeypatch.setenv('LIBRARY_ENV', 'production')
+    monkeypatch.delenv('SECRET_KEY', raising=False)
+    app = create_app(defer_startup=False)
+    assert database.get_all_books() == []
+    assert app.secret_key != 'super secret key'
+
+def test_development_seeds_empty_database(test_db, monkeypatch):
+    conn = database.get_db_connection()
+    conn.execute('DELETE FROM books')
+    conn.commit()
+    conn.close()
+    monkeypatch.delenv('LIBRARY_ENV', raising=False)
+    create_app(defer_startup=False)
+    assert len(database.get_all_books()) == 3
+
+def test_deferred_startup_runs_on_first_request(test_db):
+    conn = database.get_db_connection()
+    conn.execute('PRAGMA user_version = 0')
+    conn.close()
+    app = create_app()
+    assert database.get_schema_version() == 0
+    with app.test_client() as client:
+        client.get('/catalog')
+    assert database.get_schema_version() == database.SCHEMA_VERSION
+    assert app.extensions['library_startup'].done == True
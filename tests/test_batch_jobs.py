@@ -0,0 +1,237 @@
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+from datetime import date, datetime, timedelta
+from services import hold_service, library_service
+from services.batch_jobs import (
+    ArchiveLoansJob, BuildRecommendationsJob, ExpireHoldsJob, FeeAccrualJob, ReconcileAvailabilityJob
+)
+
+RUN_DATE = date(2025, 3, 1)
+
+def _loan(patron_id, days_overdue):
+    due = datetime.combine(RUN_DATE, datetime.min.time()) - timedelta(days=days_overdue) + timedelta(hours=10)
+    database.insert_borrow_record(patron_id, 1, due - timedelta(days=14), due)
+
+def _ledger_total(patron_id):
+    conn = database.get_db_connection()
+    total = conn.execute('SELECT COALESCE(SUM(amount_cents), 0) AS total FROM fee_ledger WHERE patron_id = ?',
+                         (patron_id,)).fetchone()['total']
+    conn.close()
+    return total
+
+def test_accrual_charges_overdue_loans_only(test_db):
+    _loan('111111', 4)
+    _loan('222222', 10)
+    _loan('333333', -3)
+    result = FeeAccrualJob(run_date=RUN_DATE, chunk_size=1).run()
+    assert result['processed'] == 2
+    assert result['counters'] == {'charges': 2, 'notices': 2}
+    assert _ledger_total('111111') == 200
+    assert _ledger_total('222222') == 650
+    assert _ledger_total('333333') == 0
+
+def test_accrual_charges_only_the_increase(test_db):
+    _loan('111111', 4)
+    FeeAccrualJob(run_date=RUN_DATE).run()
+    FeeAccrualJob(run_date=RUN_DATE + timedelta(days=1)).run()
+    assert _ledger_total('111111') == 250
+
+def test_completed_run_is_skipped(test_db):
+    _loan('111111', 4)
+    FeeAccrualJob(run_date=RUN_DATE).run()
+    assert FeeAccrualJob(run_date=RUN_DATE).run()['status'] == 'skipped'
+    assert _ledger_total('111111') == 200
+
+def test_interrupted_run_resumes_from_checkpoint(test_db):
+    for patron_id in ('111111', '222222', '333333'):
+        _loan(patron_id, 4)
+
+    class FailingJob(FeeAccrualJob):
+        def process_chunk(self, conn, rows):
+            if rows[0]['patron_id'] == '333333':
+                raise RuntimeError('interrupted')
+            return super().process_chunk(conn, rows)
+
+    with pytest.raises(RuntimeError):
+        FailingJob(run_date=RUN_DATE, chunk_size=1).run()
+    assert _ledger_total('333333') == 0
+
+    result = FeeAccrualJob(run_date=RUN_DATE, chunk_size=1).run()
+    assert result['processed'] == 3
+    assert result['counters'] == {'charges': 1, 'notices': 1}
+    assert [_ledger_total(p) for p in ('111111', '222222', '333333')] == [200, 200, 200]
+
+def _returned_loan(patron_id, days_ago):
+    returned = datetime.combine(RUN_DATE, datetime.min.time()) - timedelta(days=days_ago)
+    database.insert_borrow_record(patron_id, 1, returned - timedelta(days=10), returned - timedelta(days=3))
+    conn = database.get_db_connection()
+    conn.execute('UPDATE borrow_records SET return_date = ? WHERE patron_id = ? AND return_date IS NULL',
+                 (returned.isoformat(), patron_id))
+    conn.commit()
+    conn.close()
+
+def _count(table, patron_id):
+    conn = database.get_db_connection()
+    count = conn.execute(f'SELECT COUNT(*) AS count FROM {table} WHERE patron_id = ?', (patron_id,)).fetchone()['count']
+    conn.close()
+    return count
+
+def test_archive_moves_old_returned_loans(test_db):
+    _returned_loan('111111', 400)
+    _returned_loan('111111', 30)
+    _loan('111111', 500)
+    result = ArchiveLoansJob(run_date=RUN_DATE, chunk_size=1).run()
+    assert result['counters'] == {'archived': 1}
+    assert _count('borrow_records', '111111') == 2
+    assert _count('borrow_records_archive', '111111') == 1
+
+def test_archived_history_is_paged_in_status_report(test_db):
+    for days_ago in (400, 500, 600):
+        _returned_loan('111111', days_ago)
+    ArchiveLoansJob(run_date=RUN_DATE).run()
+    first = library_service.get_patron_status_report('111111', archive_page_size=2)['archived_history']
+    second = library_service.get_patron_status_report('111111', archive_page=2, archive_page_size=2)['archived_history']
+    assert first['has_more'] == True
+    assert len(first['records']) == 2
+    assert second['has_more'] == False
+    assert len(second['records']) == 1
+    assert first['records'][0]['borrow_date'] > second['records'][0]['borrow_date']
+    assert first['records'][0]['title'] == 'Test Book'
+    assert first['records'][0]['return_date'] != 'Not returned'
+
+def _ready_hold_on_book_2(*patron_ids, ready_days_ago=0):
+    # Book 2's only copy comes back and is set aside for the first patron
+    database.insert_borrow_record('111111', 2, datetime.now() - timedelta(days=3), datetime.now() + timedelta(days=11))
+    for patron_id in patron_ids:
+        hold_service.place_hold(patron_id, 2)
+    library_service.return_book_by_patron('111111', 2)
+    conn = database.get_db_connection()
+    conn.execute("UPDATE holds SET ready_ts = ready_ts - ? WHERE status = 'ready'", (ready_days_ago * 86400,))
+    conn.commit()
+    conn.close()
+
+def test_expire_holds_passes_copy_to_next_hold(test_db):
+    _ready_hold_on_book_2('123456', '654321', ready_days_ago=7)
+    assert ExpireHoldsJob().run()['counters'] == {}
+    result = ExpireHoldsJob(run_date=date.today() + timedelta(days=1)).run()
+    assert result['counters'] == {'expired': 1, 'passed_on': 1, 'shelved': 0}
+    assert hold_service.get_patron_holds('123456') == []
+    assert hold_service.get_patron_holds('654321')[0]['status'] == 'ready'
+    assert _available(2) == 0
+
+def test_expire_holds_shelves_copy_when_nobody_waits(test_db):
+    _ready_hold_on_book_2('123456', ready_days_ago=8)
+    result = ExpireHoldsJob().run()
+    assert result['counters'] == {'expired': 1, 'passed_on': 0, 'shelved': 1}
+    assert _available(2) == 1
+    assert library_service.borrow_book_by_patron('654321', 2)[0] == True
+
+def _available(book_id):
+    return database.get_book_by_id(book_id)['available_copies']
+
+def test_reconcile_reports_drift_without_fixing(test_db):
+    # Book 2 has one copy, no loans and no holds, but shows 0 available
+    job = ReconcileAvailabilityJob(run_date=RUN_DATE, chunk_size=1)
+    result = job.run()
+    assert result['processed'] == 2
+    assert result['counters'] == {'drifted': 1, 'fixed': 0}
+    assert [(row['id'], row['expected'], row['drift']) for row in job.drift] == [(2, 1, -1)]
+    assert _available(2) == 0
+
+def test_reconcile_fix_counts_loans_and_ready_holds(test_db):
+    library_service.borrow_book_by_patron('111111', 1)
+    library_service.borrow_book_by_patron('222222', 1)
+    hold_service.place_hold('123456', 1)
+    library_service.return_book_by_patron('111111', 1)
+    database.update_book_availability(1, 2)
+    result = ReconcileAvailabilityJob(run_date=RUN_DATE, fix=True).run()
+    assert result['counters'] == {'drifted': 2, 'fixed': 2}
+    # One copy on loan, one set aside for the ready hold
+    assert _available(1) == 0
+    assert _available(2) == 1
+    assert ReconcileAvailabilityJob(run_date=RUN_DATE + timedelta(days=1), full=True).run()['counters'] == {
+        'drifted': 0, 'fixed': 0}
+
+def test_reconcile_checks_only_books_changed_since_last_run(test_db):
+    ReconcileAvailabilityJob(run_date=RUN_DATE).run()
+    database.update_book_availability(1, -1)
+    job = ReconcileAvailabilityJob(run_date=RUN_DATE + timedelta(days=1))
+    result = job.run()
+    assert result['processed'] == 1
+    assert [row['id'] for row in job.drift] == [1]
+    full = ReconcileAvailabilityJob(run_date=RUN_DATE + timedelta(days=1), full=True).run()
+    assert full['processed'] == 2
+
+def test_fix_run_does_not_use_report_watermark(test_db):
+    ReconcileAvailabilityJob(run_date=RUN_DATE, fix=True).run()
+    database.update_book_availability(1, 1)
+    report = ReconcileAvailabilityJob(run_date=RUN_DATE + timedelta(days=1))
+    report.run()
+    assert [row['id'] for row in report.drift] == [1]
+    result = ReconcileAvailabilityJob(run_date=RUN_DATE + timedelta(days=1), fix=True).run()
+    assert result['counters'] == {'drifted': 1, 'fixed': 1}
+    assert _available(1) == 2
+
+def test_reconcile_watermark_ignores_wall_clock(test_db):
+    ReconcileAvailabilityJob(run_date=RUN_DATE).run()
+    database.update_book_availability(2, 1)
+    # Clock set back (e.g. the end of daylight saving time) after the run started
+    conn = database.get_db_connection()
+    conn.execute("UPDATE books SET updated_ts = updated_ts - 7200 WHERE id = 2")
+    conn.commit()
+    conn.close()
+    job = ReconcileAvailabilityJob(run_date=RUN_DATE + timedelta(days=1))
+    assert job.run()['processed'] == 1
+    assert job.drift == []
+    assert ReconcileAvailabilityJob(run_date=RUN_DATE + timedelta(days=2)).run()['processed'] == 0
+
+def test_resumed_reconcile_keeps_its_watermark(test_db):
+    class FailingJob(ReconcileAvailabilityJob):
+        def process_chunk(self, conn, rows):
+            if rows[0]['id'] == 2:
+                raise RuntimeError('interrupted')
+            return super().process_chunk(conn, rows)
+
+    with pytest.raises(RuntimeError):
+        FailingJob(run_date=RUN_DATE, chunk_size=1).run()
+    # Book 1 was checked before the interruption and changes before the resume
+    database.update_book_availability(1, -1)
+    ReconcileAvailabilityJob(run_date=RUN_DATE, chunk_size=1).run()
+    job = ReconcileAvailabilityJob(run_date=RUN_DATE + timedelta(days=1))
+    job.run()
+    assert [row['id'] for row in job.drift] == [1]
+
+def _recommendations():
+    conn = database.get_db_connection()
+    rows = conn.execute('SELECT book_id, rank, recommended_book_id, co_borrows FROM book_recommendations '
+                        'ORDER BY book_id, rank').fetchall()
+    conn.close()
+    return [tuple(row) for row in rows]
+
+def test_recommendations_rank_books_by_co_borrows(test_db):
+    database.insert_book('Third Book', 'Third Author', '9780000000003', 3, 3)
+    borrowed = datetime(2025, 2, 1)
+    for patron_id, book_ids in (('111111', (1, 2, 3)), ('222222', (1, 3)), ('333333', (2,))):
+        for book_id in book_ids:
+            database.insert_borrow_record(patron_id, book_id, borrowed, borrowed + timedelta(days=14))
+    result = BuildRecommendationsJob(run_date=RUN_DATE, chunk_size=2, top_k=1).run()
+    assert result['processed'] == 3
+    assert result['counters'] == {'books': 3, 'recommendations': 3}
+    assert _recommendations() == [(1, 1, 3, 2), (2, 1, 1, 1), (3, 1, 1, 2)]
+    assert database.get_book_recommendations(3) == {1: (3,), 2: (1,), 3: (1,)}
+
+def test_recommendations_replace_previous_run(test_db):
+    borrowed = datetime(2025, 2, 1)
+    database.insert_borrow_record('111111', 1, borrowed, borrowed + timedelta(days=14))
+    database.insert_borrow_record('111111', 2, borrowed, borrowed + timedelta(days=14))
+    BuildRecommendationsJob(run_date=RUN_DATE).run()
+    assert _recommendations() == [(1, 1, 2, 1), (2, 1, 1, 1)]
+    conn = database.get_db_connection()
+    conn.execute('DELETE FROM borrow_records')
+    conn.commit()
+    conn.close()
+    BuildRecommendationsJob(run_date=RUN_DATE + timedelta(days=1)).run()
+    assert _recommendations() == []
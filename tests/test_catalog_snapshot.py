@@ -0,0 +1,57 @@
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import time
+import database
+from services.catalog_snapshot import CatalogSnapshotStore, catalog_snapshot
+
+def test_snapshot_loads_books_in_title_order(test_db):
+    snapshot = CatalogSnapshotStore().get()
+    assert [book.title for book in snapshot.books] == ['Another Book', 'Test Book']
+
+def test_snapshot_is_not_reread_without_writes(test_db):
+    store = CatalogSnapshotStore()
+    first = store.get()
+    conn = database.get_db_connection()
+    conn.execute("UPDATE books SET title = 'Changed' WHERE id = 1")
+    conn.commit()
+    conn.close()
+    assert store.get() is first
+
+def test_availability_change_swaps_snapshot(test_db):
+    before = catalog_snapshot.get()
+    database.update_book_availability(1, -1)
+    after = catalog_snapshot.get()
+    assert after is not before
+    assert after.version == before.version + 1
+    assert after.books[after.positions[1]].available_copies == 1
+    assert before.books[before.positions[1]].available_copies == 2
+
+def test_insert_book_refreshes_snapshot(test_db):
+    catalog_snapshot.get()
+    database.insert_book('Brand New', 'Author', '9780306406157', 1, 1)
+    titles = [book.title for book in catalog_snapshot.get().books]
+    assert titles == ['Another Book', 'Brand New', 'Test Book']
+
+def test_stale_snapshot_refreshes_in_background(test_db):
+    store = CatalogSnapshotStore()
+    first = store.get()
+    store.max_age = 0
+    assert store.get() is first
+    store.max_age = 60
+    for _ in range(100):
+        if not store._refreshing.is_set():
+            break
+        time.sleep(0.01)
+    assert store.get().version == first.version + 1
+
+def test_row_patch_keeps_refresh_age(test_db):
+    store = CatalogSnapshotStore()
+    first = store.get()
+    database.update_book_availability(1, -1)
+    store.update_book(1)
+    patched = store.get()
+    assert patched.books[patched.positions[1]].available_copies == 1
+    # Rows changed by other workers still need the full rebuild on schedule
+    assert patched.built_at == first.built_at
@@ -50,7 +50,7 @@ def test_add_book_and_verify_in_catalog(driver, flask_app):
     
     driver.find_element(By.NAME, "title").send_keys("End-to-End Testing Guide")
     driver.find_element(By.NAME, "author").send_keys("Jane Smith")
-    driver.find_element(By.NAME, "isbn").send_keys("9789876543210")
+    driver.find_element(By.NAME, "isbn").send_keys("9789876543217")
     driver.find_element(By.NAME, "total_copies").send_keys("3")
     
     driver.find_element(By.CSS_SELECTOR, "button[type='submit']").click()
@@ -60,7 +60,7 @@ def test_add_book_and_verify_in_catalog(driver, flask_app):
     page_text = driver.page_source
     assert "End-to-End Testing Guide" in page_text
     assert "Jane Smith" in page_text
-    assert "9789876543210" in page_text
+    assert "9789876543217" in page_text
 
 
 def test_borrow_book_workflow(driver, flask_app):
@@ -0,0 +1,89 @@
+import pytest
+import sys
+import os
+import threading
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+from app import create_app
+from services import hold_service, library_service
+from services.events import EventConsumer, get_event_page, read_events
+
+def _types():
+    return [event['event_type'] for event in read_events()]
+
+def test_catalog_and_loan_changes_emit_events(test_db):
+    library_service.add_book_to_catalog('Event Book', 'Some Author', '9780306406157', 1)
+    book_id = database.get_book_by_isbn('9780306406157').id
+    library_service.borrow_book_by_patron('111111', book_id)
+    hold_service.place_hold('123456', book_id)
+    library_service.return_book_by_patron('111111', book_id)
+
+    added, created, returned = read_events()
+    assert added['event_type'] == 'book.added'
+    assert added['payload']['title'] == 'Event Book'
+    assert created['event_type'] == 'loan.created'
+    assert (created['book_id'], created['patron_id']) == (book_id, '111111')
+    assert returned['event_type'] == 'loan.returned'
+    assert returned['payload']['loan_id'] == created['payload']['loan_id']
+    assert returned['payload']['held_for_patron_id'] == '123456'
+
+def test_import_emits_one_event_per_book(test_db):
+    library_service.import_books_to_catalog([
+        {'title': 'First', 'author': 'Some Author', 'isbn': '9780306406157', 'total_copies': 1},
+        {'title': 'Second', 'author': 'Some Author', 'isbn': '9780131103627', 'total_copies': 1},
+    ])
+    assert [event['payload']['title'] for event in read_events()] == ['First', 'Second']
+
+def test_failed_operations_emit_nothing(test_db):
+    library_service.borrow_book_by_patron('111111', 2)
+    library_service.return_book_by_patron('111111', 1)
+    assert _types() == []
+
+def test_event_page_cursor_and_filter(test_db):
+    for patron_id in ('111111', '222222'):
+        library_service.borrow_book_by_patron(patron_id, 1)
+    library_service.return_book_by_patron('111111', 1)
+
+    first = get_event_page(0, limit=2)
+    assert len(first['events']) == 2 and first['has_more']
+    second = get_event_page(first['next_cursor'], limit=2)
+    assert [event['event_type'] for event in second['events']] == ['loan.returned']
+    assert not second['has_more']
+    assert get_event_page(second['next_cursor'])['events'] == []
+    assert len(get_event_page(0, event_types=['loan.created'])['events']) == 2
+
+@pytest.fixture
+def client(test_db):
+    app = create_app(defer_startup=False)
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+def test_events_api(client, monkeypatch):
+    library_service.borrow_book_by_patron('111111', 1)
+    response = client.get('/api/events?after=0&type=loan.created')
+    assert response.status_code == 200
+    assert response.get_json()['events'][0]['patron_id'] == '111111'
+    assert client.get('/api/events?type=bogus').status_code == 400
+
+    monkeypatch.setenv('ADMIN_TOKEN', 'secret')
+    assert client.get('/api/events').status_code == 403
+    assert client.get('/api/events', headers={'X-Admin-Token': 'secret'}).status_code == 200
+
+def test_consumer_reads_only_new_events(test_db):
+    from werkzeug.serving import make_server
+    server = make_server('127.0.0.1', 0, create_app(defer_startup=False), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        consumer = EventConsumer(f'http://127.0.0.1:{server.server_port}', batch_size=1)
+        library_service.borrow_book_by_patron('111111', 1)
+        library_service.borrow_book_by_patron('222222', 1)
+        handled = []
+        consumer.run(handled.append, poll_interval=0, stop=lambda: len(handled) == 2)
+        assert [event['patron_id'] for event in handled] == ['111111', '222222']
+        assert consumer.poll() == []
+
+        library_service.return_book_by_patron('111111', 1)
+        assert [event['event_type'] for event in consumer.poll()] == ['loan.returned']
+    finally:
+        server.shutdown()
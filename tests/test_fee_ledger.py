@@ -0,0 +1,137 @@
+import pytest
+import sys
+import os
+import sqlite3
+from unittest.mock import Mock
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+from datetime import datetime, timedelta
+from services import library_service
+from services.batch_jobs import FeeAccrualJob
+from services.fee_ledger import get_outstanding_balance, get_refundable_payment, post_ledger_entry
+from services.payment_service import PaymentGateway
+
+def _charge(patron_id, cents):
+    conn = database.get_db_connection()
+    post_ledger_entry(conn, patron_id, 'charge', cents)
+    conn.commit()
+    conn.close()
+
+def _gateway():
+    gateway = Mock(spec=PaymentGateway)
+    gateway.process_payment.return_value = {'transaction_id': 'txn_1', 'status': 'success'}
+    gateway.process_refund.return_value = {'refund_id': 'ref_1', 'status': 'success'}
+    return gateway
+
+def test_balance_tracks_entries(test_db):
+    assert get_outstanding_balance('123456') == 0.0
+    _charge('123456', 350)
+    _charge('123456', 150)
+    assert get_outstanding_balance('123456') == 5.00
+
+def test_payment_cannot_exceed_balance(test_db):
+    _charge('123456', 300)
+    gateway = _gateway()
+    success, message, txn = library_service.pay_late_fees('123456', 5.00, gateway)
+    assert success == False
+    assert 'outstanding balance of $3.00' in message
+    gateway.process_payment.assert_not_called()
+
+def test_payment_reduces_balance(test_db):
+    _charge('123456', 500)
+    success, message, txn = library_service.pay_late_fees('123456', 3.00, _gateway())
+    assert success == True
+    assert get_outstanding_balance('123456') == 2.00
+    conn = database.get_db_connection()
+    assert get_refundable_payment(conn, 'txn_1') == {'patron_id': '123456', 'refundable_cents': 300}
+    conn.close()
+
+def test_refund_limited_to_recorded_payment(test_db):
+    _charge('123456', 500)
+    library_service.pay_late_fees('123456', 3.00, _gateway())
+    gateway = _gateway()
+    success, message, refund_id = library_service.refund_late_fee_payment('txn_1', 2.00, gateway)
+    assert success == True
+    assert get_outstanding_balance('123456') == 4.00
+    success, message, refund_id = library_service.refund_late_fee_payment('txn_1', 1.50, gateway)
+    assert success == False
+    assert 'refundable amount of $1.00' in message
+
+def test_payment_rejected_without_balance(test_db):
+    gateway = _gateway()
+    success, message, txn = library_service.pay_late_fees('123456', 5.00, gateway)
+    assert success == False
+    assert 'no outstanding late fees' in message.lower()
+    gateway.process_payment.assert_not_called()
+
+def test_unrecorded_payment_is_an_error(test_db, mocker):
+    _charge('123456', 500)
+    mocker.patch('services.library_service.post_ledger_entry', side_effect=sqlite3.OperationalError('disk I/O error'))
+    success, message, txn = library_service.pay_late_fees('123456', 3.00, _gateway())
+    assert success == False
+    assert txn == 'txn_1'
+    assert 'could not be recorded' in message
+    assert get_outstanding_balance('123456') == 5.00
+
+def test_ledger_errors_propagate(test_db):
+    os.remove(test_db)
+    with pytest.raises(sqlite3.OperationalError):
+        get_outstanding_balance('123456')
+
+def test_status_report_includes_balance(test_db):
+    _charge('123456', 250)
+    status = library_service.get_patron_status_report('123456')
+    assert status['outstanding_balance'] == 2.50
+    assert status['total_late_fees'] == 2.50
+
+def test_balances_seeded_from_existing_ledger(test_db):
+    conn = database.get_db_connection()
+    conn.execute("INSERT INTO fee_ledger (patron_id, entry_type, amount_cents, created_ts) VALUES ('123456', 'charge', 700, 0)")
+    conn.execute("INSERT INTO fee_ledger (patron_id, entry_type, amount_cents, created_ts) VALUES ('123456', 'payment', 200, 0)")
+    conn.commit()
+    conn.close()
+    database.init_database()
+    assert get_outstanding_balance('123456') == 5.00
+
+def _overdue_loan(patron_id, days_overdue):
+    due = datetime.now() - timedelta(days=days_overdue)
+    database.insert_borrow_record(patron_id, 1, due - timedelta(days=14), due)
+
+def test_returned_late_fee_is_charged_once(test_db):
+    _overdue_loan('123456', 10)
+    FeeAccrualJob(run_date=(datetime.now() - timedelta(days=2)).date()).run()
+    assert get_outstanding_balance('123456') == 4.50
+    success, message = library_service.return_book_by_patron('123456', 1)
+    assert 'Late fee: $6.50' in message
+    assert get_outstanding_balance('123456') == 6.50
+    assert FeeAccrualJob().run()['counters'] == {}
+    assert library_service.get_patron_status_report('123456')['total_late_fees'] == 6.50
+    assert library_service.pay_late_fees('123456', 6.50, _gateway())[0] == True
+
+def test_status_and_payment_include_fees_not_yet_accrued(test_db):
+    _overdue_loan('123456', 4)
+    _charge('123456', 300)
+    status = library_service.get_patron_status_report('123456')
+    assert status['currently_borrowed'][0]['late_fee'] == 2.00
+    assert status['total_late_fees'] == 5.00
+    success, message, txn = library_service.pay_late_fees('123456', 5.00, _gateway())
+    assert success == True
+    assert get_outstanding_balance('123456') == 0.0
+    assert library_service.get_patron_status_report('123456')['total_late_fees'] == 0.0
+
+def test_payment_racing_another_is_refunded(test_db):
+    _charge('123456', 500)
+    gateway = _gateway()
+    def concurrent_payment(**kwargs):
+        # Another worker's payment is posted while this one is at the gateway
+        conn = database.get_db_connection()
+        post_ledger_entry(conn, '123456', 'payment', 300, reference='txn_0')
+        conn.commit()
+        conn.close()
+        return {'transaction_id': 'txn_1', 'status': 'success'}
+    gateway.process_payment.side_effect = concurrent_payment
+    success, message, txn = library_service.pay_late_fees('123456', 5.00, gateway)
+    assert success == False
+    assert 'outstanding balance of $2.00' in message
+    gateway.process_refund.assert_called_once_with(transaction_id='txn_1', amount=5.00)
+    assert get_outstanding_balance('123456') == 2.00
@@ -0,0 +1,48 @@
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import create_app
+from services import library_service
+from services.fragment_cache import FragmentCache, fragment_cache
+
+@pytest.fixture
+def client(test_db):
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+def test_catalog_rows_are_reused(client):
+    first = client.get('/catalog').data
+    misses = fragment_cache.stats()['misses']
+    second = client.get('/catalog').data
+    assert first == second
+    assert fragment_cache.stats()['misses'] == misses
+
+def test_availability_change_rerenders_only_that_row(client):
+    client.get('/catalog')
+    misses = fragment_cache.stats()['misses']
+    success, _ = library_service.borrow_book_by_patron('123456', 1)
+    assert success
+    response = client.get('/catalog')
+    assert b'1/2 Available' in response.data
+    assert fragment_cache.stats()['misses'] == misses + 1
+
+def test_search_rows_are_cached(client):
+    response = client.get('/search?q=Test&type=title')
+    assert b'Test Book' in response.data
+    hits = fragment_cache.stats()['hits']
+    client.get('/search?q=Test&type=title')
+    assert fragment_cache.stats()['hits'] == hits + 1
+
+def test_cache_is_bounded_and_invalidates_by_book():
+    cache = FragmentCache(max_entries=2)
+    for book_id in (1, 2, 3):
+        cache.get_or_render(('row', book_id), book_id, lambda: f'<tr>{book_id}</tr>')
+    assert cache.stats()['entries'] == 2
+    cache.invalidate_book(3)
+    assert cache.stats()['entries'] == 1
+    assert cache.get_or_render(('row', 2), 2, lambda: 'rerendered') == '<tr>2</tr>'
+    cache.on_catalog_change('reset', None)
+    assert cache.stats()['entries'] == 0
@@ -0,0 +1,111 @@
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+from datetime import date, timedelta
+from services import hold_service, library_service
+
+def _borrow_last_copy():
+    # Book 2 has no available copies; put one copy on loan so it can come back
+    conn = database.get_db_connection()
+    conn.execute("INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date) VALUES ('111111', 2, '2024-01-01', '2024-01-15')")
+    conn.commit()
+    conn.close()
+
+def test_place_hold_on_unavailable_book(test_db):
+    success, message = hold_service.place_hold('123456', 2)
+    assert success == True
+    assert 'number 1' in message
+    success, message = hold_service.place_hold('654321', 2)
+    assert 'number 2' in message
+    assert hold_service.get_hold_queue_length(2) == 2
+
+def test_place_hold_rejects_available_book(test_db):
+    success, message = hold_service.place_hold('123456', 1)
+    assert success == False
+    assert 'available' in message.lower()
+
+def test_place_hold_rejects_duplicate_and_bad_input(test_db):
+    hold_service.place_hold('123456', 2)
+    assert hold_service.place_hold('123456', 2) == (False, "You already have a hold on this book.")
+    assert hold_service.place_hold('12345', 2)[0] == False
+    assert hold_service.place_hold('123456', 999) == (False, "Book not found.")
+
+def test_return_assigns_copy_to_next_hold(test_db):
+    _borrow_last_copy()
+    hold_service.place_hold('123456', 2)
+    hold_service.place_hold('654321', 2)
+    success, message = library_service.return_book_by_patron('111111', 2)
+    assert success == True
+    assert database.get_book_by_id(2)['available_copies'] == 0
+    assert hold_service.get_patron_holds('123456')[0]['status'] == 'ready'
+    assert hold_service.get_patron_holds('654321')[0]['queue_position'] == 1
+
+def test_ready_hold_patron_can_borrow_reserved_copy(test_db):
+    _borrow_last_copy()
+    hold_service.place_hold('123456', 2)
+    library_service.return_book_by_patron('111111', 2)
+    assert library_service.borrow_book_by_patron('654321', 2)[0] == False
+    success, message = library_service.borrow_book_by_patron('123456', 2)
+    assert success == True
+    assert hold_service.get_patron_holds('123456') == []
+    assert database.get_book_by_id(2)['available_copies'] == 0
+
+def test_return_without_holds_restores_availability(test_db):
+    _borrow_last_copy()
+    library_service.return_book_by_patron('111111', 2)
+    assert database.get_book_by_id(2)['available_copies'] == 1
+
+def test_cancel_ready_hold_passes_copy_on(test_db):
+    _borrow_last_copy()
+    hold_service.place_hold('123456', 2)
+    hold_service.place_hold('654321', 2)
+    library_service.return_book_by_patron('111111', 2)
+    assert hold_service.cancel_hold('123456', 2) == (True, "Hold cancelled.")
+    assert hold_service.get_patron_holds('654321')[0]['status'] == 'ready'
+    assert hold_service.cancel_hold('654321', 2)[0] == True
+    assert database.get_book_by_id(2)['available_copies'] == 1
+
+def test_cancel_hold_without_hold(test_db):
+    success, message = hold_service.cancel_hold('123456', 2)
+    assert success == False
+    assert 'no active hold' in message.lower()
+
+def test_patron_status_lists_holds(test_db):
+    hold_service.place_hold('123456', 2)
+    status = library_service.get_patron_status_report('123456')
+    assert status['holds'] == [{'book_id': 2, 'status': 'waiting', 'queue_position': 1, 'pickup_by': None}]
+
+def test_ready_hold_has_pickup_deadline(test_db):
+    _borrow_last_copy()
+    hold_service.place_hold('123456', 2)
+    library_service.return_book_by_patron('111111', 2)
+    expected = (date.today() + timedelta(days=hold_service.HOLD_PICKUP_DAYS)).isoformat()
+    assert hold_service.get_patron_holds('123456')[0]['pickup_by'] == expected
+
+def test_borrow_with_hold_cancelled_meanwhile_takes_shelf_copy(test_db, monkeypatch):
+    _borrow_last_copy()
+    hold_service.place_hold('123456', 2)
+    library_service.return_book_by_patron('111111', 2)
+    conn = database.get_db_connection()
+    stale = hold_service.get_active_hold(conn, '123456', 2)
+    conn.close()
+    # The hold is cancelled after borrow_book_by_patron read it as ready
+    hold_service.cancel_hold('123456', 2)
+    monkeypatch.setattr(library_service, 'get_active_hold', lambda conn, patron_id, book_id: stale)
+    assert library_service.borrow_book_by_patron('123456', 2)[0] == True
+    assert database.get_book_by_id(2)['available_copies'] == 0
+    conn = database.get_db_connection()
+    status = conn.execute('SELECT status FROM holds WHERE id = ?', (stale.id,)).fetchone()['status']
+    conn.close()
+    assert status == 'cancelled'
+
+def test_queue_rank_is_bounded(test_db, monkeypatch):
+    monkeypatch.setattr(hold_service, 'MAX_QUEUE_RANK', 2)
+    for patron_id in ('111111', '222222', '333333'):
+        hold_service.place_hold(patron_id, 2)
+    success, message = hold_service.place_hold('444444', 2)
+    assert 'More than 2 patrons' in message
+    assert hold_service.get_patron_holds('333333')[0]['queue_position'] == 3
+    assert hold_service.get_patron_holds('444444')[0]['queue_position'] is None
@@ -0,0 +1,91 @@
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+from services import hold_service, inventory, library_service
+
+def _statuses(book_id):
+    return [copy.status for copy in inventory.get_book_copies(book_id)]
+
+def _loan_copy_id(patron_id, book_id):
+    conn = database.get_db_connection()
+    row = conn.execute('SELECT copy_id FROM borrow_records WHERE patron_id = ? AND book_id = ?',
+                       (patron_id, book_id)).fetchone()
+    conn.close()
+    return row['copy_id']
+
+def test_migration_records_copies_from_counters(test_db):
+    assert [copy.barcode for copy in inventory.get_book_copies(1)] == ['000001-001', '000001-002']
+    assert _statuses(1) == ['available', 'available']
+    # Book 2 has one copy that is neither on the shelf nor on loan
+    assert _statuses(2) == ['missing']
+    assert inventory.check_inventory() == []
+
+def test_migration_links_active_loans(test_db):
+    conn = database.get_db_connection()
+    conn.execute('DELETE FROM copies')
+    conn.execute("INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date) VALUES ('123456', 1, '2024-01-01', '2024-01-15')")
+    conn.execute('UPDATE books SET available_copies = 1 WHERE id = 1')
+    database.write_missing_copies(conn)
+    conn.commit()
+    conn.close()
+    assert _statuses(1) == ['on_loan', 'available']
+    assert _loan_copy_id('123456', 1) == inventory.get_book_copies(1)[0].id
+
+def test_new_books_get_copies(test_db):
+    library_service.add_book_to_catalog('Copy Book', 'Some Author', '9780306406157', 3)
+    book = database.get_book_by_isbn('9780306406157')
+    assert _statuses(book.id) == ['available'] * 3
+    library_service.import_books_to_catalog([
+        {'title': 'Imported', 'author': 'Some Author', 'isbn': '9780131103627', 'total_copies': 2}
+    ])
+    assert _statuses(database.get_book_by_isbn('9780131103627').id) == ['available'] * 2
+
+def test_borrow_and_return_move_a_copy(test_db):
+    library_service.borrow_book_by_patron('123456', 1)
+    copy_id = _loan_copy_id('123456', 1)
+    assert [copy.status for copy in inventory.get_book_copies(1) if copy.id == copy_id] == ['on_loan']
+    assert inventory.check_inventory() == []
+    library_service.return_book_by_patron('123456', 1)
+    assert _statuses(1) == ['available', 'available']
+    assert inventory.check_inventory() == []
+
+def test_copy_set_aside_for_hold(test_db):
+    library_service.borrow_book_by_patron('111111', 1)
+    library_service.borrow_book_by_patron('222222', 1)
+    hold_service.place_hold('123456', 1)
+    hold_service.place_hold('654321', 1)
+    library_service.return_book_by_patron('111111', 1)
+    assert sorted(_statuses(1)) == ['held', 'on_loan']
+    library_service.borrow_book_by_patron('123456', 1)
+    assert _statuses(1) == ['on_loan', 'on_loan']
+    library_service.return_book_by_patron('222222', 1)
+    hold_service.cancel_hold('654321', 1)
+    assert sorted(_statuses(1)) == ['available', 'on_loan']
+    assert inventory.check_inventory() == []
+
+def test_return_of_loan_without_copy(test_db):
+    # Loans written directly (no copy recorded) release an unlinked copy
+    conn = database.get_db_connection()
+    conn.execute("INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date) VALUES ('111111', 2, '2024-01-01', '2024-01-15')")
+    conn.commit()
+    conn.close()
+    library_service.return_book_by_patron('111111', 2)
+    assert _statuses(2) == ['available']
+    assert inventory.check_inventory() == []
+
+def test_counter_drift_is_reported(test_db):
+    database.update_book_availability(1, -1)
+    assert inventory.check_inventory() == [
+        {'book_id': 1, 'total_copies': 2, 'available_copies': 1, 'copies': 2, 'shelved': 2}
+    ]
+
+def test_branch_inventory(test_db):
+    conn = database.get_db_connection()
+    conn.execute("UPDATE copies SET branch = 'east' WHERE barcode = '000001-002'")
+    conn.commit()
+    conn.close()
+    library_service.borrow_book_by_patron('123456', 1)
+    assert inventory.get_branch_inventory('east') == {1: {'available': 1}}
+    assert inventory.get_branch_inventory('main') == {1: {'on_loan': 1}, 2: {'missing': 1}}
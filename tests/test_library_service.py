@@ -5,10 +5,26 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from services import library_service
 
 def test_add_book_valid(test_db):
-    success, message = library_service.add_book_to_catalog("New Book", "New Author", "9999999999999", 2)
+    success, message = library_service.add_book_to_catalog("New Book", "New Author", "9780306406157", 2)
     assert success == True
     assert "successfully added" in message.lower()
 
+def test_add_book_isbn10_stored_as_isbn13(test_db):
+    success, message = library_service.add_book_to_catalog("New Book", "New Author", "0-306-40615-2", 2)
+    assert success == True
+    assert library_service.get_book_by_isbn("9780306406157")['isbn'] == "9780306406157"
+
+def test_add_book_isbn10_duplicate_of_isbn13(test_db):
+    library_service.add_book_to_catalog("New Book", "New Author", "9780306406157", 2)
+    success, message = library_service.add_book_to_catalog("Same Book", "New Author", "0306406152", 1)
+    assert success == False
+    assert "exists" in message.lower()
+
+def test_add_book_bad_check_digit(test_db):
+    success, message = library_service.add_book_to_catalog("Title", "Author", "9999999999999", 1)
+    assert success == False
+    assert "check digit" in message.lower()
+
 def test_add_book_empty_title(test_db):
     success, message = library_service.add_book_to_catalog("", "Author", "9999999999999", 1)
     assert success == False
@@ -26,10 +42,36 @@ def test_add_book_short_isbn(test_db):
     assert "13 digits" in message
 
 def test_add_book_duplicate_isbn(test_db):
-    success, message = library_service.add_book_to_catalog("Title", "Author", "1234567890123", 1)
+    library_service.add_book_to_catalog("Title", "Author", "9780306406157", 1)
+    success, message = library_service.add_book_to_catalog("Title", "Author", "9780306406157", 1)
     assert success == False
     assert "exists" in message.lower()
 
+def test_add_book_check_digit_checked_before_duplicates(test_db):
+    # The fixture's ISBN is taken but has a bad check digit
+    success, message = library_service.add_book_to_catalog("Title", "Author", "1234567890123", 1)
+    assert success == False
+    assert "check digit" in message.lower()
+
+def test_import_books_skips_duplicates_and_invalid_rows(test_db):
+    rows = [
+        {'title': 'Book A', 'author': 'Author', 'isbn': '978-0-306-40615-7', 'total_copies': 1},
+        {'title': 'Book A again', 'author': 'Author', 'isbn': '0306406152', 'total_copies': 1},
+        {'title': 'Existing', 'author': 'Author', 'isbn': '1234567890123', 'total_copies': 1},
+        {'title': '', 'author': 'Author', 'isbn': '9780451524935', 'total_copies': 1},
+        {'title': 'Book B', 'author': 'Author', 'isbn': '9780451524935', 'total_copies': 2},
+    ]
+    result = library_service.import_books_to_catalog(rows)
+    assert result['added'] == 2
+    assert result['duplicates'] == 1
+    assert [e['row'] for e in result['errors']] == [2, 3]
+    assert library_service.get_book_by_isbn('9780451524935')['available_copies'] == 2
+
+def test_search_by_hyphenated_isbn(test_db):
+    library_service.add_book_to_catalog("New Book", "New Author", "9780306406157", 2)
+    results = library_service.search_books_in_catalog("978-0-306-40615-7", "isbn")
+    assert len(results) == 1
+
 def test_borrow_book_valid(test_db):
     success, message = library_service.borrow_book_by_patron("123456", 1)
     assert success == True
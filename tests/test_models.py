@@ -0,0 +1,43 @@
+import pytest
+import sys
+import os
+import json
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+from datetime import datetime, timedelta
+from models import Book, BorrowRecord, epoch_day, from_timestamp, to_timestamp
+
+def test_book_attribute_and_key_access():
+    book = Book(1, 'Title', 'Author', '9780306406157', 2, 1)
+    assert book.title == 'Title'
+    assert book['available_copies'] == 1
+    assert book[0] == 1
+    assert book.get('missing') is None
+    with pytest.raises(KeyError):
+        book['count']
+
+def test_book_to_dict_is_json_serializable():
+    book = Book(1, 'Title', 'Author', '9780306406157', 2, 1)
+    assert dict(book) == book.to_dict()
+    assert json.loads(json.dumps(book.to_dict()))['isbn'] == '9780306406157'
+
+def test_book_records_are_compact():
+    book = Book(1, 'Title', 'Author', '9780306406157', 2, 1)
+    assert not hasattr(book, '__dict__')
+
+def test_get_all_books_returns_records(test_db):
+    books = database.get_all_books()
+    assert all(isinstance(book, Book) for book in books)
+
+def test_patron_borrowed_books_are_records(test_db):
+    database.insert_borrow_record('123456', 1, datetime.now() - timedelta(days=20), datetime.now() - timedelta(days=6))
+    records = database.get_patron_borrowed_books('123456')
+    assert isinstance(records[0], BorrowRecord)
+    assert records[0]['title'] == 'Test Book'
+    assert records[0]['is_overdue'] is True
+    assert 'is_overdue' in records[0].to_dict()
+
+def test_timestamp_round_trip():
+    value = datetime(2024, 3, 10, 14, 5, 9)
+    assert from_timestamp(to_timestamp(value)) == value
+    assert epoch_day(datetime(1970, 1, 2, 23, 59)) == 1
@@ -171,3 +171,5 @@ def test_patron_status_borrowing_history(test_db):
     status = library_service.get_patron_status_report("123456")
     assert 'borrowing_history' in status
     assert len(status['borrowing_history']) >= 1
+    assert status['borrowing_history'][0]['return_date'] == 'Not returned'
+    assert isinstance(status['borrowing_history'][0]['borrow_date'], str)
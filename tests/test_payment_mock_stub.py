@@ -9,10 +9,22 @@ from unittest.mock import Mock, patch, MagicMock, call
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import database
+from services.fee_ledger import post_ledger_entry
 from services.library_service import pay_late_fees, refund_late_fee_payment
 from services.payment_service import PaymentGateway, PaymentGatewayError
 
 
+@pytest.fixture(autouse=True)
+def outstanding_fees(test_db):
+    # Payments are checked against the ledger; give every patron used below the maximum fee owed
+    conn = database.get_db_connection()
+    for patron_id in ('111111', '123456', '222222', '333333', '555555', '654321', '999999'):
+        post_ledger_entry(conn, patron_id, 'charge', 1500)
+    conn.commit()
+    conn.close()
+
+
 # pay_late_fees()
 
 class TestPayLateFees:
@@ -0,0 +1,76 @@
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import create_app
+from services import library_service
+from services.profiling import Profiler, profiler
+
+@pytest.fixture
+def reset_profiler():
+    yield profiler
+    profiler.configure('off', 0.1)
+    profiler.reset()
+
+def test_disabled_profiler_records_nothing():
+    local = Profiler()
+    double = local.profiled(lambda x: x * 2, name='double')
+    assert double(2) == 4
+    assert local.stats()['functions'] == {}
+    assert local.stats()['registered'] == ['double']
+
+def test_timing_mode_aggregates_calls():
+    local = Profiler('timing')
+    double = local.profiled(lambda x: x * 2, name='double')
+    double(1)
+    double(2)
+    stats = local.stats()['functions']['double']
+    assert stats['calls'] == 2
+    assert stats['profiled_calls'] == 0
+    assert stats['max_ms'] >= stats['min_ms']
+
+def test_errors_are_counted():
+    local = Profiler('timing')
+    
+    @local.profiled(name='fail')
+    def fail():
+        raise RuntimeError('boom')
+    
+    with pytest.raises(RuntimeError):
+        fail()
+    assert local.stats()['functions']['fail']['errors'] == 1
+
+def test_cprofile_mode_samples_calls():
+    local = Profiler('cprofile', sample_rate=1.0)
+    double = local.profiled(lambda x: x * 2, name='double')
+    double(3)
+    stats = local.stats()['functions']['double']
+    assert stats['profiled_calls'] == 1
+    assert 'function calls' in stats['profile']
+
+def test_invalid_mode_rejected():
+    with pytest.raises(ValueError):
+        Profiler().configure('verbose')
+
+def test_service_functions_profiled(test_db, reset_profiler):
+    reset_profiler.configure('timing')
+    library_service.search_books_in_catalog('test', 'title')
+    assert reset_profiler.stats()['functions']['services.library_service.search_books_in_catalog']['calls'] == 1
+
+def test_admin_profiling_toggle(test_db, reset_profiler):
+    app = create_app()
+    with app.test_client() as client:
+        response = client.post('/admin/profiling', json={'mode': 'timing'})
+        assert response.get_json()['mode'] == 'timing'
+        client.post('/borrow', data={'patron_id': '123456', 'book_id': '1'})
+        stats = client.get('/admin/profiling').get_json()
+        bad = client.post('/admin/profiling', json={'mode': 'verbose'})
+    assert stats['functions']['services.library_service.borrow_book_by_patron']['calls'] == 1
+    assert bad.status_code == 400
+
+def test_admin_requires_token(test_db, monkeypatch):
+    monkeypatch.setenv('ADMIN_TOKEN', 'secret')
+    app = create_app()
+    with app.test_client() as client:
+        assert client.get('/admin/profiling').status_code == 403
+        assert client.get('/admin/profiling', headers={'X-Admin-Token': 'secret'}).status_code == 200
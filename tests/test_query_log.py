@@ -0,0 +1,54 @@
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+from app import create_app
+from services.query_log import TracingConnection, parameter_shape, query_log
+
+@pytest.fixture
+def log_everything():
+    previous = query_log.threshold_ms
+    query_log.clear()
+    query_log.threshold_ms = 0.0
+    yield query_log
+    query_log.threshold_ms = previous
+    query_log.clear()
+
+def test_parameter_shape_hides_values():
+    assert parameter_shape(('123456', 1)) == '(str, int)'
+    assert parameter_shape({'patron_id': '123456'}) == '{patron_id: str}'
+    assert parameter_shape([('a', 1), ('b', 2)], many=True) == '2 x (str, int)'
+
+def test_connections_are_traced(test_db, log_everything):
+    conn = database.get_db_connection()
+    assert isinstance(conn, TracingConnection)
+    conn.close()
+
+def test_slow_query_recorded_with_plan(test_db, log_everything):
+    database.get_patron_borrow_count('123456')
+    entry = [e for e in log_everything.recent() if 'COUNT(*)' in e['sql']][0]
+    assert entry['parameters'] == '(str)'
+    assert entry['plan']
+    assert log_everything.summary()[0]['count'] >= 1
+
+def test_fast_queries_not_recorded(test_db, log_everything):
+    log_everything.threshold_ms = 10000.0
+    database.get_all_books()
+    assert log_everything.recent() == []
+
+def test_disabled_log_uses_plain_connections(test_db, log_everything):
+    log_everything.threshold_ms = None
+    conn = database.get_db_connection()
+    assert not isinstance(conn, TracingConnection)
+    conn.close()
+
+def test_admin_queries_page(test_db, log_everything):
+    app = create_app()
+    with app.test_client() as client:
+        client.get('/catalog')
+        response = client.get('/admin/queries')
+        client.post('/admin/queries', data={'threshold_ms': '250'})
+    assert response.status_code == 200
+    assert b'Slow Queries' in response.data
+    assert log_everything.threshold_ms == 250.0
@@ -0,0 +1,126 @@
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import create_app
+from services.rate_limit import (AdmissionController, Limit, MemoryBucketStore, RateLimiter,
+                                 SQLiteBucketStore, parse_limit, parse_request_start)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def _client(limiter):
+    app = create_app(rate_limiter=limiter)
+    app.config['TESTING'] = True
+    return app.test_client()
+
+def test_parse_limit():
+    assert parse_limit('30/60') == Limit(30.0, 0.5)
+    with pytest.raises(ValueError):
+        parse_limit('30 per minute')
+    with pytest.raises(ValueError):
+        parse_limit('0/60')
+
+@pytest.mark.parametrize('store_type', ['memory', 'sqlite'])
+def test_bucket_allows_burst_then_refills(tmp_path, store_type):
+    clock = FakeClock()
+    if store_type == 'memory':
+        store = MemoryBucketStore(clock=clock)
+    else:
+        store = SQLiteBucketStore(str(tmp_path / 'limits.db'), clock=clock)
+    limit = Limit(2, 0.5)
+    assert store.take('ip:1', limit) == (True, 0.0)
+    assert store.take('ip:1', limit) == (True, 0.0)
+    assert store.take('ip:1', limit) == (False, 2.0)
+    assert store.take('ip:2', limit)[0] is True
+    clock.now += 2
+    assert store.take('ip:1', limit) == (True, 0.0)
+    assert store.take('ip:1', limit)[0] is False
+
+def test_sqlite_buckets_are_shared_between_stores(tmp_path):
+    path = str(tmp_path / 'limits.db')
+    limit = Limit(1, 0.01)
+    assert SQLiteBucketStore(path).take('patron:123456', limit)[0] is True
+    assert SQLiteBucketStore(path).take('patron:123456', limit)[0] is False
+
+def test_admission_caps_in_flight_writes():
+    admission = AdmissionController(max_in_flight=3, max_in_flight_writes=1)
+    assert admission.admit(write=True)
+    assert not admission.admit(write=True)
+    assert admission.admit(write=False)
+    assert admission.admit(write=False)
+    assert not admission.admit(write=False)
+    admission.release(write=True)
+    assert admission.admit(write=True)
+    assert admission.shed == 2
+
+def test_borrow_limited_per_patron(test_db):
+    limiter = RateLimiter(MemoryBucketStore(), {'patron': Limit(1, 0.001)})
+    client = _client(limiter)
+    assert client.post('/borrow', data={'patron_id': '123456', 'book_id': '1'}).status_code == 302
+    response = client.post('/borrow', data={'patron_id': '123456', 'book_id': '1'})
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '1000'
+    assert client.post('/borrow', data={'patron_id': '654321', 'book_id': '1'}).status_code == 302
+
+def test_api_search_limited_per_client(test_db):
+    limiter = RateLimiter(MemoryBucketStore(), {'search': Limit(2, 0.001)})
+    client = _client(limiter)
+    assert client.get('/api/search?q=Test').status_code == 200
+    assert client.get('/api/search?q=Test').status_code == 200
+    response = client.get('/api/search?q=Test')
+    assert response.status_code == 429
+    assert 'error' in response.get_json()
+    # Unlimited endpoints are unaffected
+    assert client.get('/catalog').status_code == 200
+
+def test_busy_worker_sheds_writes_before_running_them(test_db, mocker):
+    borrow = mocker.patch('routes.borrowing_routes.borrow_book_by_patron', return_value=(True, 'ok'))
+    limiter = RateLimiter(None, admission=AdmissionController(max_in_flight_writes=0))
+    client = _client(limiter)
+    response = client.post('/borrow', data={'patron_id': '123456', 'book_id': '1'})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    borrow.assert_not_called()
+    assert client.get('/catalog').status_code == 200
+    assert limiter.admission.in_flight == 0
+
+def test_requests_release_their_slot(test_db):
+    limiter = RateLimiter(MemoryBucketStore(), admission=AdmissionController(max_in_flight=1))
+    client = _client(limiter)
+    for _ in range(3):
+        assert client.get('/catalog').status_code == 200
+    assert limiter.stats()['in_flight'] == 0
+
+@pytest.mark.parametrize('header, started', [
+    ('t=1700000000.250', 1700000000.25),
+    ('1700000000250', 1700000000.25),
+    ('1700000000250000', 1700000000.25),
+    ('garbage', None),
+    (None, None),
+])
+def test_parse_request_start(header, started):
+    assert parse_request_start(header) == started
+
+def test_requests_that_waited_too_long_are_shed(test_db):
+    clock = FakeClock()
+    limiter = RateLimiter(None, admission=AdmissionController(max_queue_wait=2, max_queue_wait_writes=0.5), clock=clock)
+    client = _client(limiter)
+    assert client.get('/catalog', headers={'X-Request-Start': f't={clock.now - 1}'}).status_code == 200
+    assert client.get('/catalog', headers={'X-Request-Start': f't={clock.now - 3}'}).status_code == 503
+    response = client.post('/borrow', data={'patron_id': '123456', 'book_id': '1'},
+                           headers={'X-Request-Start': f't={clock.now - 1}'})
+    assert response.status_code == 503
+    assert limiter.stats()['shed_waited'] == 2
+    assert limiter.stats()['in_flight'] == 0
+
+def test_trusted_proxy_client_addresses(test_db, monkeypatch):
+    monkeypatch.setenv('LIBRARY_TRUSTED_PROXIES', '1')
+    client = _client(RateLimiter(MemoryBucketStore(), {'search': Limit(1, 0.001)}))
+    assert client.get('/api/search?q=Test', headers={'X-Forwarded-For': '10.0.0.1'}).status_code == 200
+    assert client.get('/api/search?q=Test', headers={'X-Forwarded-For': '10.0.0.2'}).status_code == 200
+    assert client.get('/api/search?q=Test', headers={'X-Forwarded-For': '10.0.0.1'}).status_code == 429
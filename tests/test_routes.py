@@ -2,7 +2,10 @@ import pytest
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
 from app import create_app
+from services.catalog_snapshot import catalog_snapshot
+from services.fee_ledger import post_ledger_entry
 
 @pytest.fixture
 def client(test_db):
@@ -20,6 +23,15 @@ def test_catalog_shows_books(client):
     assert response.status_code == 200
     assert b'Test Book' in response.data
 
+def test_catalog_shows_also_borrowed(client):
+    conn = database.get_db_connection()
+    conn.execute('INSERT INTO book_recommendations (book_id, rank, recommended_book_id, co_borrows) VALUES (1, 1, 2, 4)')
+    conn.commit()
+    conn.close()
+    catalog_snapshot.clear()
+    response = client.get('/catalog')
+    assert b'Also borrowed: Another Book' in response.data
+
 def test_add_book_form_displays(client):
     response = client.get('/add_book')
     assert response.status_code == 200
@@ -29,7 +41,7 @@ def test_add_book_post_valid(client):
     data = {
         'title': 'New Book',
         'author': 'New Author',
-        'isbn': '9999999999999',
+        'isbn': '9780306406157',
         'total_copies': '1'
     }
     response = client.post('/add_book', data=data)
@@ -94,6 +106,29 @@ def test_late_fee_api(client):
     assert response.status_code in [200, 501]
     assert response.content_type == 'application/json'
 
+def test_pay_fees_api(client, mocker):
+    gateway = mocker.patch('services.library_service.PaymentGateway').return_value
+    gateway.process_payment.return_value = {'transaction_id': 'txn_1', 'status': 'success'}
+    conn = database.get_db_connection()
+    post_ledger_entry(conn, '123456', 'charge', 500)
+    conn.commit()
+    conn.close()
+    response = client.post('/api/pay_fees', json={'patron_id': '123456', 'amount': 2.5})
+    assert response.status_code == 200
+    assert response.get_json()['transaction_id'] == 'txn_1'
+
+def test_pay_fees_api_requires_admin_token(client, mocker, monkeypatch):
+    gateway = mocker.patch('services.library_service.PaymentGateway').return_value
+    monkeypatch.setenv('ADMIN_TOKEN', 'secret')
+    response = client.post('/api/pay_fees', json={'patron_id': '123456', 'amount': 2.5})
+    assert response.status_code == 403
+    gateway.process_payment.assert_not_called()
+
+def test_pay_fees_api_invalid_amount(client):
+    response = client.post('/api/pay_fees', json={'patron_id': '123456', 'amount': 'abc'})
+    assert response.status_code == 400
+    assert response.get_json()['success'] == False
+
 def test_search_api_no_query(client):
     response = client.get('/api/search')
     assert response.status_code == 400
@@ -107,4 +142,13 @@ def test_search_api_with_query(client):
     data = response.get_json()
     assert 'search_term' in data
     assert 'results' in data
-    assert data['search_term'] == 'test'
\ No newline at end of file
+    assert data['search_term'] == 'test'
+
+def test_place_hold_post(client):
+    data = {
+        'patron_id': '123456',
+        'book_id': '2'
+    }
+    response = client.post('/hold', data=data, follow_redirects=True)
+    assert response.status_code == 200
+    assert b'Hold placed' in response.data
@@ -0,0 +1,61 @@
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import create_app
+from services.profiling import Profiler, profiler
+from services.query_log import query_log
+from services.runtime_settings import RuntimeSettings
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def _worker(clock):
+    settings = RuntimeSettings(poll_interval=1.0, clock=clock)
+    local = Profiler()
+    settings.on_change('profiling', lambda value: local.configure(value['mode'], value['sample_rate']))
+    return settings, local
+
+def test_setting_reaches_other_workers_on_next_poll(test_db):
+    clock = FakeClock()
+    first, first_profiler = _worker(clock)
+    second, second_profiler = _worker(clock)
+    second.poll()
+    first.set('profiling', {'mode': 'cprofile', 'sample_rate': 0.5})
+    assert first_profiler.mode == 'cprofile'
+    # Polled within the interval: not re-read yet
+    second.poll()
+    assert second_profiler.mode == 'off'
+    clock.now += 1.0
+    second.poll()
+    assert (second_profiler.mode, second_profiler.sample_rate) == ('cprofile', 0.5)
+    assert second.get('profiling') == {'mode': 'cprofile', 'sample_rate': 0.5}
+
+def test_unchanged_settings_are_not_reapplied(test_db):
+    clock = FakeClock()
+    settings = RuntimeSettings(clock=clock)
+    calls = []
+    settings.on_change('slow_query_threshold_ms', calls.append)
+    settings.set('slow_query_threshold_ms', 250.0)
+    clock.now += 5
+    settings.poll()
+    assert calls == [250.0]
+
+def test_admin_endpoints_store_shared_settings(test_db):
+    previous = query_log.threshold_ms
+    app = create_app()
+    try:
+        with app.test_client() as client:
+            response = client.post('/admin/profiling', json={'mode': 'timing', 'sample_rate': 0.2})
+            assert response.get_json()['pid'] == os.getpid()
+            client.post('/admin/queries', data={'threshold_ms': '250'})
+        probe = RuntimeSettings()
+        assert probe.get('profiling') == {'mode': 'timing', 'sample_rate': 0.2}
+        assert probe.get('slow_query_threshold_ms') == 250.0
+    finally:
+        profiler.configure('off', 0.1)
+        query_log.threshold_ms = previous
@@ -0,0 +1,90 @@
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+from services.search_cache import SearchResultCache, normalize_search_key, search_books_cached, search_cache
+
+def test_normalize_key_ascii_case_and_whitespace():
+    assert normalize_search_key('  Test ', 'title') == ('title', 'test')
+    assert normalize_search_key('TEST', 'unknown') == ('title', 'test')
+    assert normalize_search_key('Über', 'author') == ('author', 'Über')
+
+def test_normalize_key_isbn_keeps_term():
+    assert normalize_search_key('978ABC', 'isbn') == ('isbn', '978ABC')
+
+def test_cached_search_hits_on_repeat(test_db):
+    first = search_books_cached('test', 'title')
+    second = search_books_cached('TEST', 'title')
+    assert first == second
+    stats = search_cache.stats()
+    assert stats['hits'] >= 1
+    assert stats['hit_ratio'] > 0
+
+def test_cached_results_are_immutable(test_db):
+    results = search_books_cached('test', 'title')
+    results.clear()
+    with pytest.raises(TypeError):
+        search_books_cached('test', 'title')[0]['title'] = 'Changed'
+    assert search_books_cached('test', 'title')[0]['title'] == 'Test Book'
+
+def test_availability_change_invalidates_entry(test_db):
+    search_books_cached('test', 'title')
+    database.update_book_availability(1, -1)
+    results = search_books_cached('test', 'title')
+    assert results[0]['available_copies'] == 1
+
+def test_insert_book_clears_cache(test_db):
+    assert search_books_cached('new', 'title') == []
+    database.insert_book('New Book', 'New Author', '3333333333333', 1, 1)
+    assert len(search_books_cached('new', 'title')) == 1
+
+def test_lru_eviction_by_entries():
+    cache = SearchResultCache(max_entries=2)
+    cache.put('a', 'title', [])
+    cache.put('b', 'title', [])
+    cache.get('a', 'title')
+    cache.put('c', 'title', [])
+    assert cache.get('b', 'title') is None
+    assert cache.get('a', 'title') == []
+    assert cache.stats()['evictions'] == 1
+
+def test_eviction_by_bytes():
+    cache = SearchResultCache(max_bytes=400)
+    book = {'id': 1, 'title': 'x' * 250}
+    cache.put('a', 'title', [book])
+    cache.put('b', 'title', [dict(book, id=2)])
+    stats = cache.stats()
+    assert stats['bytes'] <= 400
+    assert stats['entries'] == 1
+
+def test_cache_stats_api(test_db):
+    from app import create_app
+    app = create_app()
+    with app.test_client() as client:
+        client.get('/api/search?q=test&type=title')
+        response = client.get('/api/search/cache_stats')
+    assert response.status_code == 200
+    assert 'hit_ratio' in response.get_json()
+
+def test_entries_expire_after_max_age():
+    now = [0.0]
+    cache = SearchResultCache(max_age=30, clock=lambda: now[0])
+    cache.put('a', 'title', [])
+    now[0] = 30.0
+    assert cache.get('a', 'title') == []
+    now[0] = 30.5
+    assert cache.get('a', 'title') is None
+    assert cache.stats()['expirations'] == 1
+    assert cache.stats()['entries'] == 0
+
+def test_put_after_invalidation_is_refused():
+    cache = SearchResultCache()
+    generation = cache.generation
+    # A book changes while the query for 'a' is running
+    cache.invalidate_book(1)
+    cache.put('a', 'title', [], generation)
+    assert cache.get('a', 'title') is None
+    assert cache.stats()['stale_puts'] == 1
+    cache.put('a', 'title', [], cache.generation)
+    assert cache.get('a', 'title') == []
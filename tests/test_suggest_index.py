@@ -0,0 +1,76 @@
+import pytest
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+from services.suggest_index import PrefixIndex, normalize_text, suggest_index
+
+BOOKS = [
+    {'id': 1, 'title': 'The Great Gatsby', 'author': 'F. Scott Fitzgerald'},
+    {'id': 2, 'title': 'To Kill a Mockingbird', 'author': 'Harper Lee'},
+    {'id': 3, 'title': 'Les Misérables', 'author': 'Victor Hugo'},
+]
+
+def test_normalize_text():
+    assert normalize_text('  Les  Misérables! ') == 'les miserables'
+    assert normalize_text('F. Scott') == 'f scott'
+
+def test_suggest_title_prefix():
+    index = PrefixIndex()
+    index.build(BOOKS)
+    results = index.suggest('the gr')
+    assert results[0]['text'] == 'The Great Gatsby'
+
+def test_suggest_matches_inner_word():
+    index = PrefixIndex()
+    index.build(BOOKS)
+    texts = [s['text'] for s in index.suggest('gats')]
+    assert texts == ['The Great Gatsby']
+
+def test_suggest_accent_insensitive_and_field_filter():
+    index = PrefixIndex()
+    index.build(BOOKS)
+    assert index.suggest('miser', field='title')[0]['book_id'] == 3
+    assert index.suggest('miser', field='author') == []
+
+def test_suggest_limit_and_empty_prefix():
+    index = PrefixIndex()
+    index.build(BOOKS)
+    assert len(index.suggest('t', limit=1)) == 1
+    assert index.suggest('   ') == []
+
+def test_insert_book_updates_index(test_db):
+    suggest_index.build()
+    database.insert_book('Gardening Basics', 'Jane Doe', '3333333333333', 1, 1)
+    assert [s['text'] for s in suggest_index.suggest('garden')] == ['Gardening Basics']
+
+def test_stale_index_rebuilds_in_background(test_db):
+    index = PrefixIndex(max_age=0)
+    index.build()
+    # Written by another process: no catalog notification reaches this one
+    conn = database.get_db_connection()
+    conn.execute("INSERT INTO books (title, author, isbn, total_copies, available_copies) VALUES ('Gardening Basics', 'Jane Doe', '3333333333333', 1, 1)")
+    conn.commit()
+    conn.close()
+    # The first stale read starts the rebuild; it may finish before or after that read returns
+    deadline = time.monotonic() + 5
+    while not index.suggest('garden') and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [s['text'] for s in index.suggest('garden')] == ['Gardening Basics']
+
+def test_index_built_from_rows_is_not_refreshed():
+    index = PrefixIndex(max_age=0)
+    index.build(BOOKS)
+    index.suggest('gats')
+    assert not index._rebuilding.is_set()
+
+def test_suggest_api(test_db):
+    from app import create_app
+    app = create_app()
+    with app.test_client() as client:
+        response = client.get('/api/suggest?q=test&field=title')
+        bad = client.get('/api/suggest?q=test&field=isbn')
+    assert response.status_code == 200
+    assert response.get_json()['suggestions'][0]['text'] == 'Test Book'
+    assert bad.status_code == 400
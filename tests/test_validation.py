@@ -0,0 +1,53 @@
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.isbn import isbn13_check_digit
+from services.validation import (
+    AUTHOR_TOO_LONG, INVALID_ISBN, INVALID_ISBN_CHECK_DIGIT, INVALID_TOTAL_COPIES, TITLE_REQUIRED,
+    BookFields, clean_book_fields, is_valid_patron_id, validate_book_rows
+)
+
+@pytest.mark.parametrize('patron_id, valid', [
+    ('123456', True),
+    ('12345', False),
+    ('1234567', False),
+    ('12345a', False),
+    ('', False),
+    (None, False),
+    (123456, False),
+    ('１２３４５６', False),
+])
+def test_is_valid_patron_id(patron_id, valid):
+    assert is_valid_patron_id(patron_id) is valid
+
+def test_clean_book_fields_strips_and_normalizes():
+    fields, error = clean_book_fields('  Title ', ' Author', '0-306-40615-2', 2)
+    assert error is None
+    assert fields == BookFields('Title', 'Author', '9780306406157', 2)
+
+@pytest.mark.parametrize('title, author, isbn, total_copies, error', [
+    ('   ', 'Author', '9780306406157', 1, TITLE_REQUIRED),
+    (None, 'Author', '9780306406157', 1, TITLE_REQUIRED),
+    ('Title', 'A' * 101, '9780306406157', 1, AUTHOR_TOO_LONG),
+    ('Title', 'Author', '978', 1, INVALID_ISBN),
+    ('Title', 'Author', None, 1, INVALID_ISBN),
+    ('Title', 'Author', '9780306406157', 0, INVALID_TOTAL_COPIES),
+    ('Title', 'Author', '9780306406157', '2', INVALID_TOTAL_COPIES),
+])
+def test_clean_book_fields_errors(title, author, isbn, total_copies, error):
+    assert clean_book_fields(title, author, isbn, total_copies) == (None, error)
+
+def test_validate_book_rows_reports_errors_by_index():
+    valid, errors = validate_book_rows([
+        {'title': 'Good', 'author': 'Author', 'isbn': '978-0-306-40615-7', 'total_copies': 1},
+        {'title': 'Bad checksum', 'author': 'Author', 'isbn': '9780306406158', 'total_copies': 1},
+        {'author': 'Author', 'isbn': '9780306406157', 'total_copies': 1},
+    ])
+    assert valid == [(0, BookFields('Good', 'Author', '9780306406157', 1))]
+    assert errors == [{'row': 1, 'error': INVALID_ISBN_CHECK_DIGIT}, {'row': 2, 'error': TITLE_REQUIRED}]
+
+def test_isbn13_check_digit():
+    assert isbn13_check_digit('978030640615') == '7'
+    assert isbn13_check_digit('978045152493') == '5'
+    assert isbn13_check_digit('000000000000') == '0'
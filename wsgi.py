@@ -0,0 +1,10 @@
+"""
+WSGI entry point for production servers.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+    uwsgi --http :5000 --module wsgi:app --master --processes 4
+"""
+
+from app import create_app
+
+app = create_app()